@@ -0,0 +1,410 @@
+# batchCapture.py
+# ---------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  Many capture games at once, as NumPy arrays (requires NumPy).
+
+  BatchGames holds B games on one layout and advances them in lockstep:
+  step(agentIndex, actions) moves the same agent in every game, each by
+  its own action.  A game is a row of each array, and cells are numbered
+  x * height + y as in BitGrid:
+
+    positions, directions, isPacman, scaredTimers,
+    numCarrying, numReturned          [B, agents]
+    food, capsules                    [B, cells], booleans
+    scores, timeleft, over            [B]
+
+  Actions are numbered as in stateCodec.DIRECTIONS (North, South, East,
+  West, Stop).  The rules are those of capture.AgentRules, quirks and
+  all (see step), and checkConformance plays random games on both
+  engines to show that they agree:
+
+    python batchCapture.py -l jumboCapture -n 64
+"""
+
+import capture, stateCodec
+from game import Actions, AgentState, Configuration, Directions
+import collections, sys
+import numpy as np
+
+NUM_ACTIONS = len(stateCodec.DIRECTIONS)
+STOP = stateCodec.DIRECTION_CODES[Directions.STOP]
+
+class BatchGames:
+  """
+  batchSize games of length moves on layout, all starting from its
+  initial state.  getGameState and setGameState convert a game to and
+  from a capture.GameState.
+  """
+
+  def __init__(self, layout, batchSize, length = 1200, numAgents = 4):
+    self.layout = layout
+    self.batchSize = batchSize
+    self.length = length
+    width, height = layout.width, layout.height
+    self.width, self.height = width, height
+    numCells = width * height
+
+    start = capture.GameState()
+    start.initialize(layout, numAgents)
+    start.data.timeleft = length
+    self.startState = start
+    # As capture.TOTAL_FOOD is set for the layout when a game starts
+    self.foodToWin = layout.totalFood // 2 - capture.MIN_FOOD
+    self.numAgents = len(start.data.agentStates)
+    self.redTeam = start.getRedTeamIndices()
+    self.blueTeam = start.getBlueTeamIndices()
+    self.isRedAgent = np.array([start.isOnRedTeam(i) for i in range(self.numAgents)])
+
+    # The cell each action leads to from each cell, or -1 if it is illegal
+    table = Actions.getActionTable(layout.walls)
+    self.moves = np.full((numCells, NUM_ACTIONS), -1, dtype = np.int32)
+    for cell in range(numCells):
+      for action, (x, y) in zip(table.actions[cell], table.neighbors[cell]):
+        self.moves[cell, stateCodec.DIRECTION_CODES[action]] = x * height + y
+    self.legal = self.moves >= 0
+
+    columns = np.arange(numCells) // height
+    halfway = width // 2
+    self.redSide = columns < halfway
+    # The capsules each team can eat, as capture.halfList picks them
+    self.edibleCapsules = {True: columns > halfway, False: columns <= halfway}
+
+    self.startCells = np.array([self.cell(s.start.pos) for s in start.data.agentStates], dtype = np.int32)
+    self.startDirections = np.array([stateCodec.DIRECTION_CODES[s.start.direction] for s in start.data.agentStates],
+                                    dtype = np.int8)
+    self.startFood = np.zeros(numCells, dtype = bool)
+    for x, y in layout.food.asList():
+      self.startFood[x * height + y] = True
+    self.startCapsules = np.zeros(numCells, dtype = bool)
+    for x, y in layout.capsules:
+      self.startCapsules[x * height + y] = True
+    self._dumpOrders = {}
+
+    shape = (batchSize, self.numAgents)
+    self.positions = np.zeros(shape, dtype = np.int32)
+    self.directions = np.zeros(shape, dtype = np.int8)
+    self.isPacman = np.zeros(shape, dtype = bool)
+    self.scaredTimers = np.zeros(shape, dtype = np.int32)
+    self.numCarrying = np.zeros(shape, dtype = np.int32)
+    self.numReturned = np.zeros(shape, dtype = np.int32)
+    self.food = np.zeros((batchSize, numCells), dtype = bool)
+    self.capsules = np.zeros((batchSize, numCells), dtype = bool)
+    self.scores = np.zeros(batchSize, dtype = np.int32)
+    self.timeleft = np.zeros(batchSize, dtype = np.int32)
+    self.over = np.zeros(batchSize, dtype = bool)
+    self.reset()
+
+  def cell(self, pos):
+    x, y = pos
+    return int(x) * self.height + int(y)
+
+  def reset(self, games = None):
+    "Puts the games (all by default; else an index array or mask) back at the start"
+    if games is None: games = slice(None)
+    self.positions[games] = self.startCells
+    self.directions[games] = self.startDirections
+    self.isPacman[games] = False
+    self.scaredTimers[games] = 0
+    self.numCarrying[games] = 0
+    self.numReturned[games] = 0
+    self.food[games] = self.startFood
+    self.capsules[games] = self.startCapsules
+    self.scores[games] = 0
+    self.timeleft[games] = self.length
+    self.over[games] = False
+
+  def getLegalActions(self, agentIndex):
+    "[B, actions] booleans: the legal actions of agentIndex in each game"
+    return self.legal[self.positions[:, agentIndex]]
+
+  def step(self, agentIndex, actions):
+    """
+    Moves agentIndex in every game that is not over by its action in
+    actions (B action numbers), as GameState.generateSuccessor and
+    CaptureRules.process do.  Raises ValueError for an illegal action.
+
+    Like capture.AgentRules.applyAction, an agent that brings food home
+    then only eats if the last agent is a Pacman (applyAction looks at the
+    wrong agent state after counting the food returned), and a red Pacman
+    cannot eat a capsule in the middle column.
+    """
+    a = agentIndex
+    games = np.nonzero(~self.over)[0]
+    if len(games) == 0: return
+    actions = np.asarray(actions)[games]
+    cells = self.moves[self.positions[games, a], actions]
+    if (cells < 0).any():
+      raise ValueError('Illegal action for agent %d in game %d' % (a, games[np.argmax(cells < 0)]))
+    isRed = bool(self.isRedAgent[a])
+    team = self.redTeam if isRed else self.blueTeam
+
+    # Move
+    self.positions[games, a] = cells
+    moved = actions != STOP
+    self.directions[games[moved], a] = actions[moved]
+    pacman = self.redSide[cells] != isRed
+    self.isPacman[games, a] = pacman
+
+    # Bring food home
+    carrying = self.numCarrying[games, a]
+    returning = (carrying > 0) & ~pacman
+    if returning.any():
+      home = games[returning]
+      food = carrying[returning]
+      self.scores[home] += food if isRed else -food
+      self.numReturned[home, a] += food
+      self.numCarrying[home, a] = 0
+      red = self.numReturned[home][:, self.redTeam].sum(1)
+      blue = self.numReturned[home][:, self.blueTeam].sum(1)
+      self.over[home] |= (red >= self.foodToWin) | (blue >= self.foodToWin)
+    eats = np.where(returning, self.isPacman[games, self.numAgents - 1], pacman)
+
+    # Eat
+    if eats.any():
+      eaters, eaten = games[eats], cells[eats]
+      hasFood = self.food[eaters, eaten]
+      if hasFood.any():
+        eaters, eaten = eaters[hasFood], eaten[hasFood]
+        # The food goes to the first agent of the team on the cell
+        receivers = np.full(len(eaters), team[-1])
+        for index in reversed(team):
+          receivers = np.where(self.positions[eaters, index] == eaten, index, receivers)
+        self.numCarrying[eaters, receivers] += 1
+        self.food[eaters, eaten] = False
+      eaters, eaten = games[eats], cells[eats]
+      hasCapsule = self.capsules[eaters, eaten] & self.edibleCapsules[isRed][eaten]
+      if hasCapsule.any():
+        self.capsules[eaters[hasCapsule], eaten[hasCapsule]] = False
+        otherTeam = self.blueTeam if isRed else self.redTeam
+        self.scaredTimers[np.ix_(eaters[hasCapsule], otherTeam)] = capture.SCARED_TIME
+
+    self.checkDeath(games, a)
+    self.scaredTimers[games, a] = np.maximum(self.scaredTimers[games, a] - 1, 0)
+    self.timeleft[games] -= 1
+    self.over[games] |= self.timeleft[games] <= 0
+
+  def checkDeath(self, games, a):
+    "capture.AgentRules.checkDeath for agent a in games"
+    isRed = bool(self.isRedAgent[a])
+    otherTeam = self.blueTeam if isRed else self.redTeam
+    killPoints = -capture.KILL_POINTS if isRed else capture.KILL_POINTS
+    moverIsPacman = self.isPacman[games, a]
+    pacmen, ghosts = games[moverIsPacman], games[~moverIsPacman]
+    for other in otherTeam:
+      if len(pacmen):
+        meets = ~self.isPacman[pacmen, other] & (self.positions[pacmen, other] == self.positions[pacmen, a])
+        if meets.any():
+          scared = self.scaredTimers[pacmen, other] > 0
+          self.scores[pacmen[meets]] += killPoints
+          self.die(pacmen[meets & ~scared], a)
+          self.die(pacmen[meets & scared], other)
+      if len(ghosts):
+        meets = self.isPacman[ghosts, other] & (self.positions[ghosts, other] == self.positions[ghosts, a])
+        if meets.any():
+          scared = self.scaredTimers[ghosts, a] > 0
+          self.scores[ghosts[meets & ~scared]] -= killPoints
+          self.scores[ghosts[meets & scared]] += killPoints
+          self.die(ghosts[meets & ~scared], other)
+          self.die(ghosts[meets & scared], a)
+
+  def die(self, games, agentIndex):
+    "Sends agentIndex back to its start in games, first dropping the food a Pacman carries"
+    if len(games) == 0: return
+    for game in games[self.isPacman[games, agentIndex] & (self.numCarrying[games, agentIndex] > 0)]:
+      self.dumpFood(game, agentIndex)
+    self.isPacman[games, agentIndex] = False
+    self.positions[games, agentIndex] = self.startCells[agentIndex]
+    self.directions[games, agentIndex] = self.startDirections[agentIndex]
+    self.scaredTimers[games, agentIndex] = 0
+
+  def dumpFood(self, game, agentIndex):
+    "capture.AgentRules.dumpFoodFromDeath in one game"
+    cell = int(self.positions[game, agentIndex])
+    numToDump = int(self.numCarrying[game, agentIndex])
+    food, capsules = self.food[game], self.capsules[game]
+    occupied = set(self.positions[game].tolist())
+    for candidate in self.getDumpOrder(cell):
+      if food[candidate] or capsules[candidate] or candidate in occupied: continue
+      food[candidate] = True
+      numToDump -= 1
+      if numToDump == 0: break
+    if numToDump > 0:
+      raise Exception('Exhausted BFS! uh oh')
+    self.numCarrying[game, agentIndex] = 0
+
+  def getDumpOrder(self, cell):
+    """
+    The cells food dropped at cell may go to, in the order
+    dumpFoodFromDeath tries them: its search over the eight neighbors of
+    each cell, restricted to open cells on the side of cell.  The order
+    only depends on the maze, so it is found once per cell.
+    """
+    if cell not in self._dumpOrders:
+      width, height, walls = self.width, self.height, self.layout.walls
+      x0, y0 = divmod(cell, height)
+      red = x0 < width // 2
+      valid = set((x, y) for x in range(1, width) for y in range(1, height)
+                  if not walls[x][y] and (x < width // 2) == red)
+      order = []
+      queue = collections.deque([(x0, y0)])
+      seen = set()
+      while len(order) < len(valid):
+        x, y = queue.popleft()
+        if (x, y) in seen: continue
+        seen.add((x, y))
+        if (x, y) in valid: order.append(x * height + y)
+        for dx in (-1, 0, 1):
+          for dy in (-1, 0, 1):
+            queue.append((x + dx, y + dy))
+      self._dumpOrders[cell] = order
+    return self._dumpOrders[cell]
+
+  def getGameState(self, game):
+    "Game number game as a capture.GameState"
+    height = self.height
+    state = capture.GameState(self.startState)
+    data = state.data
+    data.food = self.startState.data.food.copy()
+    data.food.bits = sum(1 << int(cell) for cell in np.nonzero(self.food[game])[0])
+    data.capsules = [divmod(int(cell), height) for cell in np.nonzero(self.capsules[game])[0]]
+    agentStates = []
+    for i, start in enumerate(self.startState.data.agentStates):
+      agentState = AgentState(start.start, bool(self.isPacman[game, i]))
+      x, y = divmod(int(self.positions[game, i]), height)
+      agentState.configuration = Configuration((x, y), stateCodec.DIRECTIONS[self.directions[game, i]])
+      agentState.scaredTimer = int(self.scaredTimers[game, i])
+      agentState.numCarrying = int(self.numCarrying[game, i])
+      agentState.numReturned = int(self.numReturned[game, i])
+      agentStates.append(agentState)
+    data.agentStates = agentStates
+    data._ownsFood = True
+    data._ownsCapsules = True
+    data._ownedAgents = set(range(len(agentStates)))
+    data.score = int(self.scores[game])
+    data.timeleft = int(self.timeleft[game])
+    data._win = bool(self.over[game])
+    state.countFood()
+    return state
+
+  def setGameState(self, game, state):
+    "Makes game number game a copy of a capture.GameState on the same layout"
+    data = state.data
+    for i, agentState in enumerate(data.agentStates):
+      conf = agentState.configuration
+      self.positions[game, i] = self.cell(conf.pos)
+      self.directions[game, i] = stateCodec.DIRECTION_CODES[conf.direction]
+      self.isPacman[game, i] = agentState.isPacman
+      self.scaredTimers[game, i] = agentState.scaredTimer
+      self.numCarrying[game, i] = agentState.numCarrying
+      self.numReturned[game, i] = agentState.numReturned
+    self.food[game] = False
+    for pos in data.food.asList():
+      self.food[game, self.cell(pos)] = True
+    self.capsules[game] = False
+    for pos in data.capsules:
+      self.capsules[game, self.cell(pos)] = True
+    self.scores[game] = data.score
+    self.timeleft[game] = data.timeleft
+    self.over[game] = data._win
+
+def randomActions(games, agentIndex, rng, keep = 0.8):
+  """
+  Random legal actions for agentIndex in every game: with probability
+  keep the agent goes on in its direction if it can, otherwise it takes
+  any legal move but Stop.  Agents wander much further than with uniform
+  moves, so games see food eaten, returned and dropped.
+  """
+  legal = games.getLegalActions(agentIndex).copy()
+  canMove = legal[:, :STOP].any(1)
+  legal[canMove, STOP] = False
+  choice = np.argmax(rng.random(legal.shape) * legal, axis = 1)
+  current = games.directions[:, agentIndex].astype(np.intp)
+  goOn = legal[np.arange(games.batchSize), current] & (rng.random(games.batchSize) < keep)
+  return np.where(goOn, current, choice)
+
+def compareStates(games, game, state):
+  "The names of the fields where game number game differs from a capture.GameState"
+  expected = games.getGameState(game).data
+  data = state.data
+  differences = []
+  for field in ('score', 'timeleft', '_win'):
+    if getattr(expected, field) != getattr(data, field): differences.append(field)
+  if expected.food.bits != data.food.bits: differences.append('food')
+  if sorted(expected.capsules) != sorted(data.capsules): differences.append('capsules')
+  for i, (mine, theirs) in enumerate(zip(expected.agentStates, data.agentStates)):
+    x, y = theirs.configuration.pos
+    if mine.configuration.pos != (int(x), int(y)): differences.append('position %d' % i)
+    if mine.configuration.direction != theirs.configuration.direction: differences.append('direction %d' % i)
+    for field in ('isPacman', 'scaredTimer', 'numCarrying', 'numReturned'):
+      if getattr(mine, field) != getattr(theirs, field): differences.append('%s %d' % (field, i))
+  return differences
+
+def checkConformance(layout, numGames = 16, length = 1200, seed = 0):
+  """
+  Plays numGames random games on BatchGames and, move by move, on
+  capture.GameState.generateSuccessor, comparing every state.  Returns
+  the mismatches, as (move, game, fields), and counts of the rules the
+  games went through.
+  """
+  games = BatchGames(layout, numGames, length)
+  states = [games.getGameState(game) for game in range(numGames)]
+  rng = np.random.default_rng(seed)
+  mismatches = []
+  events = collections.Counter()
+  agentIndex = 0
+  for move in range(length):
+    if games.over.all(): break
+    actions = randomActions(games, agentIndex, rng)
+    games.step(agentIndex, actions)
+    for game, state in enumerate(states):
+      if state.isOver(): continue
+      successor = state.generateSuccessor(agentIndex, stateCodec.DIRECTIONS[actions[game]])
+      if successor.data.timeleft <= 0: successor.data._win = True # CaptureRules.process
+      before, after = state.data, successor.data
+      if after._foodEaten != None: events['food eaten'] += 1
+      if after._capsuleEaten != None: events['capsules eaten'] += 1
+      if after._foodAdded: events['food dropped'] += len(after._foodAdded)
+      if sum(s.numReturned for s in after.agentStates) > sum(s.numReturned for s in before.agentStates):
+        events['food returned'] += 1
+      for i in range(len(after.agentStates)):
+        if after.agentStates[i].configuration.pos == after.agentStates[i].start.pos and \
+           before.agentStates[i].configuration.pos != after.agentStates[i].start.pos and i != agentIndex:
+          events['agents eaten'] += 1
+      states[game] = successor
+      differences = compareStates(games, game, successor)
+      if differences: mismatches.append((move, game, differences))
+    agentIndex = (agentIndex + 1) % games.numAgents
+  return mismatches, events
+
+if __name__ == '__main__':
+  from optparse import OptionParser
+  parser = OptionParser("""
+  USAGE:      python batchCapture.py <options>
+              Checks that BatchGames plays by the rules of capture.py, on
+              random games, and times it against GameState.generateSuccessor
+  """)
+  parser.add_option('-l', '--layout', default='defaultCapture', help='Layout [Default: %default]')
+  parser.add_option('-n', '--numGames', type='int', default=16, help='Games in the batch [Default: %default]')
+  parser.add_option('-i', '--time', type='int', default=1200, help='Moves per game [Default: %default]')
+  parser.add_option('-s', '--seed', type='int', default=0, help='Random seed [Default: %default]')
+  options, otherjunk = parser.parse_args(sys.argv[1:])
+  import layout
+  l = layout.getLayout(options.layout)
+  mismatches, events = checkConformance(l, options.numGames, options.time, options.seed)
+  print('Rules exercised: ' + ', '.join('%s %d' % item for item in sorted(events.items())))
+  for move, game, differences in mismatches[:10]:
+    print('Move %d of game %d differs: %s' % (move, game, ', '.join(differences)))
+  print('%d mismatched states' % len(mismatches))
+  sys.exit(1 if mismatches else 0)
@@ -0,0 +1,632 @@
+# benchmark.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Micro and macro benchmarks for the capture engine.
+
+Each benchmark is a function taking the parsed command line options and
+printing its measurements.  Run one (or several) by name:
+
+  > python benchmark.py turns
+  > python benchmark.py turns -l jumboCapture -n 3
+
+See the usage string for the list of benchmarks and options.
+"""
+
+import sys, time, random
+import util
+
+def default(str):
+  return str + ' [Default: %default]'
+
+def getLayouts(options, defaults = ['defaultCapture']):
+  "Returns the (name, layout) pairs a benchmark should run on"
+  import layout
+  names = defaults
+  if options.layouts != None:
+    names = options.layouts.split(',')
+  return [(name, layout.getLayout(name)) for name in names]
+
+def allLayouts():
+  "The names of all layouts in layouts/"
+  import os
+  return sorted(f[:-4] for f in os.listdir('layouts') if f.endswith('.lay'))
+
+def playQuietGame(layout, red, blue, length, seed):
+  """
+  Plays one headless game between two teams and returns the finished Game.
+  The engine's own printing is suppressed so it does not skew the timings.
+  """
+  import capture, textDisplay
+  random.seed(seed)
+  util.mutePrint()
+  try:
+    agents = sum([list(el) for el in zip(capture.loadAgents(True, red, True, {}),
+                                         capture.loadAgents(False, blue, True, {}))], [])
+    rules = capture.CaptureRules(quiet = True)
+    game = rules.newGame(layout, agents, textDisplay.NullGraphics(), length, False, False)
+    game.run()
+  finally:
+    util.unmutePrint()
+  return game
+
+def initialState(layout, length = 1200):
+  "The starting GameState of a capture game on layout"
+  import capture
+  state = capture.GameState()
+  state.initialize(layout, 4)
+  state.data.timeleft = length
+  return state
+
+def randomWalk(state, steps, seed):
+  """
+  Walks the game tree the way a search agent does: every legal successor
+  of the current state is generated, then play continues from a random one.
+  Returns the number of successors generated.
+  """
+  rng = random.Random(seed)
+  start = state
+  agentIndex = 0
+  generated = 0
+  for step in range(steps):
+    if state.isOver():
+      state = start
+    successors = [state.generateSuccessor(agentIndex, action)
+                  for action in state.getLegalActions(agentIndex)]
+    generated += len(successors)
+    state = rng.choice(successors)
+    agentIndex = (agentIndex + 1) % state.getNumAgents()
+  return generated
+
+##############
+# Benchmarks #
+##############
+
+def benchmarkTurns(options):
+  """
+  Headless game throughput: agent turns per second of whole games
+  between the baseline teams (agent time included).
+  """
+  print('%-20s %8s %10s %12s' % ('layout', 'turns', 'seconds', 'turns/sec'))
+  for name, layout in getLayouts(options):
+    totalTurns, totalTime = 0, 0.0
+    for i in range(options.numGames):
+      start = time.time()
+      game = playQuietGame(layout, options.red, options.blue, options.length, i)
+      totalTime += time.time() - start
+      totalTurns += len(game.moveHistory)
+    print('%-20s %8d %10.2f %12.1f' % (name, totalTurns, totalTime, totalTurns / totalTime))
+
+def benchmarkSuccessors(options):
+  """
+  Raw successor generation: GameState.generateSuccessor calls per second
+  along random walks through the game tree (-i sets the walk length).
+  """
+  print('%-20s %10s %10s %14s' % ('layout', 'successors', 'seconds', 'successors/sec'))
+  for name, layout in getLayouts(options):
+    state = initialState(layout)
+    generated, elapsed = 0, 0.0
+    for i in range(options.numGames):
+      start = time.time()
+      generated += randomWalk(state, options.length, i)
+      elapsed += time.time() - start
+    print('%-20s %10d %10.2f %14.1f' % (name, generated, elapsed, generated / elapsed))
+
+def legacyDistances(layout):
+  "distanceCalculator.computeDistances as it was: a UCS from every cell into a dict of pairs"
+  distances = {}
+  allNodes = layout.walls.asList(False)
+  for source in allNodes:
+    dist = {}
+    closed = {}
+    for node in allNodes:
+      dist[node] = sys.maxsize
+    queue = util.PriorityQueue()
+    queue.push(source, 0)
+    dist[source] = 0
+    while not queue.isEmpty():
+      node = queue.pop()
+      if node in closed:
+        continue
+      closed[node] = True
+      nodeDist = dist[node]
+      adjacent = []
+      x, y = node
+      if not layout.isWall((x,y+1)):
+        adjacent.append((x,y+1))
+      if not layout.isWall((x,y-1)):
+        adjacent.append((x,y-1) )
+      if not layout.isWall((x+1,y)):
+        adjacent.append((x+1,y) )
+      if not layout.isWall((x-1,y)):
+        adjacent.append((x-1,y))
+      for other in adjacent:
+        if not other in dist:
+          continue
+        oldDist = dist[other]
+        newDist = nodeDist+1
+        if newDist < oldDist:
+          dist[other] = newDist
+          queue.push(other, newDist)
+    for target in allNodes:
+      distances[(target, source)] = dist[target]
+  return distances
+
+def benchmarkDistances(options):
+  """
+  All-pairs maze distances: time to compute the table for a layout and
+  the memory the finished table holds on to, for the dict of pairs the
+  engine used to build (legacyDistances) and the DistanceTable it builds
+  now.  Runs on every layout in layouts/ unless -l names some.
+  """
+  import distanceCalculator, tracemalloc
+  print('%-20s %7s %10s %10s %8s %12s %12s %8s' % ('layout', 'cells', 'old s', 'new s', 'speedup',
+                                                   'old KB', 'new KB', 'smaller'))
+  for name, layout in getLayouts(options, allLayouts()):
+    cells = layout.walls.count(False)
+    results = []
+    for compute in (legacyDistances, distanceCalculator.computeDistances):
+      elapsed = 0.0
+      for i in range(options.numGames):
+        start = time.time()
+        compute(layout)
+        elapsed += time.time() - start
+      tracemalloc.start()
+      distances = compute(layout)
+      memory = tracemalloc.get_traced_memory()[0]
+      tracemalloc.stop()
+      del distances
+      results.append((elapsed / options.numGames, memory / 1024.0))
+    (oldSeconds, oldMemory), (newSeconds, newMemory) = results
+    print('%-20s %7d %10.3f %10.3f %7.1fx %12.1f %12.1f %7.1fx' % (name, cells, oldSeconds, newSeconds,
+          oldSeconds / max(newSeconds, 1e-9), oldMemory, newMemory, oldMemory / max(newMemory, 1e-9)))
+
+def benchmarkCopies(options):
+  """
+  GameState.deepCopy per game: how many copies a baseline game makes,
+  and the memory and time each copy costs.
+  """
+  import capture, tracemalloc
+  print('%-20s %8s %12s %12s %14s' % ('layout', 'copies', 'KB/copy', 'usec/copy', 'MB/game'))
+  for name, layout in getLayouts(options):
+    # Count the copies made during whole games
+    copies = [0]
+    deepCopy = capture.GameState.deepCopy
+    def countingDeepCopy(self):
+      copies[0] += 1
+      return deepCopy(self)
+    capture.GameState.deepCopy = countingDeepCopy
+    try:
+      for i in range(options.numGames):
+        playQuietGame(layout, options.red, options.blue, options.length, i)
+    finally:
+      capture.GameState.deepCopy = deepCopy
+    perGame = copies[0] / float(options.numGames)
+
+    # Cost of a single copy of the starting state
+    state = initialState(layout)
+    start = time.time()
+    for i in range(1000):
+      state.deepCopy()
+    seconds = (time.time() - start) / 1000
+    tracemalloc.start()
+    kept = [state.deepCopy() for i in range(100)]
+    size = tracemalloc.get_traced_memory()[0] / 100.0
+    tracemalloc.stop()
+    del kept
+    print('%-20s %8d %12.2f %12.1f %14.2f' % (name, perGame, size / 1024, seconds * 1e6, perGame * size / 2**20))
+
+def successorRollout(agent, state, agentIndex):
+  "A rollout like agent.rollout, made by chaining generateSuccessor"
+  for depth in range(agent.rolloutDepth):
+    if state.isOver(): break
+    actions = state.getLegalActions(agentIndex)
+    state = state.generateSuccessor(agentIndex, agent.rolloutAction(state, agentIndex, actions))
+    agentIndex = (agentIndex + 1) % state.getNumAgents()
+  return agent.evaluate(state)
+
+def benchmarkRollouts(options):
+  """
+  Monte Carlo rollouts: random playouts per second from the start of a
+  game, made in place by captureMCTS.MonteCarloAgent.rollout and, for
+  comparison, by chaining generateSuccessor.  Runs on every layout in
+  layouts/ unless -l names some; -n sets the hundreds of rollouts.
+  """
+  import captureMCTS
+  print('%-20s %7s %14s %14s %8s' % ('layout', 'depth', 'rollouts/sec', 'successors', 'speedup'))
+  for name, layout in getLayouts(options, allLayouts()):
+    state = initialState(layout)
+    agent = captureMCTS.MonteCarloAgent(0)
+    agent.registerInitialState(state)
+    count = 100 * options.numGames
+    rates = []
+    for rollout in [agent.rollout, lambda state, index: successorRollout(agent, state, index)]:
+      random.seed(0)
+      start = time.time()
+      for i in range(count):
+        rollout(state, 0)
+      rates.append(count / (time.time() - start))
+    print('%-20s %7d %14.1f %14.1f %8.2f' % (name, agent.rolloutDepth, rates[0], rates[1], rates[0] / rates[1]))
+
+def benchmarkCodec(options):
+  """
+  State serialization: bytes per state and microseconds to encode and
+  decode a state with stateCodec and with pickle, over the states of a
+  baseline game.
+  """
+  import pickle, stateCodec
+  print('%-20s %-8s %12s %12s %12s' % ('layout', 'format', 'bytes/state', 'encode usec', 'decode usec'))
+  for name, layout in getLayouts(options):
+    game = playQuietGame(layout, options.red, options.blue, options.length, 0)
+    state = initialState(layout, options.length)
+    states = [state]
+    for agentIndex, action in game.moveHistory:
+      state = state.generateSuccessor(agentIndex, action)
+      states.append(state)
+    startState = states[0]
+    formats = [('codec', stateCodec.encodeState, lambda data: stateCodec.decodeState(data, startState)),
+               ('pickle', lambda state: pickle.dumps(state, pickle.HIGHEST_PROTOCOL), pickle.loads)]
+    for format, encode, decode in formats:
+      start = time.time()
+      encoded = [encode(state) for state in states]
+      encodeTime = time.time() - start
+      start = time.time()
+      for data in encoded:
+        decode(data)
+      decodeTime = time.time() - start
+      size = sum(len(data) for data in encoded) / float(len(states))
+      print('%-20s %-8s %12.1f %12.1f %12.1f' % (name, format, size, encodeTime / len(states) * 1e6,
+                                                decodeTime / len(states) * 1e6))
+
+def benchmarkIsolation(options):
+  """
+  Cost of running a team in a process of its own (isolatedAgents): the
+  time per move of the first red agent called in this process and
+  through its team's process, on the observations of a baseline game,
+  and the time of the messaging alone (a round trip of the observation
+  without the agent), also as a share of the one second move budget.
+  """
+  import capture, isolatedAgents
+  print('%-20s %-10s %8s %12s %12s' % ('layout', 'call', 'moves', 'usec/move', 'of budget'))
+  for name, layout in getLayouts(options):
+    game = playQuietGame(layout, options.red, options.blue, options.length, 0)
+    state = initialState(layout, options.length)
+    startState = state
+    observations = []
+    for agentIndex, action in game.moveHistory:
+      if agentIndex == 0: observations.append(state.makeObservation(0))
+      state = state.generateSuccessor(agentIndex, action)
+
+    util.mutePrint()
+    try:
+      local = capture.loadAgents(True, options.red, True, {})[0]
+      isolated = isolatedAgents.loadIsolatedAgents(True, options.red, {}, mute = True)[0]
+      calls = [('local', local.getAction), ('isolated', isolated.getAction), ('messaging', isolated.ping)]
+      times = []
+      for agent in (local, isolated):
+        agent.registerInitialState(startState.deepCopy())
+      for callName, call in calls:
+        start = time.time()
+        for observation in observations:
+          call(observation)
+        times.append((time.time() - start) / len(observations))
+      isolated.team.stop()
+    finally:
+      util.unmutePrint()
+    moveTime = capture.CaptureRules().getMoveWarningTime(0)
+    for (callName, call), seconds in zip(calls, times):
+      print('%-20s %-10s %8d %12.1f %11.3f%%' % (name, callName, len(observations), seconds * 1e6,
+                                               seconds / moveTime * 100))
+
+def benchmarkBatch(options):
+  """
+  Batched simulation (batchCapture): moves per second of BatchGames.step
+  at several batch sizes, next to GameState.generateSuccessor playing the
+  same random games one at a time (-i sets the moves played).
+  """
+  import batchCapture, stateCodec
+  import numpy as np
+  print('%-20s %-10s %8s %10s %10s %12s' % ('layout', 'engine', 'games', 'moves', 'seconds', 'moves/sec'))
+  for name, layout in getLayouts(options):
+    for batchSize in (1, 16, 256, 4096):
+      games = batchCapture.BatchGames(layout, batchSize, options.length)
+      rng = np.random.default_rng(0)
+      moves, elapsed, agentIndex = 0, 0.0, 0
+      for move in range(options.length):
+        actions = batchCapture.randomActions(games, agentIndex, rng)
+        playing = int((~games.over).sum())
+        start = time.time()
+        games.step(agentIndex, actions)
+        elapsed += time.time() - start
+        moves += playing
+        agentIndex = (agentIndex + 1) % games.numAgents
+      print('%-20s %-10s %8d %10d %10.2f %12.1f' % (name, 'batch', batchSize, moves, elapsed, moves / elapsed))
+
+    games = batchCapture.BatchGames(layout, 16, options.length)
+    states = [games.getGameState(game) for game in range(16)]
+    rng = np.random.default_rng(0)
+    moves, elapsed, agentIndex = 0, 0.0, 0
+    for move in range(options.length):
+      actions = batchCapture.randomActions(games, agentIndex, rng)
+      games.step(agentIndex, actions)
+      start = time.time()
+      for game, state in enumerate(states):
+        if state.isOver(): continue
+        states[game] = state.generateSuccessor(agentIndex, stateCodec.DIRECTIONS[actions[game]])
+        moves += 1
+      elapsed += time.time() - start
+      agentIndex = (agentIndex + 1) % games.numAgents
+    print('%-20s %-10s %8d %10d %10.2f %12.1f' % (name, 'GameState', 16, moves, elapsed, moves / elapsed))
+
+def benchmarkEnv(options):
+  """
+  Reinforcement learning environments (captureEnv): rounds (every agent
+  moving once) and agent moves per second of CaptureEnv and of
+  VectorCaptureEnv with 16 environments, on random legal moves, -n
+  games of -i moves each.
+  """
+  import captureEnv
+  import numpy as np
+  print('%-20s %-10s %8s %10s %10s %12s %12s' % ('layout', 'env', 'envs', 'rounds', 'seconds', 'rounds/sec',
+                                                 'moves/sec'))
+  for name, layout in getLayouts(options):
+    rounds = options.numGames * options.length // 4
+    rng = np.random.default_rng(0)
+    env = captureEnv.CaptureEnv(layout, options.length)
+    observation, info = env.reset(seed = 0)
+    start = time.time()
+    for i in range(rounds):
+      legal = observation['legal']
+      observation, rewards, terminated, truncated, info = env.step(np.argmax(rng.random(legal.shape) * legal, -1))
+      if terminated or truncated: observation, info = env.reset()
+    elapsed = time.time() - start
+    print('%-20s %-10s %8d %10d %10.2f %12.1f %12.1f' % (name, 'single', 1, rounds, elapsed, rounds / elapsed,
+                                                         rounds * 4 / elapsed))
+
+    numEnvs = 16
+    env = captureEnv.VectorCaptureEnv(numEnvs, layout = layout, length = options.length)
+    try:
+      observation, infos = env.reset(seed = 0)
+      start = time.time()
+      for i in range(rounds // numEnvs):
+        legal = observation['legal']
+        observation, rewards, terminated, truncated, infos = env.step(np.argmax(rng.random(legal.shape) * legal, -1))
+      elapsed = time.time() - start
+    finally:
+      env.close()
+    total = rounds // numEnvs * numEnvs
+    print('%-20s %-10s %8d %10d %10.2f %12.1f %12.1f' % (name, 'vector', numEnvs, total, elapsed, total / elapsed,
+                                                         total * 4 / elapsed))
+
+def encodeWithGetters(gameState, index):
+  """
+  The planes of featureEncoder built from the GameState getters on every
+  call, as agents did before FeatureEncoder (the baseline of 'features')
+  """
+  import capture, featureEncoder
+  import numpy as np
+  walls = gameState.getWalls()
+  planes = np.zeros((len(featureEncoder.CHANNELS), walls.width, walls.height), dtype = np.float32)
+  red = gameState.isOnRedTeam(index)
+  planes[featureEncoder.WALLS] = np.array(walls.data, dtype = np.float32)
+  if red: planes[featureEncoder.HOME, :walls.width // 2] = 1
+  else: planes[featureEncoder.HOME, walls.width // 2:] = 1
+  for channel, food in ((featureEncoder.FOOD, gameState.getBlueFood() if red else gameState.getRedFood()),
+                        (featureEncoder.DEFEND_FOOD, gameState.getRedFood() if red else gameState.getBlueFood())):
+    for x, y in food.asList():
+      planes[channel, x, y] = 1
+  for channel, capsules in ((featureEncoder.CAPSULES, gameState.getBlueCapsules() if red else gameState.getRedCapsules()),
+                            (featureEncoder.DEFEND_CAPSULES, gameState.getRedCapsules() if red else gameState.getBlueCapsules())):
+    for x, y in capsules:
+      planes[channel, x, y] = 1
+  for i in range(gameState.getNumAgents()):
+    pos = gameState.getAgentPosition(i)
+    if pos == None: continue
+    agentState = gameState.getAgentState(i)
+    if i == index: channel = featureEncoder.SELF
+    elif gameState.isOnRedTeam(i) == red: channel = featureEncoder.TEAMMATES
+    else: channel = featureEncoder.OPPONENTS
+    planes[channel][pos] = 1
+    if agentState.isPacman: planes[featureEncoder.PACMEN][pos] = 1
+    planes[featureEncoder.SCARED][pos] += agentState.scaredTimer / capture.SCARED_TIME
+    planes[featureEncoder.CARRYING][pos] += agentState.numCarrying
+  return planes
+
+def benchmarkFeatures(options):
+  """
+  Feature planes for learned models (featureEncoder): microseconds per
+  state to encode the observations of agent 0 in a baseline game, and
+  the successors of each of them into one array, with FeatureEncoder
+  and with the getters on every call.
+  """
+  import featureEncoder
+  import numpy as np
+  print('%-20s %-12s %-10s %8s %12s' % ('layout', 'states', 'encoder', 'states', 'usec/state'))
+  for name, layout in getLayouts(options):
+    game = playQuietGame(layout, options.red, options.blue, options.length, 0)
+    state = initialState(layout, options.length)
+    observations = []
+    for agentIndex, action in game.moveHistory:
+      if agentIndex == 0: observations.append(state.makeObservation(0))
+      state = state.generateSuccessor(agentIndex, action)
+    successors = [[observation.generateSuccessor(0, action) for action in observation.getLegalActions(0)]
+                  for observation in observations]
+
+    encoder = featureEncoder.FeatureEncoder(0)
+    encoder.encode(observations[0])
+    batches = [np.empty((len(states), len(featureEncoder.CHANNELS), layout.width, layout.height), dtype = np.float32)
+               for states in successors]
+    runs = [('observations', 'encoder', lambda: [encoder.encode(o) for o in observations], len(observations)),
+            ('observations', 'getters', lambda: [encodeWithGetters(o, 0) for o in observations], len(observations)),
+            ('successors', 'encoder', lambda: [encoder.encodeBatch(states, batch) for states, batch in zip(successors, batches)],
+             sum(map(len, successors))),
+            ('successors', 'getters', lambda: [np.stack([encodeWithGetters(s, 0) for s in states]) for states in successors],
+             sum(map(len, successors)))]
+    for kind, encoderName, run, count in runs:
+      start = time.time()
+      run()
+      elapsed = time.time() - start
+      print('%-20s %-12s %-10s %8d %12.1f' % (name, kind, encoderName, count, elapsed / count * 1e6))
+
+class LegacyCounter(util.Counter):
+  "util.Counter as it was: every read adds the key, and * reads through __getitem__"
+
+  def __getitem__(self, idx):
+    self.setdefault(idx, 0)
+    return dict.__getitem__(self, idx)
+
+  def __mul__(self, y):
+    sum = 0
+    x = self
+    if len(x) > len(y):
+      x,y = y,x
+    for key in x:
+      if key not in y:
+        continue
+      sum += x[key] * y[key]
+    return sum
+
+def shortestPaths(layout, costs, source, indexed):
+  """
+  Dijkstra's algorithm over the cells of layout, entering cell c costing
+  costs[c], with util.IndexedPriorityQueue (decrease-key) or with
+  util.PriorityQueue (pushing cells again and skipping the stale entries).
+  """
+  from game import Actions
+  neighbors = Actions.getActionTable(layout.walls).neighbors
+  height = layout.height
+  distances = {source: 0}
+  done = set()
+  queue = util.IndexedPriorityQueue() if indexed else util.PriorityQueue()
+  queue.push(source, 0)
+  while not queue.isEmpty():
+    cell = queue.pop()
+    if cell in done: continue
+    done.add(cell)
+    distance = distances[cell]
+    for x, y in neighbors[cell]:
+      next = x * height + y
+      if next in done: continue
+      nextDistance = distance + costs[next]
+      if nextDistance < distances.get(next, nextDistance + 1):
+        distances[next] = nextDistance
+        if indexed: queue.update(next, nextDistance)
+        else: queue.push(next, nextDistance)
+  return distances
+
+def benchmarkStructures(options):
+  """
+  util's data structures: Dijkstra's algorithm on the maze (with random
+  costs) with IndexedPriorityQueue and PriorityQueue, features * weights
+  as the baseline agents compute it with util.Counter and the Counter it
+  replaced (LegacyCounter), and the baseline team's time per move on the
+  observations of a game with each Counter.
+  """
+  import capture
+  print('%-20s %-12s %-14s %8s %12s' % ('layout', 'workload', 'structure', 'calls', 'usec/call'))
+  for name, layout in getLayouts(options):
+    rng = random.Random(0)
+    costs = [rng.randint(1, 9) for cell in range(layout.width * layout.height)]
+    sources = [x * layout.height + y for x, y in rng.sample(layout.walls.asList(False), 10)]
+    for structure, indexed in (('indexed', True), ('PriorityQueue', False)):
+      start = time.time()
+      for source in sources:
+        shortestPaths(layout, costs, source, indexed)
+      elapsed = time.time() - start
+      print('%-20s %-12s %-14s %8d %12.1f' % (name, 'dijkstra', structure, len(sources), elapsed / len(sources) * 1e6))
+
+    weights = {'successorScore': 100, 'distanceToFood': -1, 'numInvaders': -1000, 'onDefense': 100,
+               'invaderDistance': -10, 'stop': -100, 'reverse': -2}
+    for structure, counterClass in (('Counter', util.Counter), ('LegacyCounter', LegacyCounter)):
+      features = counterClass()
+      features['successorScore'] = -20
+      features['distanceToFood'] = 7
+      features['onDefense'] = 1
+      calls = 100000
+      start = time.time()
+      for i in range(calls):
+        features * weights
+      elapsed = time.time() - start
+      print('%-20s %-12s %-14s %8d %12.3f' % (name, 'dot product', structure, calls, elapsed / calls * 1e6))
+
+    game = playQuietGame(layout, options.red, options.blue, options.length, 0)
+    state = initialState(layout, options.length)
+    startState = state
+    observations = {0: [], 2: []}
+    for agentIndex, action in game.moveHistory:
+      if agentIndex in observations: observations[agentIndex].append(state.makeObservation(agentIndex))
+      state = state.generateSuccessor(agentIndex, action)
+    counter = util.Counter
+    for structure, counterClass in (('Counter', util.Counter), ('LegacyCounter', LegacyCounter)):
+      util.mutePrint()
+      try:
+        util.Counter = counterClass
+        random.seed(0)
+        agents = capture.loadAgents(True, options.red, True, {})
+        moves, elapsed = 0, 0.0
+        for agent in agents:
+          agent.registerInitialState(startState.deepCopy())
+          start = time.time()
+          for observation in observations[agent.index]:
+            agent.getAction(observation)
+          elapsed += time.time() - start
+          moves += len(observations[agent.index])
+      finally:
+        util.Counter = counter
+        util.unmutePrint()
+      print('%-20s %-12s %-14s %8d %12.1f' % (name, 'agent move', structure, moves, elapsed / moves * 1e6))
+
+BENCHMARKS = {
+  'turns': benchmarkTurns,
+  'successors': benchmarkSuccessors,
+  'distances': benchmarkDistances,
+  'copies': benchmarkCopies,
+  'rollouts': benchmarkRollouts,
+  'codec': benchmarkCodec,
+  'isolation': benchmarkIsolation,
+  'batch': benchmarkBatch,
+  'env': benchmarkEnv,
+  'features': benchmarkFeatures,
+  'structures': benchmarkStructures,
+}
+
+def readCommand( argv ):
+  "Processes the command line used to run the benchmarks."
+  from optparse import OptionParser
+  usageStr = """
+  USAGE:      python benchmark.py <benchmark> [<benchmark> ...] <options>
+  BENCHMARKS: %s
+  """ % ', '.join(sorted(BENCHMARKS))
+  parser = OptionParser(usageStr)
+  parser.add_option('-l', '--layouts', dest='layouts',
+                    help='Comma separated list of layouts to run on [Default: depends on the benchmark]', default=None)
+  parser.add_option('-n', '--numGames', type='int', dest='numGames',
+                    help=default('Number of games (or repetitions) per layout'), default=1)
+  parser.add_option('-i', '--time', type='int', dest='length',
+                    help=default('TIME limit of a game in moves'), default=1200)
+  parser.add_option('-r', '--red', help=default('Red team'), default='baselineTeam')
+  parser.add_option('-b', '--blue', help=default('Blue team'), default='baselineTeam')
+  options, names = parser.parse_args(argv)
+  if len(names) == 0:
+    parser.error('Name at least one benchmark')
+  for name in names:
+    if name not in BENCHMARKS:
+      parser.error('Unknown benchmark "%s"' % name)
+  return names, options
+
+if __name__ == '__main__':
+  names, options = readCommand(sys.argv[1:])
+  for name in names:
+    print('== %s ==' % name)
+    BENCHMARKS[name](options)
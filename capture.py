@@ -55,10 +55,12 @@ from game import Actions
 from util import nearestPoint
 from util import manhattanDistance
 from game import Grid
+from game import BitGrid
 from game import Configuration
 from game import Agent
 from game import reconstituteGrid
 import sys, util, types, time, random, importlib.machinery
+import distanceCalculator
 import keyboardAgents
 
 # If you change these, you won't affect the server, so you can't cheat
@@ -116,8 +118,28 @@ class GameState:
     state.data._agentMoved = agentIndex
     state.data.score += state.data.scoreChange
     state.data.timeleft = self.data.timeleft - 1
+    state.data.updateHash(self.data)
     return state
 
+  def advance( self, agentIndex, action ):
+    """
+    Applies the action to this state itself instead of to a copy, for
+    fast simulation (rollouts).  The state must own all of its data, as a
+    deepCopy does, and the action must be legal: it is not checked.
+    """
+    data = self.data
+    data.scoreChange = 0
+    data._foodEaten = None
+    data._foodAdded = None
+    data._capsuleEaten = None
+    data._hash = None
+    AgentRules.applyAction( self, action, agentIndex, checkLegal = False )
+    AgentRules.checkDeath(self, agentIndex)
+    AgentRules.decrementTimer(data.agentStates[agentIndex])
+    data._agentMoved = agentIndex
+    data.score += data.scoreChange
+    data.timeleft -= 1
+
   def getAgentState(self, index):
     return self.data.agentStates[index]
 
@@ -157,6 +179,14 @@ class GameState:
     """
     return halfGrid(self.data.food, red = False)
 
+  def getRedFoodCount(self):
+    "The number of dots on the red team's side, getRedFood().count() without the grid"
+    return self.data.foodLeft[0]
+
+  def getBlueFoodCount(self):
+    "The number of dots on the blue team's side, getBlueFood().count() without the grid"
+    return self.data.foodLeft[1]
+
   def getRedCapsules(self):
     return halfList(self.data.capsules, self.data.food, red = True)
 
@@ -212,6 +242,16 @@ class GameState:
     else:
       return None
 
+  def getDistanceTable(self):
+    """
+    Returns the maze distances of this layout as a distanceCalculator.DistanceTable,
+    built once per game and shared by all agents.  A state unpickled in
+    another process gets that process's table on the first call.
+    """
+    if self.distanceTable == None and 'layout' in dir(self.data):
+      self.distanceTable = distanceCalculator.getDistanceTable(self.data.layout)
+    return self.distanceTable
+
   def getInitialAgentPosition(self, agentIndex):
     "Returns the initial position of an agent."
     return self.data.layout.agentPositions[agentIndex][1]
@@ -239,9 +279,11 @@ class GameState:
 
       self.teams = prevState.teams
       self.agentDistances = prevState.agentDistances
+      self.distanceTable = prevState.distanceTable
     else:
       self.data = GameStateData()
       self.agentDistances = []
+      self.distanceTable = None
 
   def deepCopy( self ):
     state = GameState( self )
@@ -254,30 +296,58 @@ class GameState:
     state.agentDistances = self.agentDistances[:]
     return state
 
+  def __getstate__(self):
+    # The distance table belongs to the process that built it; it is
+    # large and may be a view of a memory-mapped file, so it is not pickled
+    # (getDistanceTable attaches one again when it is asked for)
+    state = self.__dict__.copy()
+    state['distanceTable'] = None
+    return state
+
   def makeObservation(self, index):
-    state = self.deepCopy()
-
-    # Adds the sonar signal
-    pos = state.getAgentPosition(index)
-    n = state.getNumAgents()
-    distances = [manhattanDistance(pos, state.getAgentPosition(i)) for i in range(n)]
-    state.agentDistances = distances
-
-    # Remove states of distant opponents
-    if index in self.blueTeam:
-      team = self.blueTeam
-      otherTeam = self.redTeam
-    else:
-      otherTeam = self.blueTeam
-      team = self.redTeam
+    """
+    Returns the state as agent index sees it: the sonar distances to all
+    agents are filled in and opponents that no teammate can see are hidden.
 
+    The observation shares only the layout with this state: the agent
+    states, food and capsules are copies the agent may change freely.
+    """
+    state = GameState(self)
+    data = state.data
+    data.agentStates = data.copyAgentStates(data.agentStates)
+    data._ownedAgents = set(range(len(data.agentStates)))
+    data.food = data.food.copy()
+    data._ownsFood = True
+    data.capsules = data.capsules[:]
+    data._ownsCapsules = True
+    data._agentMoved = self.data._agentMoved
+    data._foodEaten = self.data._foodEaten
+    data._foodAdded = self.data._foodAdded
+    data._capsuleEaten = self.data._capsuleEaten
+
+    # Positions of all agents, then the sonar distances and the
+    # visibility of each opponent in one pass over them
+    agentStates = self.data.agentStates
+    positions = []
+    for agentState in agentStates:
+      x, y = agentState.configuration.pos
+      positions.append( (int(x), int(y)) )
+    x, y = positions[index]
+    state.agentDistances = [abs(x - ex) + abs(y - ey) for ex, ey in positions]
+
+    if self.teams[index]:
+      team, otherTeam = self.redTeam, self.blueTeam
+    else:
+      team, otherTeam = self.blueTeam, self.redTeam
     for enemy in otherTeam:
+      ex, ey = positions[enemy]
       seen = False
-      enemyPos = state.getAgentPosition(enemy)
       for teammate in team:
-        if util.manhattanDistance(enemyPos, state.getAgentPosition(teammate)) <= SIGHT_RANGE:
+        tx, ty = positions[teammate]
+        if abs(ex - tx) + abs(ey - ty) <= SIGHT_RANGE:
           seen = True
-      if not seen: state.data.agentStates[enemy].configuration = None
+          break
+      if not seen: data.agentStates[enemy].configuration = None
     return state
 
   def __eq__( self, other ):
@@ -293,6 +363,14 @@ class GameState:
     """
     return int(hash( self.data ))
 
+  def getZobristHash( self ):
+    """
+    Returns the full 64 bit hash of the state.  Successors of a hashed
+    state are hashed incrementally, so keying a transposition table on
+    this costs a few operations per state.
+    """
+    return self.data.getZobristHash()
+
   def __str__( self ):
 
     return str(self.data)
@@ -310,6 +388,23 @@ class GameState:
     #However, if layout map is specified otherwise, it could be less
     global TOTAL_FOOD
     TOTAL_FOOD = layout.totalFood
+    self.countFood()
+
+  def countFood(self):
+    """
+    Sets the team food counters of the state (see GameStateData) from its
+    food grid and agent states.  The rules keep them up to date from then
+    on; code that builds or edits a state by hand calls this afterwards.
+    """
+    data = self.data
+    data.foodLeft = (halfGrid(data.food, True).count(), halfGrid(data.food, False).count())
+    returned, carried = [0, 0], [0, 0]
+    for index, agentState in enumerate(data.agentStates):
+      team = 0 if self.isOnRedTeam(index) else 1
+      returned[team] += agentState.numReturned
+      carried[team] += agentState.numCarrying
+    data.foodReturned = tuple(returned)
+    data.foodCarried = tuple(carried)
 
   def isRed(self, configOrPos):
     width = self.data.layout.width
@@ -318,8 +413,25 @@ class GameState:
     else:
       return configOrPos.pos[0] < width // 2
 
+def addForTeam(counts, isRed, amount):
+  "The (red, blue) pair counts with amount added to the count of one team"
+  if isRed: return (counts[0] + amount, counts[1])
+  return (counts[0], counts[1] + amount)
+
+# The bitboard masks of the red and blue halves, by (width, height)
+_halfMasks = {}
+
 def halfGrid(grid, red):
   halfway = grid.width // 2
+  if isinstance(grid, BitGrid):
+    # Mask the bitboard instead of copying cell by cell
+    key = (grid.width, grid.height)
+    if key not in _halfMasks:
+      _halfMasks[key] = (grid.getMask(0, halfway), grid.getMask(halfway, grid.width))
+    halfgrid = BitGrid(grid.width, grid.height, False)
+    halfgrid.bits = grid.bits & _halfMasks[key][0 if red else 1]
+    return halfgrid
+
   halfgrid = Grid(grid.width, grid.height, False)
   if red:    xrange = list(range(halfway))
   else:       xrange = list(range(halfway, grid.width))
@@ -358,39 +470,40 @@ class CaptureRules:
   def newGame( self, layout, agents, display, length, muteAgents, catchExceptions ):
     initState = GameState()
     initState.initialize( layout, len(agents) )
+    # One table of maze distances per game, handed to the agents through the state
+    initState.distanceTable = distanceCalculator.getDistanceTable(layout)
     starter = random.randint(0,1)
     print(('%s team starts' % ['Red', 'Blue'][starter]))
     game = Game(agents, display, self, startingIndex=starter, muteAgents=muteAgents, catchExceptions=catchExceptions)
     game.state = initState
+    game.distanceTable = initState.distanceTable
     game.length = length
     game.state.data.timeleft = length
     if 'drawCenterLine' in dir(display):
       display.drawCenterLine()
-    self._initBlueFood = initState.getBlueFood().count()
-    self._initRedFood = initState.getRedFood().count()
+    self._initBlueFood = initState.getBlueFoodCount()
+    self._initRedFood = initState.getRedFoodCount()
     return game
 
+  def endIfTimeUp(state, movesPlayed, length):
+    "Ends the game once length moves have been played"
+    if movesPlayed == length:
+      state.data._win = True
+  endIfTimeUp = staticmethod( endIfTimeUp )
+
   def process(self, state, game):
     """
     Checks to see whether it is time to end the game.
     """
     if 'moveHistory' in dir(game):
-      if len(game.moveHistory) == game.length:
-        state.data._win = True
+      CaptureRules.endIfTimeUp(state, len(game.moveHistory), game.length)
 
     if state.isOver():
       game.gameOver = True
       if not game.rules.quiet:
-        redCount = 0
-        blueCount = 0
+        redCount, blueCount = state.data.foodReturned
         foodToWin = (TOTAL_FOOD//2) - MIN_FOOD
-        for index in range(state.getNumAgents()):
-          agentState = state.data.agentStates[index]
-          if index in state.getRedTeamIndices():
-            redCount += agentState.numReturned
-          else:
-            blueCount += agentState.numReturned
-        
+
         if blueCount >= foodToWin:#state.getRedFood().count() == MIN_FOOD:
           print('The Blue team has returned at least %d of the opponents\' dots.' % foodToWin)
         elif redCount >= foodToWin:#state.getBlueFood().count() == MIN_FOOD:
@@ -404,9 +517,9 @@ class CaptureRules:
             print('The %s team wins by %d points.' % (winner, abs(state.data.score)))
 
   def getProgress(self, game):
-    blue = 1.0 - (game.state.getBlueFood().count() / float(self._initBlueFood))
-    red = 1.0 - (game.state.getRedFood().count() / float(self._initRedFood))
-    moves = len(self.moveHistory) / float(game.length)
+    blue = 1.0 - (game.state.getBlueFoodCount() / float(self._initBlueFood))
+    red = 1.0 - (game.state.getRedFoodCount() / float(self._initRedFood))
+    moves = len(game.moveHistory) / float(game.length)
 
     # return the most likely progress indicator, clamped to [0, 1]
     return min(max(0.75 * max(red, blue) + 0.25 * moves, 0.0), 1.0)
@@ -419,6 +532,14 @@ class CaptureRules:
       print("Blue agent crashed", file=sys.stderr)
       game.state.data.score = 1
 
+  def getDistanceMetrics(self, game):
+    """
+    Returns the cell count, memory in bytes, construction time in seconds
+    and source ('computed' or 'disk') of the game's maze distance table.
+    """
+    if 'distanceMetrics' in dir(game): return game.distanceMetrics  # A GameRecord
+    return game.distanceTable.getMetrics()
+
   def getMaxTotalTime(self, agentIndex):
     return 900  # Move limits should prevent this from ever happening
 
@@ -443,27 +564,37 @@ class AgentRules:
     """
     Returns a list of legal actions (which are both possible & allowed)
     """
-    agentState = state.getAgentState(agentIndex)
+    return list( AgentRules.getLegalActionTuple( state, agentIndex ) )
+  getLegalActions = staticmethod( getLegalActions )
+
+  def getLegalActionTuple( state, agentIndex ):
+    """
+    The legal actions as a tuple, looked up in the layout's action table.
+    The tuple is shared, so callers must not change it.
+    """
+    agentState = state.data.agentStates[agentIndex]
     conf = agentState.configuration
-    possibleActions = Actions.getPossibleActions( conf, state.data.layout.walls )
+    possibleActions = Actions.getPossibleActionTuple( conf, state.data.layout.walls )
     return AgentRules.filterForAllowedActions( agentState, possibleActions)
-  getLegalActions = staticmethod( getLegalActions )
+  getLegalActionTuple = staticmethod( getLegalActionTuple )
 
   def filterForAllowedActions(agentState, possibleActions):
     return possibleActions
   filterForAllowedActions = staticmethod( filterForAllowedActions )
 
 
-  def applyAction( state, action, agentIndex ):
+  def applyAction( state, action, agentIndex, checkLegal = True ):
     """
-    Edits the state to reflect the results of the action.
+    Edits the state to reflect the results of the action.  Callers that
+    already know the action is legal may pass checkLegal=False.
     """
-    legal = AgentRules.getLegalActions( state, agentIndex )
-    if action not in legal:
-      raise Exception("Illegal action " + str(action))
+    if checkLegal:
+      legal = AgentRules.getLegalActionTuple( state, agentIndex )
+      if action not in legal:
+        raise Exception("Illegal action " + str(action))
 
     # Update Configuration
-    agentState = state.data.agentStates[agentIndex]
+    agentState = state.data.getMutableAgentState(agentIndex)
     speed = 1.0
     # if agentState.isPacman: speed = 0.5
     vector = Actions.directionToVector( action, speed )
@@ -481,22 +612,21 @@ class AgentRules:
       # if he's no longer pacman, he's on his own side, so reset the num carrying timer
       #agentState.numCarrying *= int(agentState.isPacman)
       if agentState.numCarrying > 0 and not agentState.isPacman:
-        score = agentState.numCarrying if isRed else -1*agentState.numCarrying
-        state.data.scoreChange += score
+        carried = agentState.numCarrying
+        score = carried if isRed else -1*carried
+        data = state.data
+        data.scoreChange += score
 
-        agentState.numReturned += agentState.numCarrying
+        agentState.numReturned += carried
         agentState.numCarrying = 0
-
-        redCount = 0
-        blueCount = 0
-        for index in range(state.getNumAgents()):
-          agentState = state.data.agentStates[index]
-          if index in state.getRedTeamIndices():
-            redCount += agentState.numReturned
-          else:
-            blueCount += agentState.numReturned
-        if redCount >= (TOTAL_FOOD//2) - MIN_FOOD or blueCount >= (TOTAL_FOOD//2) - MIN_FOOD:
-          state.data._win = True
+        data.foodReturned = addForTeam(data.foodReturned, isRed, carried)
+        data.foodCarried = addForTeam(data.foodCarried, isRed, -carried)
+        if max(data.foodReturned) >= (TOTAL_FOOD//2) - MIN_FOOD:
+          data._win = True
+        # The eating check below has always looked at the last agent here
+        # (the loop that added up numReturned left agentState pointing at
+        # it), and games are kept playing out as they did
+        agentState = data.agentStates[-1]
 
 
     if agentState.isPacman and manhattanDistance( nearest, next ) <= 0.9 :
@@ -518,16 +648,16 @@ class AgentRules:
         teamIndicesFunc = state.getRedTeamIndices
 
       # go increase the variable for the pacman who ate this
-      agents = [state.data.agentStates[agentIndex] for agentIndex in teamIndicesFunc()]
-      for agent in agents:
-        if agent.getPosition() == position:
-          agent.numCarrying += 1
+      for agentIndex in teamIndicesFunc():
+        if state.data.agentStates[agentIndex].getPosition() == position:
+          state.data.getMutableAgentState(agentIndex).numCarrying += 1
+          state.data.foodCarried = addForTeam(state.data.foodCarried, isRed, 1)
           break # the above should only be true for one agent...
 
       # do all the score and food grid maintainenace 
       #state.data.scoreChange += score
-      state.data.food = state.data.food.copy()
-      state.data.food[x][y] = False
+      state.data.getMutableFood()[x][y] = False
+      state.data.foodLeft = addForTeam(state.data.foodLeft, state.isRed(position), -1)
       state.data._foodEaten = position
       #if (isRed and state.getBlueFood().count() == MIN_FOOD) or (not isRed and state.getRedFood().count() == MIN_FOOD):
       #  state.data._win = True
@@ -536,21 +666,21 @@ class AgentRules:
     if isRed: myCapsules = state.getBlueCapsules()
     else: myCapsules = state.getRedCapsules()
     if( position in myCapsules ):
-      state.data.capsules.remove( position )
+      state.data.getMutableCapsules().remove( position )
       state.data._capsuleEaten = position
 
       # Reset all ghosts' scared timers
       if isRed: otherTeam = state.getBlueTeamIndices()
       else: otherTeam = state.getRedTeamIndices()
       for index in otherTeam:
-        state.data.agentStates[index].scaredTimer = SCARED_TIME
+        state.data.getMutableAgentState(index).scaredTimer = SCARED_TIME
 
   consume = staticmethod( consume )
 
   def decrementTimer(state):
     timer = state.scaredTimer
     if timer == 1:
-      state.configuration.pos = nearestPoint( state.configuration.pos )
+      state.configuration = Configuration( nearestPoint( state.configuration.pos ), state.configuration.direction )
     state.scaredTimer = max( 0, timer - 1 )
   decrementTimer = staticmethod( decrementTimer )
 
@@ -617,7 +747,7 @@ class AgentRules:
       return True
 
     numToDump = agentState.numCarrying
-    state.data.food = state.data.food.copy()
+    state.data.getMutableFood()
     foodAdded = []
 
     def genSuccessors(x, y):
@@ -648,6 +778,13 @@ class AgentRules:
       # generate successors
       positionQueue = positionQueue + genSuccessors(x, y)
 
+    # The food goes to the side the Pacman died on, and the Pacman is on the other team
+    state.data.foodLeft = addForTeam(state.data.foodLeft, isRed, len(foodAdded))
+    state.data.foodCarried = addForTeam(state.data.foodCarried, not isRed, -agentState.numCarrying)
+
+    # Two pacmen can die on the same move, so keep the earlier dump
+    if state.data._foodAdded != None:
+      foodAdded = state.data._foodAdded + foodAdded
     state.data._foodAdded = foodAdded
     # now our agentState is no longer carrying food
     agentState.numCarrying = 0
@@ -656,6 +793,7 @@ class AgentRules:
   dumpFoodFromDeath = staticmethod(dumpFoodFromDeath)
 
   def checkDeath( state, agentIndex):
+    # Agent states are only copied (see GameStateData) once a collision changes them
     agentState = state.data.agentStates[agentIndex]
     if state.isOnRedTeam(agentIndex):
       otherTeam = state.getBlueTeamIndices()
@@ -670,6 +808,7 @@ class AgentRules:
         if manhattanDistance( ghostPosition, agentState.getPosition() ) <= COLLISION_TOLERANCE:
           # award points to the other team for killing Pacmen
           if otherAgentState.scaredTimer <= 0:
+            agentState = state.data.getMutableAgentState(agentIndex)
             AgentRules.dumpFoodFromDeath(state, agentState, agentIndex)
 
             score = KILL_POINTS
@@ -684,6 +823,7 @@ class AgentRules:
             if state.isOnRedTeam(agentIndex):
               score = -score
             state.data.scoreChange += score
+            otherAgentState = state.data.getMutableAgentState(index)
             otherAgentState.isPacman = False
             otherAgentState.configuration = otherAgentState.start
             otherAgentState.scaredTimer = 0
@@ -696,6 +836,7 @@ class AgentRules:
         if manhattanDistance( pacPos, agentState.getPosition() ) <= COLLISION_TOLERANCE:
           #award points to the other team for killing Pacmen
           if agentState.scaredTimer <= 0:
+            otherAgentState = state.data.getMutableAgentState(index)
             AgentRules.dumpFoodFromDeath(state, otherAgentState, agentIndex)
 
             score = KILL_POINTS
@@ -710,6 +851,7 @@ class AgentRules:
             if state.isOnRedTeam(agentIndex):
               score = -score
             state.data.scoreChange += score
+            agentState = state.data.getMutableAgentState(agentIndex)
             agentState.isPacman = False
             agentState.configuration = agentState.start
             agentState.scaredTimer = 0
@@ -784,6 +926,8 @@ def readCommand( argv ):
 
   parser.add_option('-z', '--zoom', type='float', dest='zoom',
                     help=default('Zoom in the graphics'), default=1)
+  parser.add_option('--delay-step', type='float', dest='delay_step',
+                    help=default('Minimum time in seconds each move stays on screen (graphics only)'), default=0.01)
   parser.add_option('-i', '--time', type='int', dest='time',
                     help=default('TIME limit of a game in moves'), default=1200, metavar='TIME')
   parser.add_option('-n', '--numGames', type='int',
@@ -798,6 +942,14 @@ def readCommand( argv ):
                     help=default('How many episodes are training (suppresses output)'), default=0)
   parser.add_option('-c', '--catchExceptions', action='store_true', default=False,
                     help='Catch exceptions and enforce time limits')
+  parser.add_option('--distance-cache', dest='distance_cache', metavar='DIR',
+                    help='Keep computed maze distances in DIR and reuse them across runs', default=None)
+  parser.add_option('-w', '--workers', type='int', dest='workers',
+                    help=default('Number of processes to play games in parallel (requires -q or -Q)'), default=1)
+  parser.add_option('--profile-turns', dest='profile_turns', metavar='FILE', default=None,
+                    help='Write the time each turn spends in each phase of the game to FILE (CSV if it ends in .csv, else JSON lines) and print a summary')
+  parser.add_option('--isolate', action='store_true', default=False,
+                    help='Run each team in a process of its own, which is stopped if it crashes or runs out of time (implies -c)')
 
   options, otherjunk = parser.parse_args(argv)
   assert len(otherjunk) == 0, "Unrecognized options: " + str(otherjunk)
@@ -821,7 +973,7 @@ def readCommand( argv ):
     import captureGraphicsDisplay
     # Hack for agents writing to the display
     captureGraphicsDisplay.FRAME_TIME = 0
-    args['display'] = captureGraphicsDisplay.PacmanGraphics(options.red, options.blue, options.zoom, 0, capture=True)
+    args['display'] = captureGraphicsDisplay.PacmanGraphics(options.red, options.blue, options.zoom, 0, capture=True, delayStep=options.delay_step)
     import __main__
     __main__.__dict__['_display'] = args['display']
 
@@ -831,11 +983,15 @@ def readCommand( argv ):
 
   if options.fixRandomSeed: random.seed('cs188')
 
+  if options.distance_cache:
+    import distanceCalculator
+    distanceCalculator.setCacheDirectory(options.distance_cache)
+
   # Special case: recorded games don't use the runGames method or args structure
   if options.replay != None:
     print('Replaying recorded game %s.' % options.replay)
-    import pickle
-    recorded = pickle.load(open(options.replay))
+    import captureReplay
+    recorded = captureReplay.loadReplay(options.replay)
     recorded['display'] = args['display']
     replayGame(**recorded)
     sys.exit(0)
@@ -846,11 +1002,25 @@ def readCommand( argv ):
     redArgs['numTraining'] = options.numTraining
     blueArgs['numTraining'] = options.numTraining
   nokeyboard = options.textgraphics or options.quiet or options.numTraining > 0
-  print('\nRed team %s with %s:' % (options.red, redArgs))
-  redAgents = loadAgents(True, options.red, nokeyboard, redArgs)
-  print('\nBlue team %s with %s:' % (options.blue, blueArgs))
-  blueAgents = loadAgents(False, options.blue, nokeyboard, blueArgs)
-  args['agents'] = sum([list(el) for el in zip(redAgents, blueAgents)],[]) # list of agents
+
+  # Parallel games load their own copies of the teams in each worker
+  # process, so the teams are only loaded here for serial games
+  if options.workers > 1:
+    if not (options.quiet or options.super_quiet):
+      raise Exception('Parallel games (--workers) can only be played with -q or -Q')
+    if options.keys0 or options.keys1 or options.keys2 or options.keys3:
+      raise Exception('Keyboard agents cannot be used in parallel games')
+    print('\nRed team %s with %s, blue team %s with %s, in %d worker processes'
+          % (options.red, redArgs, options.blue, blueArgs, options.workers))
+    args['agents'] = None
+    args['workers'] = options.workers
+    args['teams'] = (options.red, redArgs, options.blue, blueArgs, options.isolate)
+  else:
+    print('\nRed team %s with %s:' % (options.red, redArgs))
+    redAgents = loadTeam(True, options.red, nokeyboard, redArgs, options.isolate, options.super_quiet)
+    print('\nBlue team %s with %s:' % (options.blue, blueArgs))
+    blueAgents = loadTeam(False, options.blue, nokeyboard, blueArgs, options.isolate, options.super_quiet)
+    args['agents'] = sum([list(el) for el in zip(redAgents, blueAgents)],[]) # list of agents
 
   numKeyboardAgents = 0
   for index, val in enumerate([options.keys0, options.keys1, options.keys2, options.keys3]):
@@ -885,7 +1055,8 @@ def readCommand( argv ):
   args['numGames'] = options.numGames
   args['numTraining'] = options.numTraining
   args['record'] = options.record
-  args['catchExceptions'] = options.catchExceptions
+  args['catchExceptions'] = options.catchExceptions or options.isolate
+  args['profileFile'] = options.profile_turns
   return args
 
 def randomLayout(seed = None):
@@ -896,6 +1067,13 @@ def randomLayout(seed = None):
   import mazeGenerator
   return mazeGenerator.generateMaze(seed)
 
+def loadTeam(isRed, factory, textgraphics, cmdLineArgs, isolate = False, mute = False):
+  "The agents of a team, run in a process of their own if isolate is set"
+  if isolate:
+    import isolatedAgents
+    return isolatedAgents.loadIsolatedAgents(isRed, factory, cmdLineArgs, mute)
+  return loadAgents(isRed, factory, textgraphics, cmdLineArgs)
+
 import traceback
 def loadAgents(isRed, factory, textgraphics, cmdLineArgs):
   "Calls agent factories and returns lists of agents"
@@ -951,7 +1129,7 @@ def replayGame( layout, agents, actions, display, length, redTeamName, blueTeamN
 
     display.finish()
 
-def runGames( layouts, agents, display, length, numGames, record, numTraining, redTeamName, blueTeamName, muteAgents=False, catchExceptions=False ):
+def runGames( layouts, agents, display, length, numGames, record, numTraining, redTeamName, blueTeamName, muteAgents=False, catchExceptions=False, workers=1, teams=None, profileFile=None ):
 
   rules = CaptureRules()
   games = []
@@ -959,32 +1137,42 @@ def runGames( layouts, agents, display, length, numGames, record, numTraining, r
   if numTraining > 0:
     print('Playing %d training games' % numTraining)
 
-  for i in range( numGames ):
+  # Every game gets its own seed so that its outcome does not depend on
+  # the games played before it (or on which worker process plays it)
+  seeds = [random.randint(0, 2**31 - 1) for i in range(numGames)]
+
+  # Games are streamed to replay-<index> files as they are played
+  replayInfo = None
+  if record:
+    replayInfo = {'length': length, 'redTeamName': redTeamName, 'blueTeamName': blueTeamName}
+
+  # Turn timings are kept with each game and written out once it ends;
+  # the distance table of each layout is reported with them
+  profile = profileFile != None
+  if profile:
+    import turnProfiler
+    profiled = []
+    distanceMetrics = {}
+
+  if workers > 1:
+    played = playGamesInParallel(layouts, seeds, length, numTraining, muteAgents, catchExceptions, workers, teams, replayInfo, profile)
+  else:
+    played = playGames(rules, layouts, seeds, agents, display, length, numTraining, muteAgents, catchExceptions, replayInfo, profile)
+
+  for i, g in played:
     beQuiet = i < numTraining
-    layout = layouts[i]
-    if beQuiet:
-        # Suppress output and graphics
-        import textDisplay
-        gameDisplay = textDisplay.NullGraphics()
-        rules.quiet = True
-    else:
-        gameDisplay = display
-        rules.quiet = False
-    g = rules.newGame( layout, agents, gameDisplay, length, muteAgents, catchExceptions )
-    g.run()
     if not beQuiet: games.append(g)
+    if profile:
+      turnProfiler.writeRecords(profileFile, [(i, g.profiler)], append = i > 0)
+      if not beQuiet: profiled.append(g.profiler)
+      gameLayout = g.state.data.layout
+      if gameLayout.layoutId not in distanceMetrics:
+        distanceMetrics[gameLayout.layoutId] = (gameLayout.width, gameLayout.height, rules.getDistanceMetrics(g))
 
     g.record = None
     if record:
-      import time, pickle, game
-      #fname = ('recorded-game-%d' % (i + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
-      #f = file(fname, 'w')
-      components = {'layout': layout, 'agents': [game.Agent() for a in agents], 'actions': g.moveHistory, 'length': length, 'redTeamName': redTeamName, 'blueTeamName':blueTeamName }
-      #f.close()
       print("recorded")
-      g.record = pickle.dumps(components)
-      with open('replay-%d'%i,'wb') as f:
-        f.write(g.record)
+      g.record = 'replay-%d' % i
 
   if numGames > 1:
     scores = [game.state.data.score for game in games]
@@ -995,8 +1183,113 @@ def runGames( layouts, agents, display, length, numGames, record, numTraining, r
     print('Red Win Rate:  %d/%d (%.2f)' % ([s > 0 for s in scores].count(True), len(scores), redWinRate))
     print('Blue Win Rate: %d/%d (%.2f)' % ([s < 0 for s in scores].count(True), len(scores), blueWinRate))
     print('Record:       ', ', '.join([('Blue', 'Tie', 'Red')[max(0, min(2, 1 + s))] for s in scores]))
+  if profile and profiled:
+    print('Turn timings (written to %s):' % profileFile)
+    turnProfiler.printSummary(profiled)
+  if profile:
+    print('Distance tables:')
+    for width, height, metrics in distanceMetrics.values():
+      print('  %dx%d layout: %d cells, %d KB, %s in %.3f s' % (width, height, metrics['cells'], metrics['bytes'] // 1024,
+                                                             metrics['source'], metrics['buildTime']))
   return games
 
+def playGames( rules, layouts, seeds, agents, display, length, numTraining, muteAgents, catchExceptions, replayInfo = None, profile = False ):
+  """
+  Plays the games one after another in this process, yielding (index, game)
+  pairs.  If replayInfo is given, game i is recorded to replay-i with it as
+  the replay's metadata; if profile is set, every game gets a TurnProfiler.
+  """
+  for i in range( len(seeds) ):
+    beQuiet = i < numTraining
+    if beQuiet:
+        # Suppress output and graphics
+        import textDisplay
+        gameDisplay = textDisplay.NullGraphics()
+        rules.quiet = True
+    else:
+        gameDisplay = display
+        rules.quiet = False
+    random.seed(seeds[i])
+    g = rules.newGame( layouts[i], agents, gameDisplay, length, muteAgents, catchExceptions )
+    playRecorded(g, i, replayInfo, profile)
+    yield i, g
+
+def playRecorded( game, index, replayInfo, profile = False ):
+  """
+  Runs game, streaming it to replay-<index> if replayInfo is given and
+  timing its turns if profile is set
+  """
+  if profile:
+    import turnProfiler
+    game.profiler = turnProfiler.TurnProfiler()
+  if replayInfo == None:
+    game.run()
+    return
+  import captureReplay
+  captureReplay.recordGame(game, 'replay-%d' % index, replayInfo)
+  try:
+    game.run()
+  finally:
+    captureReplay.finishRecording(game)
+
+class GameRecord:
+  """
+  The outcome of a game played in a worker process.  It carries the
+  parts of a Game that runGames reads (the final state and the move
+  history), so it can stand in for the Game in the list runGames returns.
+  """
+  def __init__( self, index, seed, game ):
+    self.index = index
+    self.seed = seed
+    self.state = game.state
+    self.moveHistory = game.moveHistory
+    self.length = game.length
+    self.agentCrashed = game.agentCrashed
+    self.agentTimeout = game.agentTimeout
+    self.totalAgentTimes = game.totalAgentTimes
+    self.profiler = game.profiler
+    self.distanceMetrics = game.distanceTable.getMetrics()
+
+# Per-process state of the parallel game workers
+_workerAgents = None
+
+def _initWorker( teams ):
+  "Loads both teams once per worker process; game output is suppressed"
+  global _workerAgents
+  util.mutePrint()
+  red, redArgs, blue, blueArgs, isolate = teams
+  redAgents = loadTeam(True, red, True, redArgs, isolate, True)
+  blueAgents = loadTeam(False, blue, True, blueArgs, isolate, True)
+  _workerAgents = sum([list(el) for el in zip(redAgents, blueAgents)],[])
+
+def _playWorkerGame( index, layout, seed, length, beQuiet, muteAgents, catchExceptions, replayInfo, profile ):
+  import textDisplay
+  rules = CaptureRules(quiet = beQuiet)
+  random.seed(seed)
+  g = rules.newGame( layout, _workerAgents, textDisplay.NullGraphics(), length, muteAgents, catchExceptions )
+  playRecorded(g, index, replayInfo, profile)
+  return GameRecord(index, seed, g)
+
+def playGamesInParallel( layouts, seeds, length, numTraining, muteAgents, catchExceptions, workers, teams, replayInfo = None, profile = False ):
+  """
+  Plays the games in a pool of worker processes, yielding (index, record)
+  pairs in index order.  Results are reported as soon as each game ends.
+  """
+  from concurrent.futures import ProcessPoolExecutor, as_completed
+  numGames = len(seeds)
+  results = {}
+  with ProcessPoolExecutor(max_workers=workers, initializer=_initWorker, initargs=(teams,)) as pool:
+    futures = [pool.submit(_playWorkerGame, i, layouts[i], seeds[i], length, i < numTraining, muteAgents, catchExceptions, replayInfo, profile)
+               for i in range(numGames)]
+    for done, future in enumerate(as_completed(futures)):
+      record = future.result()
+      score = record.state.data.score
+      print('Game %d/%d finished (%d done): %s, score %d' % (record.index + 1, numGames, done + 1,
+            ('Blue wins', 'Tie', 'Red wins')[max(0, min(2, 1 + score))], score))
+      results[record.index] = record
+  for i in range(numGames):
+    yield i, results[i]
+
 def save_score(game):
     with open('score', 'w') as f:
         print(game.state.data.score, file=f)
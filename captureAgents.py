@@ -97,9 +97,12 @@ class CaptureAgent(Agent):
     A distanceCalculator instance caches the maze distances
     between each pair of positions, so your agents can use:
     self.distancer.getDistance(p1, p2)
+
+    The game computes the distance table once and shares it between
+    all agents, so this costs next to nothing.
     """
     self.red = gameState.isOnRedTeam(self.index)
-    self.distancer = distanceCalculator.Distancer(gameState.data.layout)
+    self.distancer = distanceCalculator.Distancer(gameState.data.layout, table=gameState.getDistanceTable())
 
     # comment this out to forgo maze distance computation and use manhattan distances
     self.distancer.getMazeDistances()
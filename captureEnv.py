@@ -0,0 +1,376 @@
+# captureEnv.py
+# -------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  Capture games as reinforcement learning environments, Gym style
+  (requires NumPy).
+
+  CaptureEnv plays one game with reset and step instead of Game.run:
+
+    env = CaptureEnv(agents = capture.loadAgents(False, 'baselineTeam', True, {}), ...)
+    observation, info = env.reset('defaultCapture', seed = 1)
+    while True:
+      observation, rewards, terminated, truncated, info = env.step(actions)
+      if terminated or truncated: break
+
+  step(actions) plays a round: every agent moves once, in turn order from
+  the agent that started the game, by its entry of actions (numbered as
+  in stateCodec.DIRECTIONS: North, South, East, West, Stop).  Agents can
+  instead be played by Agent objects, as in a game, given as agents
+  (indexed by agent, None for the agents actions plays).  rewards are
+  the changes in score over the round, for each agent's team.
+
+  An observation is what each agent may see (as GameState.makeObservation
+  shows it), as a dict of arrays of fixed shapes:
+
+    planes   [agents, CHANNELS, width, height] 0/1, from the agent's side
+    agents   [agents, agents, FEATURES], each agent as the agent sees it
+    legal    [agents, actions], the agent's legal actions
+    game     [agents, GAME_FEATURES], its team's score and the time left
+
+  Layouts smaller than shape are padded with walls.  The arrays are
+  filled in place: an observation is only good until the next step, so
+  copy what you keep.  VectorCaptureEnv steps many environments in worker
+  processes, which write their observations to shared memory.
+"""
+
+from layout import loadLayout
+import capture, distanceCalculator, featureEncoder, stateCodec
+import multiprocessing, random, signal, traceback
+import numpy as np
+
+CHANNELS = ('walls', 'food', 'defendFood', 'capsules', 'defendCapsules', 'home', 'self', 'teammates', 'opponents')
+WALLS, FOOD, DEFEND_FOOD, CAPSULES, DEFEND_CAPSULES, HOME, SELF, TEAMMATES, OPPONENTS = range(len(CHANNELS))
+
+# Features of each agent; X and Y are -1 and VISIBLE 0 for hidden agents
+FEATURES = ('x', 'y', 'visible', 'pacman', 'scared', 'carrying', 'returned', 'distance')
+X, Y, VISIBLE, PACMAN, SCARED, CARRYING, RETURNED, DISTANCE = range(len(FEATURES))
+
+GAME_FEATURES = ('score', 'timeleft')
+SCORE, TIMELEFT = range(len(GAME_FEATURES))
+
+NUM_ACTIONS = len(stateCodec.DIRECTIONS)
+
+def observationSpace(numAgents, shape):
+  "{name: (shape, dtype)} of the arrays of an observation"
+  width, height = shape
+  return {'planes': ((numAgents, len(CHANNELS), width, height), np.uint8),
+          'agents': ((numAgents, numAgents, len(FEATURES)), np.int16),
+          'legal': ((numAgents, NUM_ACTIONS), np.bool_),
+          'game': ((numAgents, len(GAME_FEATURES)), np.int32)}
+
+def getLayout(name, seed = None):
+  "A layout by name (RANDOM for a maze generated from seed), or the layout itself"
+  if not isinstance(name, str): return name
+  if name == 'RANDOM':
+    name = 'RANDOM%d' % (seed if seed != None else random.randint(0, 99999999))
+  return loadLayout(name)
+
+class CaptureEnv:
+  """
+  One capture game at a time (see the module docstring).  shape is the
+  (width, height) of observation planes, by default that of layout;
+  buffers are arrays to fill with observations instead of new ones, as
+  observationSpace gives them.
+  """
+
+  def __init__(self, layout = 'defaultCapture', length = 1200, agents = None, shape = None,
+               numAgents = 4, buffers = None):
+    self.layout = getLayout(layout)
+    self.length = length
+    self.numAgents = numAgents
+    self.agents = list(agents) if agents != None else [None] * numAgents
+    if len(self.agents) != numAgents:
+      raise ValueError('agents must have an entry (or None) for each of the %d agents' % numAgents)
+    self.shape = tuple(shape) if shape != None else (self.layout.width, self.layout.height)
+    space = observationSpace(numAgents, self.shape)
+    if buffers == None:
+      buffers = dict((name, np.zeros(size, dtype = dtype)) for name, (size, dtype) in space.items())
+    self.observation = buffers
+    self.state = None
+
+  def reset(self, layout = None, seed = None):
+    """
+    Starts a game on layout (a name or a Layout; the last one by default),
+    seeding random, which the starting team and agents draw from, with
+    seed if one is given.  Returns the first observation and an info dict.
+    """
+    if seed != None: random.seed(seed)
+    if layout != None: self.layout = getLayout(layout, seed)
+    layout = self.layout
+    self.planes = featureEncoder.getLayoutPlanes(layout, self.shape)
+    state = capture.GameState()
+    state.initialize(layout, self.numAgents)
+    state.distanceTable = distanceCalculator.getDistanceTable(layout)
+    state.data.timeleft = self.length
+    self.state = state
+    self.startingIndex = random.randint(0, 1)
+    self.isRed = np.array([state.isOnRedTeam(i) for i in range(self.numAgents)])
+    self.teams = {True: np.nonzero(self.isRed)[0], False: np.nonzero(~self.isRed)[0]}
+    self.sameTeam = self.isRed[:, None] == self.isRed[None, :]
+    # The plane each agent shows each agent on
+    self.agentChannels = np.where(self.sameTeam, TEAMMATES, OPPONENTS)
+    np.fill_diagonal(self.agentChannels, SELF)
+
+    planes = self.observation['planes']
+    planes[:] = 0
+    for red in (True, False):
+      planes[self.teams[red], WALLS] = self.planes.walls
+      planes[self.teams[red], HOME] = self.planes.home[red]
+    for agent in self.agents:
+      if agent != None: agent.registerInitialState(state.deepCopy())
+    self.observe()
+    return self.observation, {'startingIndex': self.startingIndex}
+
+  def step(self, actions):
+    """
+    Plays a round and returns (observation, rewards, terminated,
+    truncated, info): terminated if a team brought enough food home,
+    truncated if the time ran out.  Raises ValueError for an illegal action.
+    """
+    state = self.state
+    if state == None or state.isOver():
+      raise Exception('Call reset to start a game')
+    data = state.data
+    planes = self.planes
+    startScore = data.score
+    for turn in range(self.numAgents):
+      agentIndex = (self.startingIndex + turn) % self.numAgents
+      agent = self.agents[agentIndex]
+      if agent != None:
+        observation = agent.observationFunction(state.deepCopy())
+        action = agent.getAction(observation)
+        code = stateCodec.DIRECTION_CODES[action]
+      else:
+        code = int(actions[agentIndex])
+        action = stateCodec.DIRECTIONS[code]
+      x, y = data.agentStates[agentIndex].configuration.pos
+      if not planes.legal[int(x) * planes.height + int(y), code]:
+        raise ValueError('Illegal action %s for agent %d' % (action, agentIndex))
+      state.advance(agentIndex, action)
+      # A team brought enough food home: the game ends by the rules,
+      # even on its last move
+      won = data._win
+      capture.CaptureRules.endIfTimeUp(state, self.length - data.timeleft, self.length)
+      if data._win: break
+
+    change = data.score - startScore
+    rewards = np.array([change if isRed else -change for isRed in self.isRed], dtype = np.float32)
+    self.observe()
+    terminated = won
+    truncated = data._win and not won
+    if terminated or truncated:
+      for agent in self.agents:
+        if agent != None and 'final' in dir(agent): agent.final(state.deepCopy())
+    return self.observation, rewards, terminated, truncated, {'score': data.score}
+
+  def observe(self):
+    "Fills in the observation arrays from the state"
+    data = self.state.data
+    planes = self.planes
+    width, height = planes.width, planes.height
+    out = self.observation
+    outPlanes, outAgents = out['planes'], out['agents']
+    isRed, sameTeam, teams = self.isRed, self.sameTeam, self.teams
+
+    features = np.array([agentState.configuration.pos + (1, agentState.isPacman, agentState.scaredTimer,
+                                                         agentState.numCarrying, agentState.numReturned, 0)
+                         for agentState in data.agentStates], dtype = np.int16)
+    xs, ys = features[:, X], features[:, Y]
+    # The sonar distance from each agent to each agent, and the agents each
+    # agent's team sees (all teammates are seen)
+    distances = np.abs(xs[:, None] - xs[None, :]) + np.abs(ys[:, None] - ys[None, :])
+    inSight = (distances <= capture.SIGHT_RANGE).astype(np.int16)
+    visible = sameTeam | (np.dot(sameTeam.astype(np.int16), inSight) > 0)
+
+    outAgents[:] = features
+    outAgents[:, :, DISTANCE] = distances
+    hidden = ~visible
+    outAgents[hidden, X] = -1
+    outAgents[hidden, Y] = -1
+    outAgents[hidden, VISIBLE] = 0
+    out['legal'][:] = planes.legal[xs.astype(np.intp) * height + ys]
+    out['game'][:, SCORE] = np.where(isRed, data.score, -data.score)
+    out['game'][:, TIMELEFT] = data.timeleft
+
+    bits = data.food.bits
+    for red in (True, False):
+      food = planes.unpack(bits & planes.foodMask[red])
+      capsules = np.zeros((width, height), dtype = np.uint8)
+      for x, y in capture.halfList(data.capsules, data.food, red):
+        capsules[x, y] = 1
+      outPlanes[teams[red], DEFEND_FOOD, :width, :height] = food
+      outPlanes[teams[not red], FOOD, :width, :height] = food
+      outPlanes[teams[red], DEFEND_CAPSULES, :width, :height] = capsules
+      outPlanes[teams[not red], CAPSULES, :width, :height] = capsules
+    outPlanes[:, SELF:] = 0
+    observers, agents = np.nonzero(visible)
+    outPlanes[observers, self.agentChannels[observers, agents], xs[agents], ys[agents]] = 1
+
+def _sharedArray(context, shape, dtype):
+  "A shared memory block for an array, and the array on it"
+  size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+  raw = context.RawArray('b', max(size, 1))
+  return raw, _arrayOn(raw, shape, dtype)
+
+def _arrayOn(raw, shape, dtype):
+  return np.frombuffer(raw, dtype = dtype, count = int(np.prod(shape))).reshape(shape)
+
+def _serveEnvs(connection, first, last, shared, envArgs):
+  "The loop run by each worker process of a VectorCaptureEnv: environments first to last - 1"
+  # Interrupts go to the training process, which closes the workers
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
+  arrays = dict((name, _arrayOn(raw, shape, dtype)) for name, (raw, shape, dtype) in shared.items())
+  makeAgents = envArgs.pop('makeAgents')
+  envs = []
+  for i in range(first, last):
+    buffers = dict((name, arrays[name][i]) for name in ('planes', 'agents', 'legal', 'game'))
+    agents = makeAgents() if makeAgents != None else None
+    envs.append(CaptureEnv(agents = agents, buffers = buffers, **envArgs))
+  while True:
+    try:
+      message = connection.recv()
+    except EOFError:
+      break
+    if message == None: break
+    kind, args = message
+    try:
+      infos = []
+      if kind == 'reset':
+        layouts, seeds = args
+        for env, layout, seed in zip(envs, layouts[first:last], seeds[first:last]):
+          infos.append(env.reset(layout, seed)[1])
+      elif kind == 'step':
+        actions = arrays['actions']
+        for i, env in enumerate(envs, first):
+          observation, rewards, terminated, truncated, info = env.step(actions[i])
+          if terminated or truncated:
+            info = dict(info, finalScore = info['score'], startingIndex = env.reset()[1]['startingIndex'])
+          arrays['rewards'][i] = rewards
+          arrays['terminated'][i] = terminated
+          arrays['truncated'][i] = truncated
+          infos.append(info)
+      reply = (True, infos)
+    except Exception:
+      reply = (False, traceback.format_exc())
+    connection.send(reply)
+  connection.close()
+
+class VectorCaptureEnv:
+  """
+  numEnvs CaptureEnvs stepped together by numWorkers processes (one per
+  CPU by default).  Observations, actions and rewards are arrays with
+  the environments as first axis, in shared memory: the workers write
+  them in place and only small messages go through pipes.
+
+  envArgs are those of CaptureEnv, except that makeAgents, if given, is a
+  function returning the agents of one environment (called in its
+  worker, once per environment).  An environment whose game ends is
+  started again on the same layout at once: step returns the first
+  observation of the new game, and its info has the finalScore of the
+  game that ended.
+  """
+
+  def __init__(self, numEnvs, numWorkers = None, makeAgents = None, **envArgs):
+    if numWorkers == None: numWorkers = multiprocessing.cpu_count()
+    numWorkers = max(1, min(numWorkers, numEnvs))
+    self.numEnvs = numEnvs
+    numAgents = envArgs.get('numAgents', 4)
+    if envArgs.get('shape') == None:
+      layout = getLayout(envArgs.get('layout', 'defaultCapture'))
+      envArgs['shape'] = (layout.width, layout.height)
+      envArgs['layout'] = layout
+    envArgs['makeAgents'] = makeAgents
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+      context = multiprocessing.get_context('fork')
+    else:
+      context = multiprocessing.get_context()
+    space = dict(observationSpace(numAgents, envArgs['shape']))
+    space['actions'] = ((numAgents,), np.int8)
+    space['rewards'] = ((numAgents,), np.float32)
+    space['terminated'] = ((), np.bool_)
+    space['truncated'] = ((), np.bool_)
+    shared = {}
+    self.arrays = {}
+    for name, (shape, dtype) in space.items():
+      shape = (numEnvs,) + shape
+      raw, self.arrays[name] = _sharedArray(context, shape, dtype)
+      shared[name] = (raw, shape, dtype)
+    self.observation = dict((name, self.arrays[name]) for name in ('planes', 'agents', 'legal', 'game'))
+
+    self.processes = []
+    self.connections = []
+    for worker in range(numWorkers):
+      first, last = worker * numEnvs // numWorkers, (worker + 1) * numEnvs // numWorkers
+      connection, workerConnection = context.Pipe()
+      process = context.Process(target = _serveEnvs, args = (workerConnection, first, last, shared, dict(envArgs)))
+      process.daemon = True
+      process.start()
+      workerConnection.close()
+      self.processes.append(process)
+      self.connections.append(connection)
+
+  def request(self, kind, args = None):
+    "Sends every worker a request and returns their infos, in order of environment"
+    for connection in self.connections:
+      connection.send((kind, args))
+    infos = []
+    for worker, connection in enumerate(self.connections):
+      try:
+        ok, result = connection.recv()
+      except EOFError:
+        raise Exception('Worker %d of the environments died' % worker) from None
+      if not ok:
+        raise Exception('Worker %d of the environments failed:\n%s' % (worker, result))
+      infos.extend(result)
+    return infos
+
+  def reset(self, layouts = None, seed = None):
+    """
+    Starts a game in every environment, on layouts (one per environment,
+    or one for all; the last ones by default), seeding environment i
+    with seed + i if seed is given.  Returns the observations and infos.
+    """
+    if not isinstance(layouts, (list, tuple)):
+      layouts = [layouts] * self.numEnvs
+    seeds = [seed + i if seed != None else None for i in range(self.numEnvs)]
+    return self.observation, self.request('reset', (layouts, seeds))
+
+  def step(self, actions):
+    """
+    Plays a round in every environment with actions, [environments,
+    agents], and returns (observations, rewards, terminated, truncated,
+    infos) with the environments as first axis.
+    """
+    self.arrays['actions'][:] = actions
+    infos = self.request('step')
+    arrays = self.arrays
+    return self.observation, arrays['rewards'], arrays['terminated'], arrays['truncated'], infos
+
+  def close(self):
+    for connection in self.connections:
+      try:
+        connection.send(None)
+      except (OSError, EOFError):
+        pass
+    for process in self.processes:
+      process.join(1.0)
+      if process.is_alive():
+        process.kill()
+        process.join()
+    for connection in self.connections:
+      connection.close()
+    self.processes = []
+    self.connections = []
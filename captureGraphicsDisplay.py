@@ -172,7 +172,7 @@ class InfoPane:
 
 
 class PacmanGraphics:
-  def __init__(self, redTeam, blueTeam, zoom=1.0, frameTime=0.0, capture=False):
+  def __init__(self, redTeam, blueTeam, zoom=1.0, frameTime=0.0, capture=False, delayStep=0.0):
     self.expandedCells = []
     self.have_window = 0
     self.currentGhostImages = {}
@@ -181,6 +181,10 @@ class PacmanGraphics:
     self.gridSize = DEFAULT_GRID_SIZE * zoom
     self.capture = capture
     self.frameTime = frameTime
+    # The pace of the game, kept apart from frameTime (the animation's) so
+    # that a slower game does not also turn on the animation sleeps
+    self.delayStep = delayStep
+    self.lastFrame = time.time()
     self.redTeam = redTeam
     self.blueTeam = blueTeam
 
@@ -276,6 +280,20 @@ class PacmanGraphics:
     self.infoPane.updateScore(newState.score, newState.timeleft)
     if 'ghostDistances' in dir(newState):
       self.infoPane.updateGhostDistances(newState.ghostDistances)
+    self.pace()
+
+  def pace(self):
+    """
+    Keeps each move on screen for at least delayStep seconds, counting
+    the time spent on the move since the last one.  The game loop itself
+    never sleeps, so this is the only thing slowing down a game that is
+    being watched.
+    """
+    if self.delayStep > 0:
+      remaining = self.delayStep - (time.time() - self.lastFrame)
+      if remaining > 0:
+        time.sleep(remaining)
+    self.lastFrame = time.time()
 
   def make_window(self, width, height):
     grid_width = (width-1) * self.gridSize
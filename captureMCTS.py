@@ -0,0 +1,204 @@
+# captureMCTS.py
+# --------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  Monte Carlo tree search for capture agents.
+
+  MonteCarloAgent grows a UCT search tree from the current state and
+  values its leaves by playing the game out (rollouts).  Rollouts run on
+  one private copy of the state that is advanced in place, so they cost
+  no copies, observations or legality checks per move.  Subclasses can
+  change the rollout policy (rolloutAction) and how the final state of a
+  rollout is scored (evaluate).
+"""
+
+from captureAgents import CaptureAgent
+from captureSearch import MOVE_TIME
+from capture import AgentRules
+from game import Directions
+import math, random, time
+
+class Node:
+  """
+  A node of the search tree: a state, the agent to move in it and the
+  statistics of the rollouts through it.  total is the sum of rollout
+  values for the searching agent's team.
+  """
+  __slots__ = ('state', 'agentIndex', 'parent', 'action', 'children', 'untried', 'visits', 'total')
+
+  def __init__(self, state, agentIndex, parent = None, action = None):
+    self.state = state
+    self.agentIndex = agentIndex
+    self.parent = parent
+    self.action = action
+    self.children = []
+    self.untried = None
+    self.visits = 0
+    self.total = 0.0
+
+class MonteCarloAgent(CaptureAgent):
+  """
+  A CaptureAgent that chooses its moves by Monte Carlo tree search.
+
+  Each iteration walks down the tree by UCT (the upper confidence bound
+  of a child's mean value, with exploration constant uctConstant; the
+  opponents pick the child that is worst for this team), adds one new
+  node, plays a rollout of at most rolloutDepth moves from it and adds
+  the value of the result to every node on the path.  Search stops after
+  the move's time budget (moveTime less timeForComputing) or after
+  maxRollouts rollouts, and the most visited move is played.
+
+  uctConstant should match the scale of evaluate, which by default is
+  the score from this team's point of view.
+  """
+
+  def __init__( self, index, timeForComputing = .1, moveTime = MOVE_TIME,
+                rolloutDepth = 40, uctConstant = 1.0, maxRollouts = None ):
+    CaptureAgent.__init__(self, index, timeForComputing)
+    self.moveTime = moveTime
+    self.rolloutDepth = rolloutDepth
+    self.uctConstant = uctConstant
+    self.maxRollouts = maxRollouts
+    # Rollouts and time of the last search
+    self.searchStats = None
+
+  def evaluate(self, gameState):
+    """
+    The value, for this agent's team, of the state a rollout ends in.
+    Override it for anything better than the score.
+    """
+    return self.getScore(gameState)
+
+  def rolloutAction(self, gameState, agentIndex, actions):
+    """
+    Picks the move of agentIndex in a rollout, from the tuple of its legal
+    actions.  By default a random move, stopping only when nothing else is
+    legal.  Override it for heuristic rollouts.
+    """
+    action = random.choice(actions)
+    while action == Directions.STOP and len(actions) > 1:
+      action = random.choice(actions)
+    return action
+
+  def getSearchTime(self):
+    "The seconds each move may spend searching"
+    return self.moveTime - self.timeForComputing
+
+  def chooseAction(self, gameState):
+    return self.search(gameState)
+
+  def search(self, gameState, searchTime = None):
+    """
+    Searches from gameState, with this agent to move, for at most
+    searchTime seconds (getSearchTime by default) and returns the action
+    played most often.
+    """
+    root = self.searchTree(gameState, searchTime)
+    if not root.children:
+      return gameState.getLegalActions(self.index)[0]
+    return max(root.children, key = lambda child: child.visits).action
+
+  def getRootStatistics(self, gameState, searchTime, worker = 0, numWorkers = 1):
+    """
+    For root-parallel search (see parallelSearch): searches like search
+    and returns {action: (visits, total value)} for the root's children.
+    """
+    root = self.searchTree(gameState, searchTime)
+    return dict((child.action, (child.visits, child.total)) for child in root.children)
+
+  def mergeRootStatistics(self, gameState, statistics):
+    "Adds up the workers' visits of each root action and returns the most visited"
+    visits = {}
+    for workerStatistics in statistics:
+      for action, (count, total) in workerStatistics.items():
+        visits[action] = visits.get(action, 0) + count
+    if not visits:
+      return gameState.getLegalActions(self.index)[0]
+    return max(visits, key = lambda action: visits[action])
+
+  def searchTree(self, gameState, searchTime = None):
+    "Grows the search tree from gameState and returns its root"
+    if searchTime == None: searchTime = self.getSearchTime()
+    start = time.time()
+    deadline = start + searchTime
+    root = Node(gameState, self.index)
+    rollouts = 0
+    while time.time() < deadline:
+      if self.maxRollouts != None and rollouts >= self.maxRollouts: break
+      node = self.expand(self.select(root))
+      value = self.rollout(node.state, node.agentIndex)
+      while node != None:
+        node.visits += 1
+        node.total += value
+        node = node.parent
+      rollouts += 1
+
+    self.searchStats = {'rollouts': rollouts, 'seconds': time.time() - start}
+    return root
+
+  def select(self, node):
+    "Walks down by UCT to a node that is not fully expanded"
+    while node.untried != None and not node.untried and node.children:
+      if node.state.isOnRedTeam(node.agentIndex) == self.red:
+        sign = 1
+      else:
+        sign = -1
+      logVisits = math.log(node.visits)
+      c = self.uctConstant
+      node = max(node.children, key = lambda child:
+                 sign * child.total / child.visits + c * math.sqrt(logVisits / child.visits))
+    return node
+
+  def expand(self, node):
+    "Adds one untried child to node and returns it, or node if it is terminal"
+    state = node.state
+    if state.isOver() or state.data.timeleft <= 0:
+      return node
+    if node.untried == None:
+      node.untried = state.getLegalActions(node.agentIndex)
+      random.shuffle(node.untried)
+    if not node.untried:
+      return node
+    action = node.untried.pop()
+    successor = state.generateSuccessor(node.agentIndex, action)
+    child = Node(successor, self.nextAgent(successor, node.agentIndex), node, action)
+    node.children.append(child)
+    return child
+
+  def nextAgent(self, gameState, agentIndex):
+    "The next agent to move after agentIndex, skipping agents out of sight"
+    numAgents = gameState.getNumAgents()
+    for i in range(numAgents):
+      agentIndex = (agentIndex + 1) % numAgents
+      if gameState.data.agentStates[agentIndex].configuration != None:
+        return agentIndex
+    return agentIndex
+
+  def rollout(self, gameState, agentIndex):
+    """
+    Plays at most rolloutDepth moves from gameState, agentIndex moving
+    first, and returns the evaluation of the state reached.  The moves are
+    made in place on one copy of gameState (see GameState.advance).
+    """
+    state = gameState.deepCopy()
+    data = state.data
+    numAgents = len(data.agentStates)
+    getLegalActions = AgentRules.getLegalActionTuple
+    for depth in range(self.rolloutDepth):
+      if data._win or data.timeleft <= 0: break
+      if data.agentStates[agentIndex].configuration != None:
+        actions = getLegalActions(state, agentIndex)
+        state.advance(agentIndex, self.rolloutAction(state, agentIndex, actions))
+      agentIndex = (agentIndex + 1) % numAgents
+    return self.evaluate(state)
@@ -0,0 +1,237 @@
+# captureReplay.py
+# ----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  Replay files for capture games.
+
+  A replay is written while the game runs, one record at a time, so a
+  file is usable (up to its last record) even if the game never ends:
+
+    magic      b'PMR1'
+    'M'        metadata (team names, game length) as JSON
+    'L'        the layout (stateCodec.encodeLayout)
+    'K'        a keyframe: the turn and the state after it (stateCodec)
+    'A'        a move: agent index and action code
+    ...        moves, with a keyframe every KEYFRAME_INTERVAL turns
+    'I'        when the game is over, the number of turns, the offsets of
+               the keyframes and the result as JSON
+    trailer    b'PMRI' and the offset of the index
+
+  ReplayReader finds the keyframes through the trailer (or, for a file
+  that was never finished, by one pass over the records), so opening a
+  replay reads no states and getState(turn) decodes one keyframe and
+  replays fewer than KEYFRAME_INTERVAL moves.
+
+  python capture.py --replay FILE plays these files as well as the older
+  pickled replays.
+"""
+
+import bisect, json, pickle, struct
+import stateCodec
+
+MAGIC = b'PMR1'
+INDEX_MAGIC = b'PMRI'
+KEYFRAME_INTERVAL = 100
+
+SIZE = struct.Struct('<cI')
+KEYFRAME = struct.Struct('<cIH')
+ACTION = struct.Struct('<cBB')
+INDEX = struct.Struct('<cII')
+INDEX_ENTRY = struct.Struct('<IQ')
+TRAILER = struct.Struct('<4sQ')
+
+class ReplayWriter:
+  """
+  Streams a game to a replay file.  Game.run calls recordAction after
+  every move when the writer is the game's recorder (see recordGame).
+  """
+
+  def __init__(self, fileName, startState, metadata = None, keyframeInterval = KEYFRAME_INTERVAL):
+    self.file = open(fileName, 'wb')
+    self.keyframeInterval = keyframeInterval
+    self.keyframes = []
+    self.turn = 0
+    self.file.write(MAGIC)
+    self._writeBlock(b'M', json.dumps(metadata or {}).encode())
+    self._writeBlock(b'L', stateCodec.encodeLayout(startState.data.layout))
+    self.writeKeyframe(startState)
+
+  def _writeBlock(self, kind, data):
+    self.file.write(SIZE.pack(kind, len(data)))
+    self.file.write(data)
+
+  def writeKeyframe(self, state):
+    "Stores state as the state after the current turn"
+    data = stateCodec.encodeState(state)
+    self.keyframes.append((self.turn, self.file.tell()))
+    self.file.write(KEYFRAME.pack(b'K', self.turn, len(data)))
+    self.file.write(data)
+    self.file.flush()
+
+  def recordAction(self, agentIndex, action, state):
+    "Appends a move; state is the state after it"
+    self.file.write(ACTION.pack(b'A', agentIndex, stateCodec.DIRECTION_CODES[action]))
+    self.turn += 1
+    if self.turn % self.keyframeInterval == 0:
+      self.writeKeyframe(state)
+
+  def close(self, result = None):
+    "Writes the index and the result (any JSON value) and closes the file"
+    indexOffset = self.file.tell()
+    self.file.write(INDEX.pack(b'I', self.turn, len(self.keyframes)))
+    for turn, offset in self.keyframes:
+      self.file.write(INDEX_ENTRY.pack(turn, offset))
+    self._writeBlock(b'E', json.dumps(result).encode())
+    self.file.write(TRAILER.pack(INDEX_MAGIC, indexOffset))
+    self.file.close()
+
+class ReplayReader:
+  """
+  Random access to a replay file: metadata, layout, result, the moves and
+  the state after any turn.
+  """
+
+  def __init__(self, fileName):
+    f = open(fileName, 'rb')
+    try: self.data = f.read()
+    finally: f.close()
+    if self.data[:len(MAGIC)] != MAGIC:
+      raise ValueError('%s is not a replay file' % fileName)
+
+    offset = len(MAGIC)
+    kind, size = SIZE.unpack_from(self.data, offset)
+    offset += SIZE.size
+    self.metadata = json.loads(self.data[offset:offset + size].decode())
+    offset += size
+    kind, size = SIZE.unpack_from(self.data, offset)
+    offset += SIZE.size
+    self.layout = stateCodec.decodeLayout(self.data[offset:offset + size])
+    self.firstRecord = offset + size
+
+    self.result = None
+    self.finished = False
+    magic = None
+    if len(self.data) >= self.firstRecord + TRAILER.size:
+      magic, indexOffset = TRAILER.unpack_from(self.data, len(self.data) - TRAILER.size)
+    if magic == INDEX_MAGIC:
+      self._readIndex(indexOffset)
+    else:
+      self._scan()
+
+  def _readIndex(self, offset):
+    kind, self.numTurns, numKeyframes = INDEX.unpack_from(self.data, offset)
+    offset += INDEX.size
+    self.keyframes = []
+    for i in range(numKeyframes):
+      self.keyframes.append(INDEX_ENTRY.unpack_from(self.data, offset))
+      offset += INDEX_ENTRY.size
+    kind, size = SIZE.unpack_from(self.data, offset)
+    offset += SIZE.size
+    self.result = json.loads(self.data[offset:offset + size].decode())
+    self.finished = True
+
+  def _scan(self):
+    "Finds the keyframes of a file that has no index, up to its last whole record"
+    self.keyframes = []
+    self.numTurns = 0
+    for offset, kind in self._records(self.firstRecord):
+      if kind == b'K':
+        self.keyframes.append((KEYFRAME.unpack_from(self.data, offset)[1], offset))
+      elif kind == b'A':
+        self.numTurns += 1
+
+  def _records(self, offset):
+    "Yields the (offset, kind) of the keyframe and move records from offset on"
+    data = self.data
+    end = len(data)
+    while offset < end:
+      kind = data[offset:offset + 1]
+      if kind == b'A':
+        if offset + ACTION.size > end: return
+        yield offset, kind
+        offset += ACTION.size
+      elif kind == b'K':
+        if offset + KEYFRAME.size > end: return
+        size = KEYFRAME.unpack_from(data, offset)[2]
+        if offset + KEYFRAME.size + size > end: return
+        yield offset, kind
+        offset += KEYFRAME.size + size
+      else:
+        return
+
+  def getActions(self):
+    "The moves of the game as (agentIndex, action) pairs"
+    actions = []
+    for offset, kind in self._records(self.firstRecord):
+      if kind == b'A':
+        kind, agentIndex, code = ACTION.unpack_from(self.data, offset)
+        actions.append((agentIndex, stateCodec.DIRECTIONS[code]))
+    return actions
+
+  def getState(self, turn):
+    """
+    The state after turn moves (0 is the starting state), from the last
+    keyframe at or before it and the moves that follow the keyframe.
+    """
+    if not 0 <= turn <= self.numTurns:
+      raise IndexError('Turn %d is not in the replay (0 to %d)' % (turn, self.numTurns))
+    k = bisect.bisect_right([keyframeTurn for keyframeTurn, offset in self.keyframes], turn) - 1
+    keyframeTurn, offset = self.keyframes[k]
+    kind, keyframeTurn, size = KEYFRAME.unpack_from(self.data, offset)
+    start = offset + KEYFRAME.size
+    state = stateCodec.decodeState(self.data[start:start + size])
+    for offset, kind in self._records(start + size):
+      if keyframeTurn == turn: break
+      if kind == b'A':
+        kind, agentIndex, code = ACTION.unpack_from(self.data, offset)
+        state = state.generateSuccessor(agentIndex, stateCodec.DIRECTIONS[code])
+        keyframeTurn += 1
+    return state
+
+  def getReplayArgs(self):
+    "The keyword arguments of capture.replayGame, except for the display"
+    import game
+    return {'layout': self.layout,
+            'agents': [game.Agent() for i in range(self.getState(0).getNumAgents())],
+            'actions': self.getActions(),
+            'length': self.metadata.get('length', self.numTurns),
+            'redTeamName': self.metadata.get('redTeamName', 'Red'),
+            'blueTeamName': self.metadata.get('blueTeamName', 'Blue')}
+
+def loadReplay(fileName):
+  """
+  The keyword arguments of capture.replayGame (but the display) for a
+  replay file, or for a pickled replay from older versions.
+  """
+  f = open(fileName, 'rb')
+  try: isReplay = f.read(len(MAGIC)) == MAGIC
+  finally: f.close()
+  if isReplay:
+    return ReplayReader(fileName).getReplayArgs()
+  f = open(fileName, 'rb')
+  try: return pickle.load(f)
+  finally: f.close()
+
+def recordGame(game, fileName, metadata = None):
+  "Makes game stream itself to a replay file as it is played"
+  game.recorder = ReplayWriter(fileName, game.state, metadata)
+
+def finishRecording(game):
+  "Closes the replay file of game, storing its result"
+  result = {'score': game.state.data.score,
+            'turns': len(game.moveHistory),
+            'agentCrashed': game.agentCrashed,
+            'agentTimeout': game.agentTimeout}
+  game.recorder.close(result)
+  game.recorder = None
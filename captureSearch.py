@@ -0,0 +1,289 @@
+# captureSearch.py
+# ----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  Game tree search for capture agents.
+
+  SearchAgent runs iterative deepening alpha-beta (or expectimax) over
+  capture GameStates within the move time limit, with a transposition
+  table and move ordering carried over between iterations.  A team only
+  has to write the evaluation function:
+
+    class MyAgent(SearchAgent):
+      def evaluate(self, gameState):
+        return self.getScore(gameState)
+"""
+
+from captureAgents import CaptureAgent
+import random, time
+import util
+
+# Seconds a move may take before the game warns (CaptureRules.getMoveWarningTime)
+MOVE_TIME = 1.0
+
+# Bound types of transposition table entries
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+class SearchTimeout(Exception):
+  "Raised inside a search when its time budget runs out."
+  pass
+
+class TranspositionTable:
+  """
+  A fixed size table of search results keyed by 64 bit state hashes.
+
+  The table has size slots, indexed by the hash modulo size, each holding
+  one entry (key, depth, value, bound, move, generation).  A new result
+  replaces the entry in its slot if that entry is for the same state,
+  was searched no deeper, or is left over from an earlier search (call
+  newSearch at the start of each one).  Memory use is bounded by size.
+  """
+
+  def __init__(self, size = 2**16):
+    self.size = size
+    self.slots = [None] * size
+    self.generation = 0
+    self.probes = 0
+    self.hits = 0
+
+  def newSearch(self):
+    "Marks the entries stored so far as old, so they are replaced first"
+    self.generation += 1
+
+  def lookup(self, key):
+    "Returns the entry for key, or None"
+    self.probes += 1
+    entry = self.slots[key % self.size]
+    if entry != None and entry[0] == key:
+      self.hits += 1
+      return entry
+    return None
+
+  def store(self, key, depth, value, bound, move):
+    index = key % self.size
+    entry = self.slots[index]
+    if entry == None or entry[0] == key or entry[1] <= depth or entry[5] != self.generation:
+      self.slots[index] = (key, depth, value, bound, move, self.generation)
+
+  def clear(self):
+    self.slots = [None] * self.size
+
+  def __len__(self):
+    return self.size - self.slots.count(None)
+
+# Keys xored into a state's hash for the agent to move, so the same
+# position with a different agent to move gets its own entry
+_rng = random.Random(0x7A7A)
+TURN_KEYS = [_rng.getrandbits(64) for i in range(8)]
+del _rng
+
+class SearchAgent(CaptureAgent):
+  """
+  A CaptureAgent that chooses its moves by iterative deepening search.
+
+  Agents move in index order, one ply each; this agent's team maximizes
+  evaluate and the opponents minimize it (alpha-beta) or move uniformly
+  at random (expectimax, when expectimax=True).  Opponents the agent
+  cannot see are skipped.  Each iteration searches one ply deeper, tries
+  the best moves of the previous iteration first and stops when the time
+  budget of the move runs out, returning the best move of the deepest
+  iteration that finished.
+
+  The budget is moveTime less timeForComputing, which is kept back for
+  the agent's own work outside the search.
+  """
+
+  def __init__( self, index, timeForComputing = .1, moveTime = MOVE_TIME,
+                maxDepth = 64, expectimax = False, tableSize = 2**16 ):
+    CaptureAgent.__init__(self, index, timeForComputing)
+    self.moveTime = moveTime
+    self.maxDepth = maxDepth
+    self.expectimax = expectimax
+    self.table = TranspositionTable(tableSize)
+    # Depth, node count and time of the last search
+    self.searchStats = None
+
+  def evaluate(self, gameState):
+    """
+    Override this method: returns the value of gameState for this agent's
+    team (higher is better).  It is also called on states where the game
+    is over.
+    """
+    util.raiseNotDefined()
+
+  def getSearchTime(self):
+    "The seconds each move may spend searching"
+    return self.moveTime - self.timeForComputing
+
+  def chooseAction(self, gameState):
+    return self.search(gameState)[0]
+
+  def search(self, gameState, searchTime = None, actions = None):
+    """
+    Searches from gameState, with this agent to move, for at most
+    searchTime seconds (getSearchTime by default).  Returns the best
+    action, its value and the depth of the last finished iteration.
+    Only the given actions are searched if actions is not None; the
+    values they got are left in self.rootValues.
+    """
+    if searchTime == None: searchTime = self.getSearchTime()
+    start = time.time()
+    self.deadline = start + searchTime
+    self.nodes = 0
+    self.table.newSearch()
+
+    if actions == None:
+      actions = gameState.getLegalActions(self.index)
+      search = len(actions) > 1
+    else:
+      actions = list(actions)
+      search = len(actions) > 0
+    bestAction, bestValue, finished = (actions or [None])[0], None, 0
+    self.rootValues = {}
+    if search:
+      values = {}
+      for depth in range(1, self.maxDepth + 1):
+        # Best moves of the last iteration first
+        actions.sort(key = lambda action: -values.get(action, 0))
+        try:
+          values = self.searchRoot(gameState, actions, depth)
+        except SearchTimeout:
+          break
+        bestAction = max(actions, key = lambda action: values[action])
+        bestValue, finished = values[bestAction], depth
+        self.rootValues = values
+
+    self.searchStats = {'depth': finished, 'nodes': self.nodes, 'seconds': time.time() - start}
+    return bestAction, bestValue, finished
+
+  def getRootStatistics(self, gameState, searchTime, worker = 0, numWorkers = 1):
+    """
+    For root-parallel search (see parallelSearch): the root actions are
+    dealt out between the workers and each searches its share.  Returns
+    {action: (depth, value)} from the deepest iteration that finished.
+    """
+    actions = gameState.getLegalActions(self.index)[worker::numWorkers]
+    action, value, depth = self.search(gameState, searchTime, actions)
+    return dict((action, (depth, value)) for action, value in self.rootValues.items())
+
+  def mergeRootStatistics(self, gameState, statistics):
+    """
+    Returns the action searched deepest, the one with the highest value
+    among those searched as deep.  Values from shallower searches are
+    not comparable, so they only decide when no deeper result exists.
+    """
+    best, bestAction = None, None
+    for workerStatistics in statistics:
+      for action, (depth, value) in workerStatistics.items():
+        if best == None or (depth, value) > best:
+          best, bestAction = (depth, value), action
+    if bestAction == None:
+      return gameState.getLegalActions(self.index)[0]
+    return bestAction
+
+  def searchRoot(self, gameState, actions, depth):
+    "Returns the values of actions for this agent at gameState"
+    nextAgent = self.nextAgent(gameState, self.index)
+    values = {}
+    alpha = -float('inf')
+    for action in actions:
+      successor = gameState.generateSuccessor(self.index, action)
+      if self.expectimax:
+        value = self.expectimaxValue(successor, nextAgent, depth - 1)
+      else:
+        value = self.alphaBetaValue(successor, nextAgent, depth - 1, alpha, float('inf'))
+      values[action] = value
+      alpha = max(alpha, value)
+    return values
+
+  def nextAgent(self, gameState, agentIndex):
+    "The next agent to move after agentIndex, skipping agents out of sight"
+    numAgents = gameState.getNumAgents()
+    for i in range(numAgents):
+      agentIndex = (agentIndex + 1) % numAgents
+      if gameState.data.agentStates[agentIndex].configuration != None:
+        return agentIndex
+    return agentIndex
+
+  def orderedActions(self, gameState, agentIndex, entry):
+    "The legal actions of agentIndex, the table's best move first"
+    actions = gameState.getLegalActions(agentIndex)
+    if entry != None and entry[4] in actions:
+      actions.remove(entry[4])
+      actions.insert(0, entry[4])
+    return actions
+
+  def alphaBetaValue(self, gameState, agentIndex, depth, alpha, beta):
+    self.nodes += 1
+    if time.time() > self.deadline:
+      raise SearchTimeout()
+    if depth == 0 or gameState.isOver():
+      return self.evaluate(gameState)
+
+    key = gameState.getZobristHash() ^ TURN_KEYS[agentIndex]
+    entry = self.table.lookup(key)
+    if entry != None and entry[1] >= depth:
+      value, bound = entry[2], entry[3]
+      if bound == EXACT: return value
+      if bound == LOWER and value >= beta: return value
+      if bound == UPPER and value <= alpha: return value
+
+    nextAgent = self.nextAgent(gameState, agentIndex)
+    maximizing = gameState.isOnRedTeam(agentIndex) == self.red
+    originalAlpha, originalBeta = alpha, beta
+    bestValue, bestAction = None, None
+    for action in self.orderedActions(gameState, agentIndex, entry):
+      successor = gameState.generateSuccessor(agentIndex, action)
+      value = self.alphaBetaValue(successor, nextAgent, depth - 1, alpha, beta)
+      if maximizing:
+        if bestValue == None or value > bestValue: bestValue, bestAction = value, action
+        alpha = max(alpha, value)
+      else:
+        if bestValue == None or value < bestValue: bestValue, bestAction = value, action
+        beta = min(beta, value)
+      if alpha >= beta: break
+
+    if bestValue <= originalAlpha: bound = UPPER
+    elif bestValue >= originalBeta: bound = LOWER
+    else: bound = EXACT
+    self.table.store(key, depth, bestValue, bound, bestAction)
+    return bestValue
+
+  def expectimaxValue(self, gameState, agentIndex, depth):
+    self.nodes += 1
+    if time.time() > self.deadline:
+      raise SearchTimeout()
+    if depth == 0 or gameState.isOver():
+      return self.evaluate(gameState)
+
+    key = gameState.getZobristHash() ^ TURN_KEYS[agentIndex]
+    entry = self.table.lookup(key)
+    if entry != None and entry[1] >= depth:
+      return entry[2]
+
+    nextAgent = self.nextAgent(gameState, agentIndex)
+    maximizing = gameState.isOnRedTeam(agentIndex) == self.red
+    values = []
+    bestValue, bestAction = None, None
+    for action in self.orderedActions(gameState, agentIndex, entry):
+      successor = gameState.generateSuccessor(agentIndex, action)
+      value = self.expectimaxValue(successor, nextAgent, depth - 1)
+      values.append(value)
+      if bestValue == None or value > bestValue: bestValue, bestAction = value, action
+
+    if not maximizing: bestValue = sum(values) / float(len(values))
+    self.table.store(key, depth, bestValue, EXACT, bestAction)
+    return bestValue
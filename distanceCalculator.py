@@ -21,19 +21,28 @@ distancer = Distancer(gameState.data.layout)
 distancer.getDistance( (1,1), (10,10) )
 """
 
-import sys, time, random
+import sys, os, time, array
+import hashlib, mmap, struct, tempfile
 
 class Distancer:
-  def __init__(self, layout, default = 10000):
+  def __init__(self, layout, default = 10000, table = None):
     """
     Initialize with Distancer(layout).  Changing default is unnecessary.
+
+    If a DistanceTable for the layout is already at hand (capture games
+    hand one to every agent, see GameState.getDistanceTable), pass it as
+    table and getMazeDistances will use it instead of computing one.
     """
     self._distances = None
     self.default = default
+    self.table = table
     self.dc = DistanceCalculator(layout, self, default)
 
   def getMazeDistances(self):
-    self.dc.run()
+    if self.table != None:
+      self._distances = self.table
+    else:
+      self.dc.run()
 
   def getDistance(self, pos1, pos2):
     """
@@ -55,11 +64,7 @@ class Distancer:
     return bestDistance
 
   def getDistanceOnGrid(self, pos1, pos2):
-    key = (pos1, pos2)
-    if key in self._distances:
-      return self._distances[key]
-    else:
-      raise Exception("Positions not in grid: " + str(key))
+    return self._distances.getDistance(pos1, pos2)
 
   def isReadyForMazeDistance(self):
     return self._distances != None
@@ -97,61 +102,208 @@ class DistanceCalculator:
     self.default = default
 
   def run(self):
-    global distanceMap
+    self.distancer._distances = getDistanceTable(self.layout)
 
-    if self.layout.walls not in distanceMap:
-      distances = computeDistances(self.layout)
-      distanceMap[self.layout.walls] = distances
-    else:
-      distances = distanceMap[self.layout.walls]
+def getDistanceTable(layout):
+  """
+  Returns the DistanceTable of layout, reusing one already built for the
+  same walls in this process, then one in the disk cache, and computing
+  it only if neither exists.
+  """
+  global distanceMap
+
+  if layout.walls not in distanceMap:
+    start = time.time()
+    distances = loadDistances(layout)
+    source = 'disk'
+    if distances == None:
+      distances = computeDistances(layout)
+      saveDistances(layout, distances)
+      source = 'computed'
+    distances.buildTime = time.time() - start
+    distances.source = source
+    distanceMap[layout.walls] = distances
+  else:
+    distances = distanceMap[layout.walls]
+  return distances
+
+# Marks pairs of cells with no path between them in a DistanceTable
+UNREACHABLE = 0xFFFF
+
+class DistanceTable:
+  """
+  The maze distances between every pair of open cells of a layout.
 
-    self.distancer._distances = distances
+  Open cells are numbered as in layout.cells (cellIds is the layout's
+  cellIndex, mapping the grid index x * height + y of a position to its
+  id, -1 for walls) and the distances are kept in one dense n x n matrix
+  of unsigned 16 bit integers, so a lookup is two array reads.  The matrix is either an
+  array or a memory-mapped view of a cache file (see loadDistances).
+  """
+  def __init__(self, layout, distances = None):
+    self.width = layout.width
+    self.height = layout.height
+    self.cells = layout.cells
+    self.numCells = len(self.cells)
+    if self.numCells >= UNREACHABLE:
+      raise Exception('Too many open cells for a 16 bit distance table')
+    self.cellIds = layout.cellIndex
+    if distances == None:
+      distances = array.array('H', [UNREACHABLE]) * (self.numCells * self.numCells)
+    self.distances = distances
+    # Filled in by getDistanceTable: seconds it took to get the table and
+    # whether it was 'computed' or loaded from 'disk'
+    self.buildTime = None
+    self.source = None
+
+  def getCellId(self, pos):
+    x, y = pos
+    x, y = int(x), int(y)
+    if 0 <= x < self.width and 0 <= y < self.height:
+      cellId = self.cellIds[x * self.height + y]
+      if cellId >= 0: return cellId
+    raise Exception("Position not in grid: " + str(pos))
+
+  def getDistance(self, pos1, pos2):
+    distance = self.distances[self.getCellId(pos1) * self.numCells + self.getCellId(pos2)]
+    if distance == UNREACHABLE:
+      return sys.maxsize
+    return distance
+
+  def getMemoryUsage(self):
+    "Bytes held by the table's arrays"
+    return (len(self.distances) * self.distances.itemsize +
+            len(self.cellIds) * self.cellIds.itemsize)
+
+  def getMetrics(self):
+    "Size and construction cost of the table, for reporting"
+    return {'cells': self.numCells, 'bytes': self.getMemoryUsage(),
+            'buildTime': self.buildTime, 'source': self.source}
 
 def computeDistances(layout):
-    "Runs UCS to all other positions from each position"
-    distances = {}
-    allNodes = layout.walls.asList(False)
-    for source in allNodes:
-        dist = {}
-        closed = {}
-        for node in allNodes:
-            dist[node] = sys.maxsize
-        import util
-        queue = util.PriorityQueue()
-        queue.push(source, 0)
-        dist[source] = 0
-        while not queue.isEmpty():
-            node = queue.pop()
-            if node in closed:
-                continue
-            closed[node] = True
-            nodeDist = dist[node]
-            adjacent = []
-            x, y = node
-            if not layout.isWall((x,y+1)):
-                adjacent.append((x,y+1))
-            if not layout.isWall((x,y-1)):
-                adjacent.append((x,y-1) )
-            if not layout.isWall((x+1,y)):
-                adjacent.append((x+1,y) )
-            if not layout.isWall((x-1,y)):
-                adjacent.append((x-1,y))
-            for other in adjacent:
-                if not other in dist:
-                    continue
-                oldDist = dist[other]
-                newDist = nodeDist+1
-                if newDist < oldDist:
-                    dist[other] = newDist
-                    queue.push(other, newDist)
-        for target in allNodes:
-            distances[(target, source)] = dist[target]
-    return distances
+    """
+    Runs a breadth first search from every open cell and returns the
+    resulting DistanceTable.
 
+    Each search expands its whole frontier at once: the set of open cells
+    is a bitboard (bit x * height + y, as in game.BitGrid), and one step
+    of the search is four shifts of the frontier masked by the open cells
+    not yet reached.
+    """
+    table = DistanceTable(layout)
+    height = table.height
+    numCells = table.numCells
+    cellIds = table.cellIds
+    distances = table.distances
 
-def getDistanceOnGrid(distances, pos1, pos2):
-    key = (pos1, pos2)
-    if key in distances:
-      return distances[key]
-    return 100000
+    openCells = 0
+    for x, y in table.cells:
+        openCells |= 1 << (x * height + y)
+    # Moving north or south must not wrap around into the neighbouring column
+    notBottom = notTop = openCells
+    for x in range(table.width):
+        notBottom &= ~(1 << (x * height))
+        notTop &= ~(1 << (x * height + height - 1))
+
+    for source, (x, y) in enumerate(table.cells):
+        row = source * numCells
+        frontier = 1 << (x * height + y)
+        unseen = openCells & ~frontier
+        distances[row + source] = 0
+        depth = 0
+        while frontier:
+            depth += 1
+            frontier = (((frontier << 1) & notBottom) | ((frontier >> 1) & notTop) |
+                        (frontier << height) | (frontier >> height)) & unseen
+            unseen &= ~frontier
+            reached = frontier
+            while reached:
+                low = reached & -reached
+                distances[row + cellIds[low.bit_length() - 1]] = depth
+                reached ^= low
+    return table
+
+
+##########################
+# ON-DISK DISTANCE CACHE #
+##########################
+
+# Directory holding one file of distances per wall layout, or None to keep
+# distances in memory only.  Set it with setCacheDirectory or the
+# PACMAN_DISTANCE_CACHE environment variable.
+CACHE_DIRECTORY = os.environ.get('PACMAN_DISTANCE_CACHE') or None
+
+# magic, byte order, width, height, number of cells
+CACHE_HEADER = struct.Struct('<4sBHHI')
+CACHE_MAGIC = b'PMD1'
+
+def setCacheDirectory(directory):
+  "Turns the on-disk distance cache on (or off, with None)"
+  global CACHE_DIRECTORY
+  CACHE_DIRECTORY = directory
 
+def wallsKey(walls):
+  """
+  A hash of a wall layout that is stable across processes and runs,
+  used to name its cache file.
+  """
+  bits = 0
+  for x, y in walls.asList():
+    bits |= 1 << (x * walls.height + y)
+  return hashlib.sha1(('%d,%d,%x' % (walls.width, walls.height, bits)).encode()).hexdigest()
+
+def cacheFileName(walls):
+  return os.path.join(CACHE_DIRECTORY, 'distances-%s.bin' % wallsKey(walls))
+
+def loadDistances(layout):
+  """
+  Maps the cached distances of layout's walls into memory, returning a
+  DistanceTable or None if the cache is off or has no valid file for them.
+  The file is mapped read-only and paged in on demand, so loading it
+  costs next to nothing.
+  """
+  if CACHE_DIRECTORY == None: return None
+  walls = layout.walls
+  try:
+    with open(cacheFileName(walls), 'rb') as f:
+      data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+  except (OSError, ValueError):
+    return None
+  numCells = len(layout.cells)
+  if len(data) != CACHE_HEADER.size + 2 * numCells * numCells:
+    return None
+  magic, bigEndian, width, height, cells = CACHE_HEADER.unpack_from(data)
+  if (magic != CACHE_MAGIC or bigEndian != (sys.byteorder == 'big') or
+      (width, height, cells) != (walls.width, walls.height, numCells)):
+    return None
+  return DistanceTable(layout, memoryview(data)[CACHE_HEADER.size:].cast('H'))
+
+def saveDistances(layout, table):
+  """
+  Writes table to the cache.  The file is written under a temporary name
+  and renamed into place, so concurrent writers of the same layout never
+  leave a partial file behind; the last one to finish wins.
+  """
+  if CACHE_DIRECTORY == None: return
+  walls = layout.walls
+  try:
+    os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+    fd, tempName = tempfile.mkstemp(dir=CACHE_DIRECTORY, prefix='.distances-')
+    try:
+      with os.fdopen(fd, 'wb') as f:
+        f.write(CACHE_HEADER.pack(CACHE_MAGIC, sys.byteorder == 'big', walls.width, walls.height, table.numCells))
+        f.write(table.distances.tobytes())
+      os.chmod(tempName, 0o644)
+      os.replace(tempName, cacheFileName(walls))
+    except:
+      os.remove(tempName)
+      raise
+  except OSError as e:
+    print('Could not write the distance cache:', e, file=sys.stderr)
+
+
+def getDistanceOnGrid(distances, pos1, pos2):
+    try:
+      return distances.getDistance(pos1, pos2)
+    except Exception:
+      return 100000
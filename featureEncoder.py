@@ -0,0 +1,212 @@
+# featureEncoder.py
+# -----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  GameStates as feature planes for learned models (requires NumPy).
+
+  A FeatureEncoder turns the states an agent sees into a [CHANNELS,
+  width, height] array, from the side of the agent:
+
+    walls, home                  the maze and the agent's side of it
+    food, defendFood             food the agent's team eats / defends
+    capsules, defendCapsules     likewise for capsules
+    self, teammates, opponents   agent positions (opponents if visible)
+    pacmen                       the agents above that are Pacmen
+    scared                       scared timers / SCARED_TIME, at the agents
+    carrying                     food carried, at the agents
+
+  The static planes of a layout (walls, home side and legal moves) are
+  built once per process (getLayoutPlanes) and copied in.  Between calls
+  the encoder only rewrites what changed: the food cells that differ from
+  the last state (found with the bitboards), the capsules if they moved
+  and the cells of the agents.  encodeBatch encodes states, such as the
+  successors of a state, into one preallocated array:
+
+    def registerInitialState(self, gameState):
+      CaptureAgent.registerInitialState(self, gameState)
+      self.encoder = FeatureEncoder(self.index)
+
+    def chooseAction(self, gameState):
+      actions = gameState.getLegalActions(self.index)
+      planes = self.encoder.encodeBatch([gameState.generateSuccessor(self.index, a) for a in actions])
+      ...
+"""
+
+from game import Actions
+import capture, stateCodec
+import numpy as np
+
+CHANNELS = ('walls', 'home', 'food', 'defendFood', 'capsules', 'defendCapsules', 'self', 'teammates',
+            'opponents', 'pacmen', 'scared', 'carrying')
+(WALLS, HOME, FOOD, DEFEND_FOOD, CAPSULES, DEFEND_CAPSULES, SELF, TEAMMATES, OPPONENTS, PACMEN, SCARED,
+ CARRYING) = range(len(CHANNELS))
+STATIC = slice(WALLS, HOME + 1)
+
+class LayoutPlanes:
+  """
+  What feature planes need of a layout: the walls and the home side of
+  each team as [width, height] arrays of shape (padded with walls), the
+  food bitboard masks of each side and the legal moves of each cell.
+  """
+
+  def __init__(self, layout, shape):
+    width, height = layout.width, layout.height
+    if width > shape[0] or height > shape[1]:
+      raise ValueError('The layout is %dx%d, larger than the planes (%dx%d)'
+                       % (width, height, shape[0], shape[1]))
+    self.width, self.height = width, height
+    self.foodBytes = (width * height + 7) // 8
+    self.walls = np.ones(shape, dtype = np.uint8)
+    self.walls[:width, :height] = self.unpack(layout.walls.bits)
+    self.halfway = halfway = width // 2
+    # Own side of red and blue
+    self.home = {True: np.zeros(shape, dtype = np.uint8), False: np.zeros(shape, dtype = np.uint8)}
+    self.home[True][:halfway, :height] = 1
+    self.home[False][halfway:width, :height] = 1
+    # The food bits on each side, as capture.halfGrid finds them
+    self.foodMask = {True: layout.food.getMask(0, halfway), False: layout.food.getMask(halfway, width)}
+
+    table = Actions.getActionTable(layout.walls)
+    self.legal = np.zeros((width * height, len(stateCodec.DIRECTIONS)), dtype = np.bool_)
+    for cell, actions in enumerate(table.actions):
+      for action in actions:
+        self.legal[cell, stateCodec.DIRECTION_CODES[action]] = True
+
+  def unpack(self, bits):
+    "A bitboard (x * height + y) as a [width, height] array"
+    data = np.frombuffer(bits.to_bytes(self.foodBytes, 'little'), dtype = np.uint8)
+    return np.unpackbits(data, count = self.width * self.height, bitorder = 'little').reshape(self.width, self.height)
+
+# LayoutPlanes by layout id and shape
+_layoutPlanes = {}
+
+def getLayoutPlanes(layout, shape = None):
+  "The LayoutPlanes of layout, padded to shape (that of layout by default), built once"
+  if shape == None: shape = (layout.width, layout.height)
+  key = (layout.layoutId, tuple(shape))
+  if key not in _layoutPlanes:
+    _layoutPlanes[key] = LayoutPlanes(layout, tuple(shape))
+  return _layoutPlanes[key]
+
+class FeatureEncoder:
+  """
+  Encodes states as agent index sees them.  shape is the (width,
+  height) of the planes, by default that of the layout of the first
+  state; dtype that of the arrays returned, a floating point type as
+  the scared planes hold fractions.
+  """
+
+  def __init__(self, index, shape = None, dtype = np.float32):
+    if not np.issubdtype(dtype, np.floating):
+      raise ValueError('The planes need a floating point dtype, not %s' % np.dtype(dtype))
+    self.index = index
+    self.shape = tuple(shape) if shape != None else None
+    self.dtype = dtype
+    self.planes = None
+    self.layoutId = None
+
+  def start(self, state):
+    "Starts over on the layout of state, with only the static planes filled in"
+    layout = state.data.layout
+    if self.shape == None: self.shape = (layout.width, layout.height)
+    self.layoutPlanes = getLayoutPlanes(layout, self.shape)
+    self.isRed = state.isOnRedTeam(self.index)
+    self.planes = np.zeros((len(CHANNELS),) + self.shape, dtype = self.dtype)
+    self.planes[WALLS] = self.layoutPlanes.walls
+    self.planes[HOME] = self.layoutPlanes.home[self.isRed]
+    self.layoutId = layout.layoutId
+    self.foodBits = 0
+    self.capsules = []
+    # The cells of the agent planes written by the last call
+    self.agentCells = []
+
+  def encode(self, state):
+    """
+    The planes of state, as a [CHANNELS, width, height] array.  The array
+    is the encoder's own and is changed by the next call: copy it to keep it.
+    """
+    data = state.data
+    if data.layout.layoutId != self.layoutId: self.start(state)
+    planes = self.planes
+    layoutPlanes = self.layoutPlanes
+    height = layoutPlanes.height
+
+    # Food: only the cells whose bit changed
+    bits = data.food.bits
+    changed = bits ^ self.foodBits
+    if changed:
+      if bin(changed).count('1') > 8:
+        for red in (True, False):
+          channel = DEFEND_FOOD if red == self.isRed else FOOD
+          planes[channel, :layoutPlanes.width, :height] = layoutPlanes.unpack(bits & layoutPlanes.foodMask[red])
+      else:
+        while changed:
+          low = changed & -changed
+          cell = low.bit_length() - 1
+          x, y = divmod(cell, height)
+          channel = DEFEND_FOOD if (x < layoutPlanes.halfway) == self.isRed else FOOD
+          planes[channel, x, y] = 1 if bits & low else 0
+          changed ^= low
+      self.foodBits = bits
+
+    if data.capsules != self.capsules:
+      planes[CAPSULES] = 0
+      planes[DEFEND_CAPSULES] = 0
+      for red in (True, False):
+        channel = DEFEND_CAPSULES if red == self.isRed else CAPSULES
+        for x, y in capture.halfList(data.capsules, data.food, red):
+          planes[channel, x, y] = 1
+      self.capsules = list(data.capsules)
+
+    for channel, x, y in self.agentCells:
+      planes[channel, x, y] = 0
+    agentCells = []
+    for i, agentState in enumerate(data.agentStates):
+      conf = agentState.configuration
+      if conf == None: continue
+      x, y = conf.pos
+      x, y = int(x), int(y)
+      if i == self.index: channel = SELF
+      elif state.isOnRedTeam(i) == self.isRed: channel = TEAMMATES
+      else: channel = OPPONENTS
+      planes[channel, x, y] = 1
+      agentCells.append((channel, x, y))
+      if agentState.isPacman:
+        planes[PACMEN, x, y] = 1
+        agentCells.append((PACMEN, x, y))
+      if agentState.scaredTimer:
+        planes[SCARED, x, y] += agentState.scaredTimer / capture.SCARED_TIME
+        agentCells.append((SCARED, x, y))
+      if agentState.numCarrying:
+        planes[CARRYING, x, y] += agentState.numCarrying
+        agentCells.append((CARRYING, x, y))
+    self.agentCells = agentCells
+    return planes
+
+  def encodeBatch(self, states, out = None):
+    """
+    The planes of each of states in out, a [len(states), CHANNELS, width,
+    height] array (allocated if not given), which is returned.  States
+    that differ little, such as successors of one state, are the cheapest
+    to encode one after the other.
+    """
+    if out is None:
+      if self.shape == None:
+        # Without a state there is no layout to take the shape from
+        if len(states) == 0: return np.empty((0, len(CHANNELS), 0, 0), dtype = self.dtype)
+        self.start(states[0])
+      out = np.empty((len(states), len(CHANNELS)) + self.shape, dtype = self.dtype)
+    for n, state in enumerate(states):
+      out[n] = self.encode(state)
+    return out
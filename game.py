@@ -21,7 +21,7 @@
 # For more info, see http://inst.eecs.berkeley.edu/~cs188/sp09/pacman.html
 
 from util import *
-import time, os
+import time, os, random
 import traceback
 import sys
 
@@ -274,6 +274,145 @@ class Grid:
                 bools.append(False)
         return bools
 
+class BitGrid(Grid):
+    """
+    A Grid of booleans packed into a single arbitrary-precision integer
+    (a bitboard): cell (x,y) is bit x * height + y, the same cell order
+    packBits uses.  Data is still accessed via grid[x][y], and asList,
+    count, copy, printing and hashing work on the bitboard directly, so copying
+    or counting a grid costs a few integer operations instead of a walk
+    over every cell.
+    """
+    def __init__(self, width, height, initialValue=False, bitRepresentation=None):
+        if initialValue not in [False, True]: raise Exception('Grids can only contain booleans')
+        self.CELLS_PER_INT = 30
+
+        self.width = width
+        self.height = height
+        self.bits = 0
+        if initialValue:
+            self.bits = (1 << (width * height)) - 1
+        self._columns = None
+        self._frozen = False
+        if bitRepresentation:
+            self._unpackBits(bitRepresentation)
+
+    def __getitem__(self, i):
+        # Column views are built on first access and reused afterwards
+        if self._columns == None:
+            self._columns = [BitGridColumn(self, x) for x in range(self.width)]
+        return self._columns[i]
+
+    def __setitem__(self, key, item):
+        column = self[key]
+        for y in range(self.height):
+            column[y] = item[y]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_columns'] = None
+        state.pop('_actionTable', None)
+        return state
+
+    def __str__(self):
+        bits, height = self.bits, self.height
+        out = [''.join(str(bool((bits >> (x * height + y)) & 1))[0] for x in range(self.width))
+               for y in range(height)]
+        out.reverse()
+        return '\n'.join(out)
+
+    def __eq__(self, other):
+        if other == None: return False
+        if isinstance(other, BitGrid):
+            return self.bits == other.bits and self.height == other.height and self.width == other.width
+        # A plain Grid: equal to it only if every cell is, and then the
+        # hashes agree too (see __hash__)
+        return self.width == other.width and self.height == other.height and self.data == other.data
+
+    def __hash__(self):
+        # Grid.__hash__ sums 2 ** (x * height + y) over the True cells,
+        # which is exactly self.bits, so a BitGrid and an equal Grid hash alike
+        return hash(self.bits)
+
+    def getData(self):
+        "The grid as a list of lists, like Grid.data"
+        return [[bool((self.bits >> (x * self.height + y)) & 1) for y in range(self.height)] for x in range(self.width)]
+    data = property(getData)
+
+    def copy(self):
+        g = BitGrid(self.width, self.height)
+        g.bits = self.bits
+        return g
+
+    def deepCopy(self):
+        return self.copy()
+
+    def shallowCopy(self):
+        # The bitboard is an immutable integer, so a copy is just as cheap
+        return self.copy()
+
+    def count(self, item =True ):
+        ones = bin(self.bits).count('1')
+        if item: return ones
+        return self.width * self.height - ones
+
+    def asList(self, key = True):
+        bits = self.bits
+        if not key:
+            bits = ~bits & ((1 << (self.width * self.height)) - 1)
+        list = []
+        height = self.height
+        while bits:
+            low = bits & -bits
+            index = low.bit_length() - 1
+            list.append( (index // height, index % height) )
+            bits ^= low
+        return list
+
+    def freeze(self):
+        """
+        Makes the grid read-only; writes raise an exception from then on.
+        Copies of a frozen grid are writable.
+        """
+        self._frozen = True
+
+    def getMask(self, xStart, xEnd):
+        "The bitboard mask covering the columns xStart <= x < xEnd"
+        return ((1 << ((xEnd - xStart) * self.height)) - 1) << (xStart * self.height)
+
+class BitGridColumn:
+    "The column grid[x] of a BitGrid; reads and writes go to the bitboard"
+    __slots__ = ('grid', 'offset', 'height')
+
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.offset = x * grid.height
+        self.height = grid.height
+
+    def __getitem__(self, y):
+        if not 0 <= y < self.height:
+            y = self._checkIndex(y)
+        return (self.grid.bits >> (self.offset + y)) & 1 == 1
+
+    def __setitem__(self, y, value):
+        if not 0 <= y < self.height:
+            y = self._checkIndex(y)
+        if self.grid._frozen:
+            raise Exception('Cannot change a frozen grid')
+        if value:
+            self.grid.bits |= 1 << (self.offset + y)
+        else:
+            self.grid.bits &= ~(1 << (self.offset + y))
+
+    def __len__(self):
+        return self.height
+
+    def _checkIndex(self, y):
+        "Handles negative indices the way a list column does"
+        if -self.height <= y < 0:
+            return y + self.height
+        raise IndexError('grid index out of range')
+
 def reconstituteGrid(bitRep):
     if type(bitRep) is not type((1,2)):
         return bitRep
@@ -329,9 +468,38 @@ class Actions:
         return (dx * speed, dy * speed)
     directionToVector = staticmethod(directionToVector)
 
+    def getActionTable(walls):
+        """
+        Returns the ActionTable of a frozen walls grid, building it on
+        first use and keeping it on the grid.  Returns None for grids that
+        can still change.
+        """
+        table = getattr(walls, '_actionTable', None)
+        if table is None and getattr(walls, '_frozen', False):
+            table = walls._actionTable = ActionTable(walls)
+        return table
+    getActionTable = staticmethod(getActionTable)
+
+    def getPossibleActionTuple(config, walls):
+        """
+        The possible actions as a tuple.  On a grid point of frozen walls
+        this is the tuple shared by the ActionTable, so it must not be
+        changed.
+        """
+        x, y = config.pos
+        table = Actions.getActionTable(walls)
+        if table is not None and x == int(x) and y == int(y):
+            return table.actions[int(x) * table.height + int(y)]
+        return tuple(Actions.getPossibleActions(config, walls))
+    getPossibleActionTuple = staticmethod(getPossibleActionTuple)
+
     def getPossibleActions(config, walls):
-        possible = []
         x, y = config.pos
+        table = Actions.getActionTable(walls)
+        if table is not None and x == int(x) and y == int(y):
+            return list(table.actions[int(x) * table.height + int(y)])
+
+        possible = []
         x_int, y_int = int(x + 0.5), int(y + 0.5)
 
         # In between grid points, all agents must continue straight
@@ -349,8 +517,16 @@ class Actions:
     getPossibleActions = staticmethod(getPossibleActions)
 
     def getLegalNeighbors(position, walls):
+        """
+        The positions reachable in one move (staying put included), as a
+        tuple.  For frozen walls this is the tuple shared by the
+        ActionTable, so it must not be changed.
+        """
         x,y = position
         x_int, y_int = int(x + 0.5), int(y + 0.5)
+        table = Actions.getActionTable(walls)
+        if table is not None:
+            return table.neighbors[x_int * table.height + y_int]
         neighbors = []
         for dir, vec in Actions._directionsAsList:
             dx, dy = vec
@@ -359,7 +535,7 @@ class Actions:
             next_y = y_int + dy
             if next_y < 0 or next_y == walls.height: continue
             if not walls[next_x][next_y]: neighbors.append((next_x, next_y))
-        return neighbors
+        return tuple(neighbors)
     getLegalNeighbors = staticmethod(getLegalNeighbors)
 
     def getSuccessor(position, action):
@@ -368,6 +544,116 @@ class Actions:
         return (x + dx, y + dy)
     getSuccessor = staticmethod(getSuccessor)
 
+class ActionTable:
+    """
+    The moves out of every cell of a maze, computed once from its walls.
+
+    For the cell (x, y), at index x * height + y, actions[index] is the
+    tuple of possible actions and neighbors[index] the tuple of cells
+    they lead to, in the same order.  Moves that would leave the grid are
+    left out.  Use Actions.getActionTable to get the table of a layout.
+    """
+    def __init__(self, walls):
+        self.width = walls.width
+        self.height = walls.height
+        self.actions = []
+        self.neighbors = []
+        for x in range(self.width):
+            for y in range(self.height):
+                actions, neighbors = [], []
+                for dir, (dx, dy) in Actions._directionsAsList:
+                    next_x, next_y = x + dx, y + dy
+                    if not (0 <= next_x < self.width and 0 <= next_y < self.height): continue
+                    if walls[next_x][next_y]: continue
+                    actions.append(dir)
+                    neighbors.append((next_x, next_y))
+                self.actions.append(tuple(actions))
+                self.neighbors.append(tuple(neighbors))
+
+def _mix64(n):
+    "The SplitMix64 finalizer: spreads an integer over 64 bits"
+    z = (n + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return z ^ (z >> 31)
+
+class ZobristKeys:
+    """
+    The random 64 bit keys that hash the game states of one layout.
+
+    The hash of a state is the xor of the keys of its features: the
+    configuration, scared timer, food carried and returned and Pacman
+    flag of each agent, each food dot, each capsule and the score.  When a feature changes, its old key is xored
+    out and its new one in, so the hash of a successor follows from its
+    parent's in a handful of operations (see GameStateData.updateHash).
+
+    Keys come from a fixed seed and only depend on the size of the
+    layout, so hashes agree between processes.  Use
+    Layout.getZobristKeys rather than building these directly.
+    """
+    SEED = 0x5A0B
+    DIRECTIONS = {Directions.NORTH: 0, Directions.SOUTH: 1, Directions.EAST: 2,
+                  Directions.WEST: 3, Directions.STOP: 4}
+
+    def __init__(self, layout):
+        rng = random.Random(ZobristKeys.SEED)
+        bits = rng.getrandbits
+        self.width = layout.width
+        self.height = layout.height
+        numCells = self.width * self.height
+        self.food = [bits(64) for i in range(numCells)]
+        self.capsules = [bits(64) for i in range(numCells)]
+        # Grid point configurations, at (x * height + y) * 5 + direction
+        self.agents = [[bits(64) for i in range(numCells * 5)]
+                       for agent in layout.agentPositions]
+        self.hidden = [bits(64) for agent in layout.agentPositions]
+        self.timerSalt = bits(64)
+        self.scoreSalt = bits(64)
+        self.otherSalt = bits(64)
+        self.carrySalt = bits(64)
+
+    def agentKey(self, index, agentState):
+        "The key of agent index's configuration, scared timer, food and Pacman flag"
+        conf = agentState.configuration
+        if conf == None:
+            key = self.hidden[index]
+        else:
+            x, y = conf.pos
+            direction = ZobristKeys.DIRECTIONS.get(conf.direction)
+            if x == int(x) and y == int(y) and direction != None:
+                key = self.agents[index][(int(x) * self.height + int(y)) * 5 + direction]
+            else:
+                # Between grid points (half speed agents in pacman.py)
+                key = _mix64(self.otherSalt ^ hash((index, x, y, str(conf.direction))))
+        if agentState.scaredTimer:
+            key ^= _mix64(self.timerSalt ^ (index << 32) ^ agentState.scaredTimer)
+        if agentState.numCarrying or agentState.numReturned or agentState.isPacman:
+            key ^= _mix64(self.carrySalt ^ hash((index, agentState.numCarrying,
+                                                 agentState.numReturned, bool(agentState.isPacman))))
+        return key
+
+    def foodKey(self, position):
+        x, y = position
+        return self.food[int(x) * self.height + int(y)]
+
+    def capsuleKey(self, position):
+        x, y = position
+        return self.capsules[int(x) * self.height + int(y)]
+
+    def scoreKey(self, score):
+        return _mix64(self.scoreSalt ^ hash(score))
+
+    def hashState(self, data):
+        "The hash of a GameStateData, from scratch"
+        key = self.scoreKey(data.score)
+        for index, agentState in enumerate(data.agentStates):
+            key ^= self.agentKey(index, agentState)
+        for position in data.food.asList():
+            key ^= self.foodKey(position)
+        for position in data.capsules:
+            key ^= self.capsuleKey(position)
+        return key
+
 class GameStateData:
     """
 
@@ -375,15 +661,27 @@ class GameStateData:
     def __init__( self, prevState = None ):
         """
         Generates a new data packet by copying information from its predecessor.
+
+        The copy is copy-on-write: the food grid, the capsule list and the
+        agent states are shared with prevState until they are first changed.
+        Rules that edit them must go through getMutableFood,
+        getMutableCapsules and getMutableAgentState.
         """
-        if prevState != None:
-            self.food = prevState.food.shallowCopy()
-            self.capsules = prevState.capsules[:]
-            self.agentStates = self.copyAgentStates( prevState.agentStates )
+        isCopy = prevState != None
+        if isCopy:
+            self.food = prevState.food
+            self.capsules = prevState.capsules
+            self.agentStates = prevState.agentStates[:]
             self.layout = prevState.layout
             self._eaten = prevState._eaten
             self.score = prevState.score
+            self.foodLeft = prevState.foodLeft
+            self.foodReturned = prevState.foodReturned
+            self.foodCarried = prevState.foodCarried
 
+        self._ownsFood = not isCopy
+        self._ownsCapsules = not isCopy
+        self._ownedAgents = set()
         self._foodEaten = None
         self._foodAdded = None
         self._capsuleEaten = None
@@ -391,15 +689,21 @@ class GameStateData:
         self._lose = False
         self._win = False
         self.scoreChange = 0
+        self._hash = None
 
     def deepCopy( self ):
         state = GameStateData( self )
         state.food = self.food.deepCopy()
-        state.layout = self.layout.deepCopy()
+        state.capsules = self.capsules[:]
+        state.agentStates = self.copyAgentStates( self.agentStates )
+        state._ownsFood = True
+        state._ownsCapsules = True
+        state._ownedAgents = set(range(len(state.agentStates)))
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
         state._foodAdded = self._foodAdded
         state._capsuleEaten = self._capsuleEaten
+        state._hash = self._hash
         return state
 
     def copyAgentStates( self, agentStates ):
@@ -408,6 +712,30 @@ class GameStateData:
             copiedStates.append( agentState.copy() )
         return copiedStates
 
+    def getMutableAgentState( self, index ):
+        """
+        Returns the state of agent index, copying it first if it is still
+        shared with the state this one was generated from.
+        """
+        if index not in self._ownedAgents:
+            self.agentStates[index] = self.agentStates[index].copy()
+            self._ownedAgents.add(index)
+        return self.agentStates[index]
+
+    def getMutableFood( self ):
+        "Returns the food grid, copying it first if it is still shared."
+        if not self._ownsFood:
+            self.food = self.food.copy()
+            self._ownsFood = True
+        return self.food
+
+    def getMutableCapsules( self ):
+        "Returns the capsule list, copying it first if it is still shared."
+        if not self._ownsCapsules:
+            self.capsules = self.capsules[:]
+            self._ownsCapsules = True
+        return self.capsules
+
     def __eq__( self, other ):
         """
         Allows two states to be compared.
@@ -424,13 +752,42 @@ class GameStateData:
         """
         Allows states to be keys of dictionaries.
         """
-        for i, state in enumerate( self.agentStates ):
-            try:
-                int(hash(state))
-            except TypeError as e:
-                print(e)
-                #hash(state)
-        return int((hash(tuple(self.agentStates)) + 13*hash(self.food) + 113* hash(tuple(self.capsules)) + 7 * hash(self.score)) % 1048575 )
+        return self.getZobristHash()
+
+    def getZobristHash( self ):
+        """
+        Returns the 64 bit Zobrist hash of the state (see ZobristKeys).
+        It is computed on first use and cached, so a state must not be
+        changed once it has been hashed.
+        """
+        if self._hash == None:
+            self._hash = self.layout.getZobristKeys().hashState( self )
+        return self._hash
+
+    def updateHash( self, prevState ):
+        """
+        Derives the hash of this state from that of prevState, the state it
+        was copied from, in time independent of the size of the board.
+        The copy-on-write bookkeeping tells which agents changed, and the
+        rules record the food eaten and added and the capsule eaten.  If
+        prevState was never hashed, the hash is left to be computed on use.
+        """
+        if prevState._hash == None: return
+        keys = self.layout.getZobristKeys()
+        key = prevState._hash
+        for index in self._ownedAgents:
+            key ^= keys.agentKey( index, prevState.agentStates[index] )
+            key ^= keys.agentKey( index, self.agentStates[index] )
+        if self._foodEaten != None:
+            key ^= keys.foodKey( self._foodEaten )
+        if self._foodAdded != None:
+            for position in self._foodAdded:
+                key ^= keys.foodKey( position )
+        if self._capsuleEaten != None:
+            key ^= keys.capsuleKey( self._capsuleEaten )
+        if self.score != prevState.score:
+            key ^= keys.scoreKey( prevState.score ) ^ keys.scoreKey( self.score )
+        self._hash = key
 
     def __str__( self ):
         width, height = self.layout.width, self.layout.height
@@ -490,7 +847,7 @@ class GameStateData:
         """
         self.food = layout.food.copy()
         #self.capsules = []
-        self.capsules = layout.capsules[:]
+        self.capsules = list(layout.capsules)
         self.layout = layout
         self.score = 0
         self.scoreChange = 0
@@ -503,6 +860,16 @@ class GameStateData:
                 else: numGhosts += 1
             self.agentStates.append( AgentState( Configuration( pos, Directions.STOP), isPacman) )
         self._eaten = [False for a in self.agentStates]
+        # Food left on each side, returned and carried by each team, as
+        # (red, blue) pairs; capture.GameState.countFood sets them and the
+        # capture rules keep them up to date
+        self.foodLeft = (0, 0)
+        self.foodReturned = (0, 0)
+        self.foodCarried = (0, 0)
+        self._ownsFood = True
+        self._ownsCapsules = True
+        self._ownedAgents = set(range(len(self.agentStates)))
+        self._hash = None
 
 try:
     import boinc
@@ -510,6 +877,45 @@ try:
 except:
     _BOINC_ENABLED = False
 
+class TimeLedger:
+    """
+    The time each agent has used, kept against the limits of the rules.
+    A move may take getMoveTimeout seconds, or what is left of the agent's
+    getMaxTotalTime if that is less; a move slower than getMoveWarningTime
+    earns a warning, and more than getMaxTimeWarnings warnings or more than
+    getMaxTotalTime seconds in all lose the game.  Times are in (fractions
+    of) seconds.
+    """
+    def __init__( self, rules, numAgents ):
+        self.rules = rules
+        self.totalTimes = [0.0 for i in range(numAgents)]
+        self.warnings = [0 for i in range(numAgents)]
+
+    def getStartupBudget( self, agentIndex ):
+        return self.rules.getMaxStartupTime(agentIndex)
+
+    def getMoveBudget( self, agentIndex ):
+        "The seconds the next move of agentIndex may take"
+        left = self.rules.getMaxTotalTime(agentIndex) - self.totalTimes[agentIndex]
+        return min(self.rules.getMoveTimeout(agentIndex), left)
+
+    def chargeStartup( self, agentIndex, seconds ):
+        self.totalTimes[agentIndex] += seconds
+
+    def chargeMove( self, agentIndex, seconds ):
+        "Adds the time of a move to the agent's total; returns True if it earns a warning"
+        self.totalTimes[agentIndex] += seconds
+        if seconds > self.rules.getMoveWarningTime(agentIndex):
+            self.warnings[agentIndex] += 1
+            return True
+        return False
+
+    def isOverWarnings( self, agentIndex ):
+        return self.warnings[agentIndex] > self.rules.getMaxTimeWarnings(agentIndex)
+
+    def isOverTotal( self, agentIndex ):
+        return self.totalTimes[agentIndex] > self.rules.getMaxTotalTime(agentIndex)
+
 class Game:
     """
     The Game manages the control flow, soliciting actions from agents.
@@ -525,8 +931,13 @@ class Game:
         self.muteAgents = muteAgents
         self.catchExceptions = catchExceptions
         self.moveHistory = []
-        self.totalAgentTimes = [0 for agent in agents]
-        self.totalAgentTimeWarnings = [0 for agent in agents]
+        # Receives every move as it is made (see captureReplay)
+        self.recorder = None
+        # Receives the time each turn spends in each phase (see turnProfiler)
+        self.profiler = None
+        self.timeLedger = TimeLedger(rules, len(agents))
+        self.totalAgentTimes = self.timeLedger.totalTimes
+        self.totalAgentTimeWarnings = self.timeLedger.warnings
         self.agentTimeout = False
         import io
         self.agentOutput = [io.StringIO() for agent in agents]
@@ -587,12 +998,12 @@ class Game:
                 self.mute(i)
                 if self.catchExceptions:
                     try:
-                        timed_func = TimeoutFunction(agent.registerInitialState, int(self.rules.getMaxStartupTime(i)))
+                        timed_func = TimeoutFunction(agent.registerInitialState, self.timeLedger.getStartupBudget(i))
                         try:
                             start_time = time.time()
                             timed_func(self.state.deepCopy())
                             time_taken = time.time() - start_time
-                            self.totalAgentTimes[i] += time_taken
+                            self.timeLedger.chargeStartup(i, time_taken)
                         except TimeoutFunctionException:
                             print("Agent %d ran out of time on startup!" % i, file=sys.stderr)
                             self.unmute()
@@ -610,19 +1021,23 @@ class Game:
 
         agentIndex = self.startingIndex
         numAgents = len( self.agents )
+        profiler = self.profiler
+        clock = time.perf_counter
 
         while not self.gameOver:
-            time.sleep(0.01) ## added
             # Fetch the next agent
             agent = self.agents[agentIndex]
+            if profiler != None: turn_start = clock()
             move_time = 0
             skip_action = False
+            if self.catchExceptions:
+                move_budget = self.timeLedger.getMoveBudget(agentIndex)
             # Generate an observation of the state
             if 'observationFunction' in dir( agent ):
                 self.mute(agentIndex)
                 if self.catchExceptions:
                     try:
-                        timed_func = TimeoutFunction(agent.observationFunction, int(self.rules.getMoveTimeout(agentIndex)))
+                        timed_func = TimeoutFunction(agent.observationFunction, move_budget)
                         try:
                             start_time = time.time()
                             observation = timed_func(self.state.deepCopy())
@@ -639,13 +1054,14 @@ class Game:
                 self.unmute()
             else:
                 observation = self.state.deepCopy()
+            if profiler != None: observation_end = clock()
 
             # Solicit an action
             action = None
             self.mute(agentIndex)
             if self.catchExceptions:
                 try:
-                    timed_func = TimeoutFunction(agent.getAction, int(self.rules.getMoveTimeout(agentIndex)) - int(move_time))
+                    timed_func = TimeoutFunction(agent.getAction, move_budget - move_time)
                     try:
                         start_time = time.time()
                         if skip_action:
@@ -660,19 +1076,17 @@ class Game:
 
                     move_time += time.time() - start_time
 
-                    if move_time > self.rules.getMoveWarningTime(agentIndex):
-                        self.totalAgentTimeWarnings[agentIndex] += 1
+                    if self.timeLedger.chargeMove(agentIndex, move_time):
                         print("Agent %d took too long to make a move! This is warning %d" % (agentIndex, self.totalAgentTimeWarnings[agentIndex]), file=sys.stderr)
-                        if self.totalAgentTimeWarnings[agentIndex] > self.rules.getMaxTimeWarnings(agentIndex):
+                        if self.timeLedger.isOverWarnings(agentIndex):
                             print("Agent %d exceeded the maximum number of warnings: %d" % (agentIndex, self.totalAgentTimeWarnings[agentIndex]), file=sys.stderr)
                             self.agentTimeout = True
                             self._agentCrash(agentIndex, quiet=True)
                             self.unmute()
                             return
 
-                    self.totalAgentTimes[agentIndex] += move_time
                     #print "Agent: %d, time: %f, total: %f" % (agentIndex, move_time, self.totalAgentTimes[agentIndex])
-                    if self.totalAgentTimes[agentIndex] > self.rules.getMaxTotalTime(agentIndex):
+                    if self.timeLedger.isOverTotal(agentIndex):
                         print("Agent %d ran out of time! (time: %1.2f)" % (agentIndex, self.totalAgentTimes[agentIndex]), file=sys.stderr)
                         self.agentTimeout = True
                         self._agentCrash(agentIndex, quiet=True)
@@ -686,6 +1100,7 @@ class Game:
             else:
                 action = agent.getAction(observation)
             self.unmute()
+            if profiler != None: action_end = clock()
 
             # Execute the action
             self.moveHistory.append( (agentIndex, action) )
@@ -699,14 +1114,21 @@ class Game:
                     return
             else:
                 self.state = self.state.generateSuccessor( agentIndex, action )
+            if self.recorder != None:
+                self.recorder.recordAction( agentIndex, action, self.state )
+            if profiler != None: successor_end = clock()
 
             # Change the display
             self.display.update( self.state.data )
             ###idx = agentIndex - agentIndex % 2 + 1
             ###self.display.update( self.state.makeObservation(idx).data )
+            if profiler != None: display_end = clock()
 
             # Allow for game specific conditions (winning, losing, etc.)
             self.rules.process(self.state, self)
+            if profiler != None:
+                profiler.recordTurn(agentIndex, observation_end - turn_start, action_end - observation_end,
+                                    successor_end - action_end, display_end - successor_end, clock() - display_end)
             # Track progress
             if agentIndex == numAgents + 1: self.numMoves += 1
             # Next agent
@@ -0,0 +1,206 @@
+# isolatedAgents.py
+# -----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  Capture teams that run in processes of their own.
+
+  loadIsolatedAgents starts a long-lived process for a team, which loads
+  the team module there, and returns stand-in agents for the game.  Each
+  call the game makes on a stand-in is sent to the team's process as a
+  stateCodec encoded state and the answer is waited for with a deadline:
+  a team that runs over it is stopped, as is one whose process dies,
+  without either stalling the game or leaving anything behind in it.
+  The process is started again for the next game.
+
+  Observations are made by the game's process with
+  GameState.makeObservation, so the team only ever receives what its
+  agents may see.  Use it with python capture.py --isolate.
+"""
+
+from game import Agent
+from parallelSearch import alarmHeld
+import stateCodec, util
+import multiprocessing, os, signal, sys, time, traceback
+
+class TeamError(Exception):
+  "An agent raised an exception, or its process died"
+  pass
+
+def _serveTeam(connection, factory, isRed, args, mute):
+  "The loop run by a team's process"
+  import capture
+  # Interrupts go to the game, which stops the team
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
+  if mute:
+    sys.stdout = sys.stderr = open(os.devnull, 'w')
+  try:
+    agents = dict((agent.index, agent) for agent in capture.loadAgents(isRed, factory, True, args) if agent != None)
+    loadError = 'The team "%s" could not be loaded' % factory
+  except Exception:
+    agents = {}
+    loadError = traceback.format_exc()
+  while True:
+    try:
+      message = connection.recv()
+    except EOFError:
+      break
+    if message == None: break
+    kind, sequence, index = message[:3]
+    try:
+      if index not in agents:
+        raise TeamError(loadError)
+      agent = agents[index]
+      result = None
+      if kind == 'ping':
+        # The messaging alone, for benchmark.py isolation
+        stateCodec.decodeState(message[3])
+      elif kind == 'register':
+        layoutData, data = message[3:]
+        stateCodec.decodeLayout(layoutData)
+        agent.registerInitialState(stateCodec.decodeState(data))
+      elif kind == 'action':
+        result = agent.getAction(stateCodec.decodeState(message[3]))
+      elif kind == 'final':
+        agent.final(stateCodec.decodeState(message[3]))
+      reply = (sequence, True, result)
+    except Exception:
+      reply = (sequence, False, traceback.format_exc())
+    connection.send(reply)
+  connection.close()
+
+class TeamProcess:
+  """
+  The process a team runs in.  request sends it one call and waits at
+  most timeout seconds for the answer.  A call that fails to answer in
+  time raises util.TimeoutFunctionException, and the process is killed
+  (a team that overran its move may never come back); it is started again
+  by the next call that registers an agent.
+  """
+
+  def __init__(self, factory, isRed, args = None, mute = False):
+    self.factory = factory
+    self.isRed = isRed
+    self.args = args or {}
+    self.mute = mute
+    self.sequence = 0
+    self.process = None
+    self.connection = None
+    self.start()
+
+  def start(self):
+    # A fresh interpreter: the team shares nothing with the game's process
+    context = multiprocessing.get_context('spawn')
+    self.connection, teamConnection = context.Pipe()
+    self.process = context.Process(target = _serveTeam,
+                                   args = (teamConnection, self.factory, self.isRed, self.args, self.mute))
+    self.process.daemon = True
+    self.process.start()
+    teamConnection.close()
+
+  def isAlive(self):
+    return self.process != None and self.process.is_alive()
+
+  def request(self, kind, index, payload, timeout):
+    """
+    Sends (kind, index) + payload and returns the team's answer.  Raises
+    TeamError if the agent raised an exception or the process died.
+    """
+    if not self.isAlive():
+      if kind != 'register':
+        raise TeamError('The process of team "%s" has stopped' % self.factory)
+      self.stop()
+      self.start()
+    self.sequence += 1
+    deadline = time.time() + timeout
+    try:
+      with alarmHeld():
+        self.connection.send((kind, self.sequence, index) + payload)
+      while True:
+        remaining = deadline - time.time()
+        if remaining <= 0 or not self.connection.poll(remaining):
+          raise util.TimeoutFunctionException()
+        with alarmHeld():
+          sequence, ok, result = self.connection.recv()
+        # Answers to calls that timed out are dropped
+        if sequence == self.sequence: break
+    except (EOFError, OSError):
+      self.stop()
+      raise TeamError('The process of team "%s" died' % self.factory) from None
+    except BaseException:
+      self.stop()
+      raise
+    if not ok:
+      raise TeamError('Agent %d raised an exception:\n%s' % (index, result))
+    return result
+
+  def stop(self, timeout = 0.0):
+    "Stops the process, killing it if it has not exited within timeout seconds"
+    if self.process == None: return
+    try:
+      with alarmHeld():
+        self.connection.send(None)
+    except (OSError, EOFError):
+      pass
+    self.process.join(timeout)
+    if self.process.is_alive():
+      self.process.kill()
+      self.process.join()
+    self.connection.close()
+    self.process = None
+    self.connection = None
+
+class IsolatedAgent(Agent):
+  """
+  Stands in for an agent of a team that runs in a TeamProcess.  Calls
+  are given startupTimeout seconds to register and moveTimeout seconds
+  for each move (and for final), measured in the game's process.
+  """
+
+  def __init__(self, index, team, startupTimeout, moveTimeout):
+    Agent.__init__(self, index)
+    self.team = team
+    self.startupTimeout = startupTimeout
+    self.moveTimeout = moveTimeout
+
+  def registerInitialState(self, gameState):
+    layout = gameState.data.layout
+    self.team.request('register', self.index, (stateCodec.encodeLayout(layout), stateCodec.encodeState(gameState)),
+                      self.startupTimeout)
+
+  def observationFunction(self, gameState):
+    return gameState.makeObservation(self.index)
+
+  def getAction(self, gameState):
+    return self.team.request('action', self.index, (stateCodec.encodeState(gameState),), self.moveTimeout)
+
+  def final(self, gameState):
+    self.team.request('final', self.index, (stateCodec.encodeState(gameState),), self.moveTimeout)
+
+  def ping(self, gameState):
+    "Sends gameState to the team's process and back without calling the agent"
+    self.team.request('ping', self.index, (stateCodec.encodeState(gameState),), self.moveTimeout)
+
+def loadIsolatedAgents(isRed, factory, cmdLineArgs, mute = False):
+  """
+  Starts the process of a team and returns its stand-in agents, with the
+  time limits of CaptureRules.
+  """
+  import capture
+  if not factory.endswith('.py'):
+    factory += '.py'
+  rules = capture.CaptureRules()
+  team = TeamProcess(os.path.abspath(factory), isRed, cmdLineArgs, mute)
+  indices = [2 * i + (0 if isRed else 1) for i in range(2)]
+  return [IsolatedAgent(index, team, rules.getMaxStartupTime(index), rules.getMoveTimeout(index))
+          for index in indices]
@@ -14,8 +14,13 @@
 
 from util import manhattanDistance
 from game import Grid
+from game import BitGrid
+from game import Actions
+from game import ZobristKeys
 import os
 import random
+import array
+import hashlib
 from functools import reduce
 
 VISIBILITY_MATRIX_CACHE = {}
@@ -23,19 +28,41 @@ VISIBILITY_MATRIX_CACHE = {}
 class Layout:
     """
     A Layout manages the static information about the game board.
+
+    A Layout does not change once it is built: its walls and food grids
+    are frozen, its capsules and agent positions are tuples, and the
+    open cells, their index and the food count are computed up front.
+    Game states and their copies all share one Layout by reference.
     """
 
     def __init__(self, layoutText):
         self.width = len(layoutText[0])
         self.height= len(layoutText)
-        self.walls = Grid(self.width, self.height, False)
-        self.food = Grid(self.width, self.height, False)
+        self.walls = BitGrid(self.width, self.height, False)
+        self.food = BitGrid(self.width, self.height, False)
         self.capsules = []
         self.agentPositions = []
         self.numGhosts = 0
+        self._zobristKeys = None
         self.processLayoutText(layoutText)
-        self.layoutText = layoutText
-        self.totalFood = len(self.food.asList())
+        self.layoutText = tuple(layoutText)
+        self.walls.freeze()
+        self.food.freeze()
+        self.capsules = tuple(self.capsules)
+        self.agentPositions = tuple(self.agentPositions)
+        self.totalFood = self.food.count()
+        # Eight bytes of the digest of the text identify the layout in
+        # encoded game states (see stateCodec)
+        self.layoutId = hashlib.sha1("\n".join(self.layoutText).encode()).digest()[:8]
+
+        # The open cells in column-major order, and the index of each
+        # position (at x * height + y) in that list, -1 for walls
+        self.cells = tuple(self.walls.asList(False))
+        self.cellIndex = array.array('i', [-1]) * (self.width * self.height)
+        for index, (x, y) in enumerate(self.cells):
+            self.cellIndex[x * self.height + y] = index
+        # The legal moves out of every cell, kept on the frozen walls grid
+        Actions.getActionTable(self.walls)
         # self.initializeVisibilityMatrix()
 
     def getNumGhosts(self):
@@ -90,8 +117,15 @@ class Layout:
     def __str__(self):
         return "\n".join(self.layoutText)
 
+    def getZobristKeys(self):
+        "The ZobristKeys that hash game states on this layout, built on first use"
+        if self._zobristKeys == None:
+            self._zobristKeys = ZobristKeys(self)
+        return self._zobristKeys
+
     def deepCopy(self):
-        return Layout(self.layoutText[:])
+        # Layouts are immutable, so a copy can share everything
+        return self
 
     def processLayoutText(self, layoutText):
         """
@@ -143,6 +177,22 @@ def getLayout(name, back = 2):
         os.chdir(curdir)
     return layout
 
+def loadLayout(name):
+    """
+    A capture layout by name, or RANDOM<seed> for the maze generated from
+    seed.  Raises an Exception for a layout that cannot be found.
+    """
+    if name.startswith('RANDOM'):
+        if name == 'RANDOM':
+            raise Exception('Random layouts need a seed (RANDOM<seed>) to be played again')
+        import mazeGenerator
+        return Layout(mazeGenerator.generateMaze(int(name[6:])).split('\n'))
+    if name.lower().find('capture') == -1:
+        raise Exception('You must use a capture layout with capture.py')
+    l = getLayout(name)
+    if l == None: raise Exception("The layout " + name + " cannot be found")
+    return l
+
 def tryToLoad(fullname):
     if(not os.path.exists(fullname)): return None
     f = open(fullname)
@@ -254,7 +254,8 @@ def add_pacman_stuff(maze, max_food=60, max_capsules=4, toskip=0):
 MAX_DIFFERENT_MAZES = 10000
 
 def generateMaze(seed = None):
-  if not seed:
+  # Only a missing seed picks one at random: 0 is a seed like any other
+  if seed == None:
     seed = random.randint(1,MAX_DIFFERENT_MAZES)
   random.seed(seed)
   maze = Maze(16,16)
@@ -0,0 +1,198 @@
+# parallelSearch.py
+# -----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  Root-parallel search for capture agents over a pool of processes.
+
+  Every worker process holds a copy of the agent and, for each move,
+  searches the state the agent sends it (encoded by stateCodec) until a
+  shared deadline.  The agent then merges their root statistics into its
+  move.  Any agent with
+  getSearchTime, getRootStatistics and mergeRootStatistics methods works,
+  e.g. captureSearch.SearchAgent (the workers split the root moves) or
+  captureMCTS.MonteCarloAgent (the workers' visit counts are added up):
+
+    class MyAgent(RootParallelAgent, MonteCarloAgent):
+      numWorkers = 3
+
+  The pool is started in registerInitialState and stopped in final.
+"""
+
+import stateCodec
+import multiprocessing, multiprocessing.connection
+import contextlib, random, signal, sys, time, traceback
+
+@contextlib.contextmanager
+def alarmHeld():
+  """
+  Holds back SIGALRM, which game.TimeoutFunction uses to interrupt a slow
+  move, while a message is written to or read from a worker.  A timeout
+  then arrives between messages instead of cutting one in half.
+  """
+  if not hasattr(signal, 'pthread_sigmask'):
+    yield
+    return
+  old = signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGALRM])
+  try:
+    yield
+  finally:
+    signal.pthread_sigmask(signal.SIG_SETMASK, old)
+
+def _serve(agent, startState, connection, worker, numWorkers, seed):
+  "The loop run by each worker process"
+  # Interrupts go to the game, which shuts the pool down
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
+  random.seed(seed)
+  while True:
+    try:
+      message = connection.recv()
+      # Only the newest request is worth searching
+      while message != None and connection.poll():
+        message = connection.recv()
+    except EOFError:
+      break
+    if message == None: break
+    sequence, encoded, deadline = message
+    # A failed search sends back its traceback for the agent to report
+    statistics, error = None, None
+    try:
+      state = stateCodec.decodeState(encoded, startState)
+      searchTime = max(0.0, deadline - time.time())
+      statistics = agent.getRootStatistics(state, searchTime, worker, numWorkers)
+    except Exception:
+      error = traceback.format_exc()
+    connection.send((sequence, statistics, error))
+  connection.close()
+
+class RootParallelSearch:
+  """
+  A pool of worker processes searching for one agent.
+
+  search sends every worker the state, tagged with a sequence number,
+  and waits for their statistics until the deadline.  Replies that come
+  too late are dropped when they are read during a later search, so a
+  slow worker or a move cut short by the game's timeout never leaves the
+  pool out of step.  Workers that die are left out of later searches;
+  the first error each worker's search raises is printed to stderr.
+  """
+
+  def __init__(self, agent, startState, numWorkers = 2, margin = 0.05):
+    """
+    Starts numWorkers processes, each with a copy of agent and of
+    startState.  Workers stop searching margin seconds before the
+    deadline, leaving time to collect and merge their results.
+    """
+    self.agent = agent
+    self.margin = margin
+    self.sequence = 0
+    if 'fork' in multiprocessing.get_all_start_methods():
+      context = multiprocessing.get_context('fork')
+    else:
+      context = multiprocessing.get_context()
+    self.processes = []
+    self.connections = []
+    # Worker number of each connection, and the workers whose errors were reported
+    self.workers = {}
+    self.reported = set()
+    for worker in range(numWorkers):
+      connection, workerConnection = context.Pipe()
+      process = context.Process(target = _serve, args = (agent, startState, workerConnection, worker,
+                                                       numWorkers, random.randint(0, 2**31 - 1)))
+      process.daemon = True
+      process.start()
+      workerConnection.close()
+      self.processes.append(process)
+      self.connections.append(connection)
+      self.workers[connection] = worker
+
+  def search(self, gameState, searchTime = None):
+    """
+    Searches gameState on all workers for searchTime seconds (the agent's
+    getSearchTime by default) and returns the agent's merged choice.
+    """
+    if searchTime == None: searchTime = self.agent.getSearchTime()
+    deadline = time.time() + searchTime
+    self.sequence += 1
+    message = (self.sequence, stateCodec.encodeState(gameState), deadline - self.margin)
+    waiting = []
+    for connection in list(self.connections):
+      try:
+        with alarmHeld():
+          connection.send(message)
+        waiting.append(connection)
+      except (OSError, EOFError):
+        self.connections.remove(connection)
+
+    statistics = []
+    while waiting:
+      remaining = deadline - time.time()
+      if remaining <= 0: break
+      for connection in multiprocessing.connection.wait(waiting, remaining):
+        try:
+          with alarmHeld():
+            sequence, workerStatistics, error = connection.recv()
+        except (OSError, EOFError):
+          # The worker died
+          waiting.remove(connection)
+          self.connections.remove(connection)
+          continue
+        if error != None: self.reportError(self.workers[connection], error)
+        if sequence != self.sequence: continue # Late reply to an earlier move
+        waiting.remove(connection)
+        if workerStatistics != None: statistics.append(workerStatistics)
+    return self.agent.mergeRootStatistics(gameState, statistics)
+
+  def reportError(self, worker, error):
+    "Prints the first error of a worker's search; the rest would repeat it"
+    if worker in self.reported: return
+    self.reported.add(worker)
+    print('Search worker %d failed, its results are left out:\n%s' % (worker, error), file=sys.stderr)
+
+  def shutdown(self, timeout = 1.0):
+    "Stops the workers, waiting at most timeout seconds before killing them"
+    for connection in self.connections:
+      try:
+        with alarmHeld():
+          connection.send(None)
+      except (OSError, EOFError):
+        pass
+    end = time.time() + timeout
+    for process in self.processes:
+      process.join(max(0.0, end - time.time()))
+      if process.is_alive():
+        process.terminate()
+        process.join()
+    for connection in self.connections:
+      connection.close()
+    self.processes = []
+    self.connections = []
+    self.workers = {}
+
+class RootParallelAgent:
+  """
+  A mixin that runs an agent's search on a RootParallelSearch pool.  List
+  it before the agent class; numWorkers sets the size of the pool.
+  """
+  numWorkers = 2
+
+  def registerInitialState(self, gameState):
+    super(RootParallelAgent, self).registerInitialState(gameState)
+    self.pool = RootParallelSearch(self, gameState, self.numWorkers)
+
+  def chooseAction(self, gameState):
+    return self.pool.search(gameState)
+
+  def final(self, gameState):
+    self.pool.shutdown()
+    super(RootParallelAgent, self).final(gameState)
@@ -0,0 +1,206 @@
+# stateCodec.py
+# -------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  A compact binary encoding of capture game states.
+
+  A pickled GameState carries its whole Layout and an object per
+  configuration.  encodeState writes only what changes during a game,
+  little-endian:
+
+    header    version, layout id (8 bytes), score, time left, flags,
+              food size in bytes, number of capsules, number of agents
+    food      the food bitboard (bit x * height + y, as in BitGrid)
+    capsules  x, y for each capsule
+    agents    x, y, direction, flags (pacman, hidden, has distance),
+              scared timer, food carried, food returned and sonar
+              distance for each agent
+
+  which is around a hundred bytes on the stock layouts.  decodeState
+  rebuilds the state from the layout, found by its id (Layout.layoutId)
+  among the layouts this process has encoded or registered, or among the
+  stock layouts.  The encoding is used for worker IPC (parallelSearch)
+  and suits replay files and training data; encodeLayout and
+  decodeLayout store the layouts those need.
+"""
+
+from game import AgentState, BitGrid, Configuration, Directions
+import struct
+
+VERSION = 1
+
+HEADER = struct.Struct('<B8siiBHBB')
+CAPSULE = struct.Struct('<BB')
+AGENT = struct.Struct('<BBBBBHHh')
+
+DIRECTIONS = (Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP)
+DIRECTION_CODES = dict((direction, code) for code, direction in enumerate(DIRECTIONS))
+
+# Header flags
+WIN = 1
+
+# Agent flags
+PACMAN = 1
+HIDDEN = 2
+HAS_DISTANCE = 4
+
+# Layouts by id, and the starting state built for each
+_layouts = {}
+_startStates = {}
+
+def registerLayout(layout):
+  "Makes layout known to decodeState; returns its id"
+  _layouts[layout.layoutId] = layout
+  return layout.layoutId
+
+def getLayout(layoutId):
+  """
+  Returns the layout with the given id, looking through the stock layouts
+  if it has not been registered.  Raises KeyError if there is none.
+  """
+  if layoutId not in _layouts:
+    import layout, os
+    directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'layouts')
+    for name in sorted(os.listdir(directory)):
+      if name.endswith('.lay'):
+        registerLayout(layout.tryToLoad(os.path.join(directory, name)))
+  if layoutId not in _layouts:
+    raise KeyError('Unknown layout id %s: register the layout first' % layoutId.hex())
+  return _layouts[layoutId]
+
+def encodeLayout(layout):
+  "The layout as bytes (its text), for files that store encoded states"
+  return str(layout).encode()
+
+def decodeLayout(data):
+  "The layout stored by encodeLayout, registered for decodeState"
+  import hashlib, layout
+  layoutId = hashlib.sha1(data).digest()[:8]
+  if layoutId in _layouts:
+    return _layouts[layoutId]
+  decoded = layout.Layout(bytes(data).decode().split('\n'))
+  registerLayout(decoded)
+  return decoded
+
+def encodeState(gameState):
+  "The state as bytes"
+  data = gameState.data
+  layout = data.layout
+  if layout.layoutId not in _layouts: registerLayout(layout)
+  foodBytes = (layout.width * layout.height + 7) // 8
+  agentStates = data.agentStates
+  agentDistances = gameState.agentDistances
+  flags = 0
+  if data._win: flags |= WIN
+  parts = [HEADER.pack(VERSION, layout.layoutId, data.score, data.timeleft, flags,
+                       foodBytes, len(data.capsules), len(agentStates)),
+           data.food.bits.to_bytes(foodBytes, 'little')]
+  for x, y in data.capsules:
+    parts.append(CAPSULE.pack(x, y))
+  for index, agentState in enumerate(agentStates):
+    flags = 0
+    if agentState.isPacman: flags |= PACMAN
+    conf = agentState.configuration
+    if conf == None:
+      flags |= HIDDEN
+      x, y, direction = 0, 0, 0
+    else:
+      x, y = conf.pos
+      if x != int(x) or y != int(y):
+        raise ValueError('Only agents on grid points can be encoded')
+      x, y, direction = int(x), int(y), DIRECTION_CODES[conf.direction]
+    distance = 0
+    if index < len(agentDistances) and agentDistances[index] != None:
+      flags |= HAS_DISTANCE
+      distance = agentDistances[index]
+    parts.append(AGENT.pack(x, y, direction, flags, agentState.scaredTimer,
+                            agentState.numCarrying, agentState.numReturned, distance))
+  return b''.join(parts)
+
+def getStartState(layoutId, numAgents):
+  "The starting GameState of a game on a layout, built once per layout"
+  key = (layoutId, numAgents)
+  if key not in _startStates:
+    import capture
+    state = capture.GameState()
+    # initialize sets the food target of the game being played; this
+    # state is not one, so the target is put back
+    totalFood = capture.TOTAL_FOOD
+    try:
+      state.initialize(getLayout(layoutId), numAgents)
+    finally:
+      capture.TOTAL_FOOD = totalFood
+    state.data.timeleft = 0
+    _startStates[key] = state
+  return _startStates[key]
+
+def decodeState(data, startState = None):
+  """
+  Rebuilds the state encoded by encodeState.  The teams, layout and
+  distance table come from startState (the starting state of the game
+  the state is from) if it is given, or else from a starting state built
+  for the layout.
+  """
+  version, layoutId, score, timeleft, flags, foodBytes, numCapsules, numAgents = HEADER.unpack_from(data, 0)
+  if version != VERSION:
+    raise ValueError('Unknown state encoding version %d' % version)
+  if startState == None:
+    startState = getStartState(layoutId, numAgents)
+  elif startState.data.layout.layoutId != layoutId:
+    raise ValueError('The state is from another layout than startState')
+
+  state = type(startState)(startState)
+  stateData = state.data
+  layout = stateData.layout
+  offset = HEADER.size
+  food = BitGrid(layout.width, layout.height)
+  food.bits = int.from_bytes(data[offset:offset + foodBytes], 'little')
+  offset += foodBytes
+  capsules = []
+  for i in range(numCapsules):
+    capsules.append(CAPSULE.unpack_from(data, offset))
+    offset += CAPSULE.size
+
+  agentStates = []
+  agentDistances = []
+  starts = startState.data.agentStates
+  for index in range(numAgents):
+    x, y, direction, agentFlags, scaredTimer, numCarrying, numReturned, distance = AGENT.unpack_from(data, offset)
+    offset += AGENT.size
+    agentState = AgentState(starts[index].start, agentFlags & PACMAN != 0)
+    if agentFlags & HIDDEN:
+      agentState.configuration = None
+    else:
+      agentState.configuration = Configuration((x, y), DIRECTIONS[direction])
+    agentState.scaredTimer = scaredTimer
+    agentState.numCarrying = numCarrying
+    agentState.numReturned = numReturned
+    agentStates.append(agentState)
+    if agentFlags & HAS_DISTANCE: agentDistances.append(distance)
+
+  stateData.food = food
+  stateData.capsules = capsules
+  stateData.agentStates = agentStates
+  stateData._ownsFood = True
+  stateData._ownsCapsules = True
+  stateData._ownedAgents = set(range(numAgents))
+  stateData.score = score
+  stateData.timeleft = timeleft
+  stateData._win = flags & WIN != 0
+  if len(agentDistances) == numAgents:
+    state.agentDistances = agentDistances
+  else:
+    state.agentDistances = []
+  state.countFood()
+  return state
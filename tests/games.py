@@ -0,0 +1,76 @@
+# games.py
+# --------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  Games for the tests to play: the start state of a layout and random
+  games that still go through the rules (agents head for food, bring it
+  home and get eaten on the way).
+"""
+
+import random
+import capture
+from game import Actions
+from layout import loadLayout
+
+def startState(layoutName = 'defaultCapture', length = 1200):
+  state = capture.GameState()
+  state.initialize(loadLayout(layoutName), 4)
+  state.data.timeleft = length
+  return state
+
+def fields(state):
+  "Everything about a state that a rule, copy or encoding could get wrong"
+  data = state.data
+  return (data.food.bits, sorted(data.capsules), data.score, data.timeleft, data._win,
+          [(s.configuration, s.isPacman, s.scaredTimer, s.numCarrying, s.numReturned) for s in data.agentStates],
+          list(state.agentDistances or []), data.foodLeft, data.foodReturned, data.foodCarried)
+
+def chooseAction(state, agentIndex, rng):
+  """
+  A random move three times in ten, else the move towards the nearest
+  food or capsule to eat, or towards home with two or more carried.
+  """
+  actions = state.getLegalActions(agentIndex)
+  if rng.random() < 0.3: return rng.choice(actions)
+  agentState = state.data.agentStates[agentIndex]
+  if agentState.numCarrying >= 2:
+    targets = [agentState.start.pos]
+  elif state.isOnRedTeam(agentIndex):
+    targets = state.getBlueFood().asList() + state.getBlueCapsules()
+  else:
+    targets = state.getRedFood().asList() + state.getRedCapsules()
+  if not targets: return rng.choice(actions)
+  table = state.getDistanceTable()
+  position = agentState.getPosition()
+  def distance(action):
+    successor = Actions.getSuccessor(position, action)
+    return min(table.getDistance(successor, target) for target in targets)
+  return min(actions, key = distance)
+
+def playGame(layoutName = 'defaultCapture', seed = 0, length = 1200):
+  """
+  Plays a game, yielding (state, agentIndex, action, successor) for every
+  move until it ends.
+  """
+  rng = random.Random(seed)
+  state = startState(layoutName, length)
+  agentIndex = 0
+  for move in range(length):
+    action = chooseAction(state, agentIndex, rng)
+    successor = state.generateSuccessor(agentIndex, action)
+    capture.CaptureRules.endIfTimeUp(successor, move + 1, length)
+    yield state, agentIndex, action, successor
+    if successor.isOver(): break
+    state = successor
+    agentIndex = (agentIndex + 1) % 4
@@ -0,0 +1,30 @@
+# test_batchCapture.py
+# --------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  BatchGames must play by the rules of capture.py: these tests play the
+  same random games on both and compare every state.
+"""
+
+import pytest
+np = pytest.importorskip('numpy')
+from layout import loadLayout
+import batchCapture
+
+def test_batch_games_follow_the_rules():
+  mismatches, events = batchCapture.checkConformance(loadLayout('tinyCapture'), numGames = 2)
+  assert mismatches == []
+  # The games must have gone through the rules worth checking
+  assert events['food eaten'] > 0
+  assert events['agents eaten'] > 0
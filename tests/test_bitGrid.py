@@ -0,0 +1,94 @@
+# test_bitGrid.py
+# ---------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  BitGrid must behave like the Grid it replaced: the same cells, string,
+  lists, counts, packed bits, equality and hash.
+"""
+
+import pickle, random
+import pytest
+from game import Grid, BitGrid
+
+def randomGrids(seed, count = 200):
+  "Pairs of equal random Grids and BitGrids"
+  rng = random.Random(seed)
+  for i in range(count):
+    width, height = rng.randint(1, 12), rng.randint(1, 12)
+    grid, bitGrid = Grid(width, height), BitGrid(width, height)
+    for x in range(width):
+      for y in range(height):
+        value = rng.random() < 0.5
+        grid[x][y] = value
+        bitGrid[x][y] = value
+    yield grid, bitGrid
+
+def test_bit_grids_match_grids():
+  for grid, bitGrid in randomGrids(0):
+    assert bitGrid.data == grid.data
+    assert str(bitGrid) == str(grid)
+    assert bitGrid.asList() == grid.asList()
+    assert bitGrid.asList(False) == grid.asList(False)
+    assert bitGrid.count() == grid.count()
+    assert bitGrid.count(False) == grid.count(False)
+    assert bitGrid.packBits() == grid.packBits()
+    assert BitGrid(grid.width, grid.height, bitRepresentation = grid.packBits()[2:]) == bitGrid
+
+def test_equal_grids_hash_alike():
+  for grid, bitGrid in randomGrids(1):
+    assert bitGrid == grid and grid == bitGrid
+    assert hash(bitGrid) == hash(grid)
+    assert bitGrid == bitGrid.copy() and hash(bitGrid) == hash(bitGrid.copy())
+    assert len(set([grid, bitGrid, bitGrid.copy()])) == 1
+    other = bitGrid.copy()
+    other[0][0] = not other[0][0]
+    assert other != bitGrid and other != grid
+
+def test_grids_of_other_shapes_differ():
+  assert BitGrid(2, 3) != BitGrid(3, 2)
+  assert BitGrid(2, 3) != Grid(3, 2)
+  assert BitGrid(2, 3) != None
+
+def test_copies_are_independent():
+  grid = BitGrid(4, 4)
+  copy = grid.copy()
+  copy[1][2] = True
+  assert not grid[1][2] and copy[1][2]
+
+def test_frozen_grids_cannot_change():
+  grid = BitGrid(4, 4)
+  grid.freeze()
+  with pytest.raises(Exception):
+    grid[0][0] = True
+  copy = grid.copy()
+  copy[0][0] = True
+  assert copy[0][0]
+
+def test_columns_index_like_lists():
+  grid = BitGrid(3, 4)
+  grid[1][-1] = True
+  assert grid[1][3] and len(grid[1]) == 4
+  with pytest.raises(IndexError):
+    grid[1][4]
+
+def test_masks_cover_columns():
+  grid = BitGrid(5, 3, True)
+  mask = grid.getMask(1, 3)
+  cells = [(index // 3, index % 3) for index in range(15) if mask >> index & 1]
+  assert cells == [(x, y) for x in (1, 2) for y in range(3)]
+
+def test_pickled_grids_stay_equal():
+  for grid, bitGrid in randomGrids(2, 20):
+    bitGrid[0] # Column views are not pickled
+    assert pickle.loads(pickle.dumps(bitGrid)) == bitGrid
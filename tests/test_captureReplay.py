@@ -0,0 +1,88 @@
+# test_captureReplay.py
+# ---------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  Replay files: a game written to a replay must read back move for move
+  and state for state, finished or cut short.
+"""
+
+import os
+import pytest
+import capture, captureReplay, textDisplay
+from baselineTeam import createTeam
+from games import startState, playGame, fields
+
+def writeReplay(fileName, layoutName, keyframeInterval = 50, close = True):
+  "Writes a game of playGame to fileName; returns its states, turn by turn"
+  states = [startState(layoutName)]
+  writer = captureReplay.ReplayWriter(fileName, states[0], {'length': 1200, 'redTeamName': 'R'},
+                                      keyframeInterval)
+  for state, agentIndex, action, successor in playGame(layoutName):
+    writer.recordAction(agentIndex, action, successor)
+    states.append(successor)
+  if close: writer.close({'score': states[-1].data.score})
+  else: writer.file.close()
+  return states
+
+def replayFields(state):
+  "fields without the win flag, which the game's move count sets outside the rules"
+  result = fields(state)
+  return result[:4] + result[5:]
+
+def test_replays_round_trip(tmp_path):
+  fileName = str(tmp_path / 'replay')
+  states = writeReplay(fileName, 'defaultCapture')
+  reader = captureReplay.ReplayReader(fileName)
+  assert reader.finished and reader.numTurns == len(states) - 1
+  assert reader.metadata['redTeamName'] == 'R'
+  assert reader.result == {'score': states[-1].data.score}
+  assert len(reader.getActions()) == reader.numTurns
+  for turn in list(range(0, len(states), 7)) + [len(states) - 1]:
+    assert replayFields(reader.getState(turn)) == replayFields(states[turn])
+  with pytest.raises(IndexError):
+    reader.getState(len(states))
+
+def test_unfinished_replays_read_up_to_their_last_record(tmp_path):
+  fileName = str(tmp_path / 'replay')
+  states = writeReplay(fileName, 'tinyCapture', close = False)
+  size = os.path.getsize(fileName)
+  for cut in (size, size - 1, size - 30):
+    with open(fileName, 'r+b') as f:
+      f.truncate(cut)
+    reader = captureReplay.ReplayReader(fileName)
+    assert not reader.finished and 0 < reader.numTurns <= len(states) - 1
+    assert replayFields(reader.getState(reader.numTurns)) == replayFields(states[reader.numTurns])
+
+def test_recorded_games_replay(tmp_path):
+  fileName = str(tmp_path / 'replay')
+  layout = startState('tinyCapture').data.layout
+  agents = sum([list(pair) for pair in zip(createTeam(0, 2, True), createTeam(1, 3, False))], [])
+  game = capture.CaptureRules().newGame(layout, agents, textDisplay.NullGraphics(), 300, True, False)
+  captureReplay.recordGame(game, fileName, {'length': 300})
+  try:
+    game.run()
+  finally:
+    captureReplay.finishRecording(game)
+  args = captureReplay.loadReplay(fileName)
+  assert args['actions'] == game.moveHistory and args['length'] == 300
+  reader = captureReplay.ReplayReader(fileName)
+  assert reader.result['score'] == game.state.data.score
+  assert replayFields(reader.getState(reader.numTurns)) == replayFields(game.state)
+
+def test_other_files_are_not_replays(tmp_path):
+  fileName = str(tmp_path / 'replay')
+  with open(fileName, 'wb') as f:
+    f.write(b'not a replay')
+  with pytest.raises(ValueError):
+    captureReplay.ReplayReader(fileName)
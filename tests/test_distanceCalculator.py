@@ -0,0 +1,126 @@
+# test_distanceCalculator.py
+# --------------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  Maze distances: the bitboard BFS of computeDistances against a plain
+  BFS over the cells, and the DistanceTable and Distancer lookups.
+"""
+
+import collections, sys
+import pytest
+import distanceCalculator
+from layout import Layout, loadLayout
+
+# A maze with a cell, (4, 1), that no other cell can reach
+CLOSED_OFF = ['%%%%%%',
+              '%....%',
+              '%.%%%%',
+              '%..%.%',
+              '%%%%%%']
+
+def referenceDistances(layout):
+  "{(source, target): distance} by a BFS from every open cell"
+  cells = layout.walls.asList(False)
+  distances = {}
+  for source in cells:
+    seen = {source: 0}
+    queue = collections.deque([source])
+    while queue:
+      x, y = queue.popleft()
+      for neighbour in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+        if neighbour not in seen and not layout.walls[neighbour[0]][neighbour[1]]:
+          seen[neighbour] = seen[(x, y)] + 1
+          queue.append(neighbour)
+    for target in cells:
+      distances[(source, target)] = seen.get(target, sys.maxsize)
+  return distances
+
+@pytest.mark.parametrize('layoutName', ['tinyCapture', 'defaultCapture', 'RANDOM3'])
+def test_distances_match_a_plain_bfs(layoutName):
+  layout = loadLayout(layoutName)
+  table = distanceCalculator.computeDistances(layout)
+  for (source, target), distance in referenceDistances(layout).items():
+    assert table.getDistance(source, target) == distance
+
+def test_cells_out_of_reach_are_infinitely_far():
+  layout = Layout(CLOSED_OFF)
+  table = distanceCalculator.computeDistances(layout)
+  assert table.getDistance((1, 1), (4, 3)) == 5
+  assert table.getDistance((1, 1), (4, 1)) == sys.maxsize
+  assert table.getDistance((4, 1), (4, 1)) == 0
+  with pytest.raises(Exception):
+    table.getDistance((0, 0), (1, 1))
+
+def test_distancer_snaps_to_the_grid():
+  layout = loadLayout('tinyCapture')
+  table = distanceCalculator.computeDistances(layout)
+  distancer = distanceCalculator.Distancer(layout, table = table)
+  assert distancer.getDistance((1, 1), (3, 4)) == 5 # Manhattan until the table is attached
+  distancer.getMazeDistances()
+  source, target = layout.cells[0], layout.cells[-1]
+  assert distancer.getDistance(source, target) == table.getDistance(source, target)
+  # A position halfway between a cell and its open east neighbour
+  x, y = [(x, y) for x, y in layout.cells if not layout.walls[x + 1][y]][0]
+  assert distancer.getDistance((x + 0.5, y), (x, y)) == 0.5
+
+def test_tables_are_built_once_per_walls():
+  layout = loadLayout('tinyCapture')
+  table = distanceCalculator.getDistanceTable(layout)
+  assert distanceCalculator.getDistanceTable(loadLayout('tinyCapture')) is table
+  assert table.getMetrics()['cells'] == len(layout.cells)
+
+@pytest.fixture
+def cacheDirectory(tmp_path, monkeypatch):
+  "A fresh distance cache, and no tables built before the test"
+  monkeypatch.setattr(distanceCalculator, 'CACHE_DIRECTORY', str(tmp_path))
+  monkeypatch.setattr(distanceCalculator, 'distanceMap', {})
+  return tmp_path
+
+def test_cached_distances_load_as_written(cacheDirectory):
+  layout = loadLayout('tinyCapture')
+  table = distanceCalculator.computeDistances(layout)
+  assert distanceCalculator.loadDistances(layout) == None
+  distanceCalculator.saveDistances(layout, table)
+  loaded = distanceCalculator.loadDistances(layout)
+  assert list(loaded.distances) == list(table.distances)
+  for source in layout.cells[:10]:
+    for target in layout.cells:
+      assert loaded.getDistance(source, target) == table.getDistance(source, target)
+
+def test_tables_come_from_the_cache_once_written(cacheDirectory):
+  computed = distanceCalculator.getDistanceTable(loadLayout('tinyCapture'))
+  assert computed.source == 'computed'
+  distanceCalculator.distanceMap.clear()
+  loaded = distanceCalculator.getDistanceTable(loadLayout('tinyCapture'))
+  assert loaded.source == 'disk'
+  assert list(loaded.distances) == list(computed.distances)
+
+def test_damaged_cache_files_are_ignored(cacheDirectory):
+  layout = loadLayout('tinyCapture')
+  distanceCalculator.saveDistances(layout, distanceCalculator.computeDistances(layout))
+  fileName = distanceCalculator.cacheFileName(layout.walls)
+  data = open(fileName, 'rb').read()
+  for damaged in (data[:-2], data[:distanceCalculator.CACHE_HEADER.size], b'', b'XXXX' + data[4:]):
+    with open(fileName, 'wb') as f:
+      f.write(damaged)
+    assert distanceCalculator.loadDistances(layout) == None
+  # A damaged file is computed again and replaced
+  table = distanceCalculator.getDistanceTable(layout)
+  assert table.source == 'computed'
+  assert distanceCalculator.loadDistances(layout) != None
+
+def test_other_walls_do_not_share_a_cache_file(cacheDirectory):
+  tiny, default = loadLayout('tinyCapture'), loadLayout('defaultCapture')
+  distanceCalculator.saveDistances(tiny, distanceCalculator.computeDistances(tiny))
+  assert distanceCalculator.loadDistances(default) == None
@@ -0,0 +1,65 @@
+# test_foodCounters.py
+# --------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  The team food counters of GameStateData: the rules must keep them equal
+  to a count from scratch, and the win rule must read them right.
+"""
+
+import capture
+from game import Configuration, Directions
+from games import startState, playGame
+
+def counted(state):
+  "The counters recomputed from the food grid and agent states"
+  copy = state.deepCopy()
+  copy.countFood()
+  return copy.data.foodLeft, copy.data.foodReturned, copy.data.foodCarried
+
+def test_counters_follow_the_rules():
+  for layoutName in ('tinyCapture', 'defaultCapture'):
+    for seed in range(3):
+      for state, agentIndex, action, successor in playGame(layoutName, seed):
+        data = successor.data
+        assert (data.foodLeft, data.foodReturned, data.foodCarried) == counted(successor)
+        assert successor.getRedFoodCount() == successor.getRedFood().count()
+        assert successor.getBlueFoodCount() == successor.getBlueFood().count()
+
+def test_counters_of_copies_and_advanced_states():
+  for state, agentIndex, action, successor in playGame('tinyCapture', length = 400):
+    copy = state.deepCopy()
+    copy.advance(agentIndex, action)
+    assert (copy.data.foodLeft, copy.data.foodReturned, copy.data.foodCarried) == counted(successor)
+
+def returnHome(carrying):
+  "A red Pacman carrying food, one step from home, after the step"
+  state = startState('defaultCapture')
+  layout = state.data.layout
+  halfway = layout.width // 2
+  y = [y for y in range(layout.height)
+       if not layout.walls[halfway][y] and not layout.walls[halfway - 1][y]][0]
+  agentState = state.data.agentStates[0]
+  agentState.configuration = Configuration((halfway, y), Directions.WEST)
+  agentState.isPacman = True
+  agentState.numCarrying = carrying
+  state.countFood()
+  return state.generateSuccessor(0, Directions.WEST)
+
+def test_bringing_enough_food_home_wins():
+  foodToWin = startState('defaultCapture').data.layout.totalFood // 2 - capture.MIN_FOOD
+  successor = returnHome(foodToWin)
+  assert successor.data._win and successor.data.score == foodToWin
+  assert successor.data.foodReturned == (foodToWin, 0) and successor.data.foodCarried == (0, 0)
+  successor = returnHome(foodToWin - 1)
+  assert not successor.data._win and successor.data.score == foodToWin - 1
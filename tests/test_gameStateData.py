@@ -0,0 +1,71 @@
+# test_gameStateData.py
+# ---------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  Copy-on-write GameStateData: a successor shares the food, capsules and
+  agent states of its parent until it changes them, and changing them
+  never shows through in the parent.
+"""
+
+import capture
+from games import startState, playGame
+
+def snapshot(state):
+  "Everything a successor could change, copied out of state"
+  data = state.data
+  return (data.food.bits, list(data.capsules), data.score,
+          [(s.configuration, s.scaredTimer, s.numCarrying, s.numReturned, s.isPacman)
+           for s in data.agentStates])
+
+def test_successors_leave_their_parents_alone():
+  for layoutName in ('tinyCapture', 'defaultCapture'):
+    for state, agentIndex, action, successor in playGame(layoutName):
+      before = snapshot(state)
+      state.generateSuccessor(agentIndex, action)
+      assert snapshot(state) == before
+
+def test_mutable_accessors_copy_shared_data_once():
+  parent = startState()
+  child = capture.GameState(parent)
+  food = child.data.getMutableFood()
+  assert food is not parent.data.food
+  assert child.data.getMutableFood() is food
+  agentState = child.data.getMutableAgentState(0)
+  assert agentState is not parent.data.agentStates[0]
+  assert child.data.getMutableAgentState(0) is agentState
+  capsules = child.data.getMutableCapsules()
+  capsules.append((0, 0))
+  assert (0, 0) not in parent.data.capsules
+
+def test_deep_copies_share_nothing_mutable():
+  state = startState()
+  copy = state.deepCopy()
+  assert copy.data == state.data
+  copy.data.food[1][1] = not state.data.food[1][1]
+  copy.data.agentStates[0].numCarrying = 5
+  copy.data.capsules.append((0, 0))
+  assert copy.data != state.data
+  assert state.data.agentStates[0].numCarrying == 0
+  assert (0, 0) not in state.data.capsules
+
+def test_observations_cannot_change_the_game():
+  state = startState()
+  before = snapshot(state)
+  observation = state.makeObservation(0)
+  for agentState in observation.data.agentStates:
+    agentState.scaredTimer = 9
+    agentState.numCarrying = 3
+  observation.data.food[1][1] = not state.data.food[1][1]
+  observation.data.capsules.append((0, 0))
+  assert snapshot(state) == before
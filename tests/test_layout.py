@@ -0,0 +1,37 @@
+# test_layout.py
+# --------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  Tests of layout.loadLayout.
+"""
+
+import pytest
+from layout import loadLayout
+
+def test_seeded_random_layouts_are_the_same_every_time():
+  for name in ('RANDOM0', 'RANDOM1', 'RANDOM4242'):
+    assert loadLayout(name).layoutText == loadLayout(name).layoutText
+
+def test_different_seeds_give_different_mazes():
+  assert loadLayout('RANDOM0').layoutText != loadLayout('RANDOM1').layoutText
+
+def test_random_layouts_need_a_seed():
+  with pytest.raises(Exception):
+    loadLayout('RANDOM')
+
+def test_named_layouts_load():
+  layout = loadLayout('tinyCapture')
+  assert layout.width == 20 and layout.height == 7
+  with pytest.raises(Exception):
+    loadLayout('noSuchCapture')
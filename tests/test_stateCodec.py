@@ -0,0 +1,69 @@
+# test_stateCodec.py
+# ------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  The binary state encoding: every state of a game, and every
+  observation of one, must come back from decodeState as it was.
+"""
+
+import pytest
+import capture, stateCodec
+from games import startState, playGame, fields
+from layout import loadLayout
+
+def test_game_states_round_trip():
+  for layoutName in ('tinyCapture', 'defaultCapture'):
+    start = startState(layoutName)
+    for state, agentIndex, action, successor in playGame(layoutName):
+      decoded = stateCodec.decodeState(stateCodec.encodeState(successor), start)
+      assert fields(decoded) == fields(successor)
+      assert decoded.getZobristHash() == successor.getZobristHash()
+    assert successor.isOver() and decoded.isOver()
+
+def test_observations_round_trip():
+  for state, agentIndex, action, successor in playGame('defaultCapture', length = 300):
+    observation = successor.makeObservation(agentIndex)
+    decoded = stateCodec.decodeState(stateCodec.encodeState(observation))
+    assert fields(decoded) == fields(observation)
+
+def test_decoded_states_play_on():
+  start = startState('tinyCapture')
+  for state, agentIndex, action, successor in playGame('tinyCapture', length = 200):
+    if successor.isOver(): break # Ended by the game's move count, not by the rules
+    decoded = stateCodec.decodeState(stateCodec.encodeState(state), start)
+    assert fields(decoded.generateSuccessor(agentIndex, action)) == fields(successor)
+
+def test_layouts_round_trip():
+  layout = loadLayout('RANDOM7')
+  decoded = stateCodec.decodeLayout(stateCodec.encodeLayout(layout))
+  assert decoded.layoutId == layout.layoutId
+  assert decoded.walls == layout.walls and decoded.food == layout.food
+
+def test_start_states_leave_the_food_target_alone():
+  startState('defaultCapture') # The food target of a defaultCapture game
+  totalFood = capture.TOTAL_FOOD
+  stateCodec.getStartState(loadLayout('tinyCapture').layoutId, 4)
+  assert capture.TOTAL_FOOD == totalFood
+
+def test_bad_encodings_are_rejected():
+  encoded = bytearray(stateCodec.encodeState(startState('tinyCapture')))
+  encoded[0] = stateCodec.VERSION + 1
+  with pytest.raises(ValueError):
+    stateCodec.decodeState(bytes(encoded))
+  encoded = bytearray(stateCodec.encodeState(startState('tinyCapture')))
+  encoded[1:9] = b'\0' * 8
+  with pytest.raises(KeyError):
+    stateCodec.decodeState(bytes(encoded))
+  with pytest.raises(ValueError):
+    stateCodec.decodeState(stateCodec.encodeState(startState('tinyCapture')), startState('defaultCapture'))
@@ -0,0 +1,102 @@
+# test_util.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  util's data structures: IndexedPriorityQueue against a plain reference
+  and Counter against the behaviour its callers rely on.
+"""
+
+import random
+import util
+
+def test_indexed_queue_matches_a_reference():
+  rng = random.Random(0)
+  queue = util.IndexedPriorityQueue()
+  reference = {}  # item -> (priority, order it was first pushed in)
+  pushes = 0
+  for step in range(20000):
+    operation = rng.random()
+    if operation < 0.45 or not reference:
+      item, priority = rng.randrange(300), rng.randrange(100)
+      queue.push(item, priority)
+      if item not in reference:
+        reference[item] = (priority, pushes)
+        pushes += 1
+      else:
+        reference[item] = (priority, reference[item][1])
+    elif operation < 0.7:
+      item, priority = rng.randrange(300), rng.randrange(100)
+      queue.update(item, priority)
+      if item not in reference:
+        reference[item] = (priority, pushes)
+        pushes += 1
+      elif priority < reference[item][0]:
+        reference[item] = (priority, reference[item][1])
+    else:
+      expected = min(reference, key = lambda item: reference[item])
+      assert queue.pop() == expected
+      del reference[expected]
+    assert len(queue) == len(reference)
+  for item, (priority, order) in reference.items():
+    assert item in queue and queue.getPriority(item) == priority
+
+def test_indexed_queue_pops_ties_first_in_first_out():
+  queue = util.IndexedPriorityQueue()
+  for item in 'abcde':
+    queue.push(item, 1)
+  queue.push('c', 0)
+  queue.update('a', 5) # Not lower: left alone
+  assert [queue.pop() for i in range(5)] == ['c', 'a', 'b', 'd', 'e']
+  assert queue.isEmpty()
+
+def test_indexed_queue_survives_rebuilds():
+  queue = util.IndexedPriorityQueue()
+  queue.push('item', 1000)
+  queue.push('other', 2000)
+  for priority in range(999, 0, -1):
+    queue.update('item', priority)
+  assert len(queue.heap) < 200
+  assert queue.pop() == 'item' and queue.pop() == 'other'
+
+def test_counter_reads_do_not_add_keys():
+  counter = util.Counter()
+  assert counter['missing'] == 0
+  assert 'missing' not in counter and len(counter) == 0
+  counter['present'] += 2
+  assert counter == {'present': 2}
+
+def test_counter_arithmetic():
+  a, b = util.Counter(), util.Counter()
+  a.update({'x': 1, 'y': 2, 'z': 3})
+  b.update({'y': 4, 'w': 5})
+  assert a * b == 8 and b * a == 8
+  assert len(a) == 3 and len(b) == 2
+  assert a + b == {'x': 1, 'y': 6, 'z': 3, 'w': 5}
+  assert a - b == {'x': 1, 'y': -2, 'z': 3, 'w': -5}
+  assert a.argMax() == 'z' and util.Counter().argMax() == None
+  assert a.sortedKeys() == ['z', 'y', 'x']
+  assert a.totalCount() == 6
+
+def test_counter_normalize_and_divide():
+  counter = util.Counter()
+  counter.update({'x': 1, 'y': 3})
+  copy = counter.copy()
+  counter.normalize()
+  assert counter == {'x': 0.25, 'y': 0.75}
+  assert copy == {'x': 1, 'y': 3} and isinstance(copy, util.Counter)
+  copy.divideAll(2)
+  assert copy == {'x': 0.5, 'y': 1.5}
+  empty = util.Counter()
+  empty.normalize()
+  assert empty == {}
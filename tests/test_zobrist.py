@@ -0,0 +1,55 @@
+# test_zobrist.py
+# ---------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  Zobrist hashes: the hash a successor derives from its parent's must be
+  the one computed from scratch, and states that differ must hash apart.
+"""
+
+from game import ZobristKeys
+from games import startState, playGame
+
+def fullHash(state):
+  return state.data.layout.getZobristKeys().hashState(state.data)
+
+def test_incremental_hashes_match_full_hashes():
+  for layoutName in ('tinyCapture', 'defaultCapture'):
+    for seed in range(2):
+      for state, agentIndex, action, successor in playGame(layoutName, seed):
+        state.getZobristHash()
+        assert state.generateSuccessor(agentIndex, action).getZobristHash() == fullHash(successor)
+
+def test_unhashed_parents_leave_the_hash_to_be_computed():
+  state = startState()
+  successor = state.generateSuccessor(0, state.getLegalActions(0)[0])
+  assert successor.getZobristHash() == fullHash(successor)
+
+def test_keys_are_the_same_in_every_process():
+  layout = startState().data.layout
+  keys, again = ZobristKeys(layout), ZobristKeys(layout)
+  assert keys.food == again.food and keys.agents == again.agents
+  state = startState()
+  assert keys.hashState(state.data) == again.hashState(state.data)
+
+def test_agent_details_change_the_hash():
+  state = startState()
+  base = fullHash(state)
+  for field, value in (('scaredTimer', 5), ('numCarrying', 2), ('numReturned', 1), ('isPacman', True)):
+    changed = state.deepCopy()
+    setattr(changed.data.agentStates[1], field, value)
+    assert fullHash(changed) != base, field
+
+def test_equal_states_hash_alike():
+  for state, agentIndex, action, successor in playGame('tinyCapture', length = 200):
+    assert hash(successor.deepCopy()) == hash(successor)
@@ -0,0 +1,467 @@
+# tournament.py
+# -------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  Round-robin tournaments between capture teams.
+
+  Every team plays every other team as red and as blue on every layout
+  (rounds times, with different seeds).  The matches are played in a pool
+  of worker processes and each result is appended to a JSON lines file as
+  soon as its game ends, so a tournament that is interrupted picks up
+  where it left off when it is run again with the same results file.
+  Ratings are fitted to all results at the end:
+
+    python tournament.py -o nightly.jsonl --seeds ../driver/SEEDS \\
+        baselineTeam.py myTeam.py otherTeams/*.py
+
+  A match whose worker process dies is retried (--retries times) in a
+  fresh pool; agents that crash or time out inside a game lose it, as in
+  capture.py -c.
+"""
+
+from layout import loadLayout
+import capture, util
+import concurrent.futures, multiprocessing, multiprocessing.connection
+import hashlib, json, math, os, random, sys, time, traceback
+
+RESULT_NAMES = ('Blue wins', 'Tie', 'Red wins')
+
+class Match:
+  "One game of the tournament: two team modules, a layout and a seed"
+
+  def __init__(self, red, blue, layoutName, round, seed):
+    self.red = red
+    self.blue = blue
+    self.layoutName = layoutName
+    self.round = round
+    self.seed = seed
+    self.matchId = '%s-%s-%s-%d' % (teamName(red), teamName(blue), layoutName, round)
+
+def teamName(module):
+  "The name a team module is listed under: its file name without .py"
+  name = os.path.basename(module)
+  if name.endswith('.py'): name = name[:-3]
+  return name
+
+def matchSeed(tournamentSeed, red, blue, layoutName, round):
+  "The seed of a match, the same on every run of the tournament"
+  key = '%d %s %s %s %d' % (tournamentSeed, teamName(red), teamName(blue), layoutName, round)
+  return int.from_bytes(hashlib.sha1(key.encode()).digest()[:4], 'little') & 0x7fffffff
+
+def schedule(teams, layoutNames, rounds = 1, tournamentSeed = 0):
+  "The round-robin: every ordered pair of teams on every layout, rounds times"
+  matches = []
+  for round in range(rounds):
+    for layoutName in layoutNames:
+      for red in teams:
+        for blue in teams:
+          if red == blue: continue
+          seed = matchSeed(tournamentSeed, red, blue, layoutName, round)
+          matches.append(Match(red, blue, layoutName, round, seed))
+  return matches
+
+def readResults(fileName):
+  """
+  The results in a results file by match id; the last one of a match
+  counts.  A line cut short by an interruption is ignored.
+  """
+  results = {}
+  if not os.path.exists(fileName): return results
+  f = open(fileName)
+  try:
+    for line in f:
+      try:
+        result = json.loads(line)
+      except ValueError:
+        continue
+      results[result['match']] = result
+  finally:
+    f.close()
+  return results
+
+def endsWithNewline(fileName):
+  "Whether the last line of a file is whole"
+  if not os.path.exists(fileName) or os.path.getsize(fileName) == 0: return True
+  f = open(fileName, 'rb')
+  try:
+    f.seek(-1, os.SEEK_END)
+    return f.read(1) == b'\n'
+  finally:
+    f.close()
+
+# Per-process state of the tournament workers
+_workerAgents = {}
+_workerLayouts = {}
+_workerStarted = None
+
+def _initWorker():
+  "Agent and game output is suppressed in the workers"
+  util.mutePrint()
+
+def _initPoolWorker(started):
+  "Sets up a pool worker, which puts the id of each match it starts on started"
+  global _workerStarted
+  _workerStarted = started
+  _initWorker()
+
+def _playPoolMatch(*args):
+  "_playMatch in a pool worker, once the match is reported as started"
+  _workerStarted.put(args[-1])
+  return _playMatch(*args)
+
+def _getAgents(module, isRed):
+  "The agents of a team, loaded once per worker process and color"
+  key = (module, isRed)
+  if key not in _workerAgents:
+    _workerAgents[key] = capture.loadAgents(isRed, module, True, {})
+  return _workerAgents[key]
+
+def _playMatch(red, blue, layoutName, seed, length, replayDirectory, matchId):
+  "Plays a match in a worker process and returns its result"
+  import textDisplay
+  start = time.time()
+  result = {'match': matchId, 'red': teamName(red), 'blue': teamName(blue),
+            'layout': layoutName, 'seed': seed}
+  try:
+    if layoutName not in _workerLayouts:
+      _workerLayouts[layoutName] = loadLayout(layoutName)
+    redAgents = _getAgents(red, True)
+    blueAgents = _getAgents(blue, False)
+    redLoaded = None not in redAgents
+    blueLoaded = None not in blueAgents
+    if not (redLoaded and blueLoaded):
+      # A team that cannot be loaded forfeits
+      result.update({'score': int(redLoaded) - int(blueLoaded), 'turns': 0,
+                     'crashed': True, 'timeout': False, 'forfeit': True})
+    else:
+      agents = sum([list(el) for el in zip(redAgents, blueAgents)], [])
+      random.seed(seed)
+      rules = capture.CaptureRules(quiet = True)
+      g = rules.newGame(_workerLayouts[layoutName], agents, textDisplay.NullGraphics(), length, True, True)
+      if replayDirectory != None:
+        import captureReplay
+        captureReplay.recordGame(g, os.path.join(replayDirectory, matchId),
+                                 {'length': length, 'redTeamName': teamName(red), 'blueTeamName': teamName(blue)})
+        try:
+          g.run()
+        finally:
+          captureReplay.finishRecording(g)
+      else:
+        g.run()
+      result.update({'score': g.state.data.score, 'turns': len(g.moveHistory),
+                     'crashed': g.agentCrashed, 'timeout': g.agentTimeout})
+  except Exception:
+    result['error'] = traceback.format_exc()
+  result['seconds'] = round(time.time() - start, 3)
+  return result
+
+def _playOne(connection, *args):
+  "Plays one match in a process of its own and sends back its result"
+  _initWorker()
+  connection.send(_playMatch(*args))
+  connection.close()
+
+class Tournament:
+  """
+  Plays the matches of a schedule that have no result in resultsFile yet
+  and appends their results to it.
+  """
+
+  def __init__(self, matches, resultsFile, length = 1200, workers = None,
+               retries = 2, replayDirectory = None):
+    self.matches = matches
+    self.resultsFile = resultsFile
+    self.length = length
+    self.workers = workers or os.cpu_count() or 1
+    self.retries = retries
+    self.replayDirectory = replayDirectory
+    self.results = readResults(resultsFile)
+
+  def getPending(self):
+    "The matches still to be played (matches that ended in an error are played again)"
+    return [match for match in self.matches
+            if match.matchId not in self.results or 'error' in self.results[match.matchId]]
+
+  def run(self):
+    "Plays the pending matches and returns the results of the whole schedule"
+    pending = self.getPending()
+    self.total = len(self.matches)
+    self.finished = self.total - len(pending)
+    if self.finished > 0:
+      print('Resuming: %d of %d matches already played' % (self.finished, self.total))
+    if self.replayDirectory != None and not os.path.isdir(self.replayDirectory):
+      os.makedirs(self.replayDirectory)
+
+    self.attempts = dict((match.matchId, 0) for match in pending)
+    start = time.time()
+    complete = endsWithNewline(self.resultsFile)
+    self.out = open(self.resultsFile, 'a')
+    if not complete: self.out.write('\n') # After a line cut short
+    try:
+      # A worker that dies breaks the whole pool, and there is no telling
+      # which of the matches in flight killed it: those (and the matches
+      # that ended in an error) are played again each in a process of its
+      # own, while the matches not started yet go to a new pool
+      pending = self.playPool(pending)
+      if pending: self.playIsolated(pending)
+    finally:
+      self.out.close()
+    print('Played %d matches in %.1f seconds' % (len(self.attempts), time.time() - start))
+    return [self.results[match.matchId] for match in self.matches if match.matchId in self.results]
+
+  def playPool(self, matches):
+    """
+    Plays matches in a pool of worker processes and returns those to play
+    again: the ones that ended in an error and the ones in flight when a
+    worker died.  The workers report each match they start, so when a
+    pool breaks, the matches it never started are played in a new one.
+    """
+    retry = []
+    context = multiprocessing.get_context()
+    executor = concurrent.futures.ProcessPoolExecutor
+    while matches:
+      started = context.SimpleQueue()
+      broken = []
+      with executor(max_workers = self.workers, mp_context = context,
+                    initializer = _initPoolWorker, initargs = (started,)) as pool:
+        futures = {}
+        for match in matches:
+          future = pool.submit(_playPoolMatch, match.red, match.blue, match.layoutName, match.seed,
+                               self.length, self.replayDirectory, match.matchId)
+          futures[future] = match
+        for future in concurrent.futures.as_completed(futures):
+          match = futures[future]
+          try:
+            result = future.result()
+          except concurrent.futures.process.BrokenProcessPool:
+            broken.append(match)
+            continue
+          if not self.finish(match, result): retry.append(match)
+      startedIds = set()
+      while not started.empty():
+        startedIds.add(started.get())
+      inFlight = [match for match in broken if match.matchId in startedIds]
+      if broken and not inFlight:
+        # The pool broke before any match started: play them one by one
+        inFlight = broken
+      retry.extend(inFlight)
+      matches = [match for match in broken if match not in inFlight]
+      if matches:
+        print('A worker died: %d matches in flight are played again in processes of their own, '
+              '%d not started go to a new pool' % (len(inFlight), len(matches)))
+    return retry
+
+  def playIsolated(self, matches):
+    "Plays each match in a new process, at most self.workers at a time"
+    context = multiprocessing.get_context()
+    queue = list(matches)
+    running = {}
+    while queue or running:
+      while queue and len(running) < self.workers:
+        match = queue.pop(0)
+        connection, workerConnection = context.Pipe(False)
+        process = context.Process(target = _playOne, args = (workerConnection, match.red, match.blue,
+                                  match.layoutName, match.seed, self.length, self.replayDirectory, match.matchId))
+        process.daemon = True
+        process.start()
+        workerConnection.close()
+        running[connection] = (process, match)
+      for connection in multiprocessing.connection.wait(list(running)):
+        process, match = running.pop(connection)
+        try:
+          result = connection.recv()
+        except EOFError:
+          result = None
+        connection.close()
+        process.join()
+        if result == None:
+          result = {'match': match.matchId, 'red': teamName(match.red), 'blue': teamName(match.blue),
+                    'layout': match.layoutName, 'seed': match.seed,
+                    'error': 'The worker process died (exit code %s)' % process.exitcode}
+        if not self.finish(match, result): queue.append(match)
+
+  def finish(self, match, result):
+    """
+    Records the result of a match and reports it, or returns False if the
+    match ended in an error and has retries left.
+    """
+    self.attempts[match.matchId] += 1
+    result['attempts'] = self.attempts[match.matchId]
+    if 'error' in result and self.attempts[match.matchId] <= self.retries:
+      return False
+    self.record(result)
+    self.finished += 1
+    if 'error' in result:
+      outcome = 'error: ' + result['error'].strip().split('\n')[-1]
+    else:
+      score = result['score']
+      outcome = '%s, score %d' % (RESULT_NAMES[max(0, min(2, 1 + score))], score)
+    print('Match %d/%d: %s vs %s on %s: %s' % (self.finished, self.total, result['red'],
+          result['blue'], result['layout'], outcome))
+    return True
+
+  def record(self, result):
+    "Appends a result to the results file before going on"
+    self.results[result['match']] = result
+    self.out.write(json.dumps(result) + '\n')
+    self.out.flush()
+
+def getOutcomes(results):
+  "(red, blue, points of red) for every finished match; a tie is half a point"
+  outcomes = []
+  for result in results:
+    if 'error' in result: continue
+    score = result['score']
+    outcomes.append((result['red'], result['blue'], 1.0 if score > 0 else 0.0 if score < 0 else 0.5))
+  return outcomes
+
+def fitRatings(outcomes, teams, prior = 1.0, start = None, tolerance = 1e-9, maxIterations = 10000):
+  """
+  Fits Bradley-Terry strengths to the outcomes by minorization-
+  maximization and returns them as Elo ratings (400 points for 10 to 1
+  odds) averaging 1500.  Every team also gets prior points out of
+  2 * prior games against a team of average strength, which keeps the
+  ratings of teams that won or lost every game finite.
+  """
+  index = dict((team, i) for i, team in enumerate(teams))
+  n = len(teams)
+  points = [prior] * n
+  games = {}
+  for red, blue, redPoints in outcomes:
+    i, j = index[red], index[blue]
+    points[i] += redPoints
+    points[j] += 1.0 - redPoints
+    pair = (min(i, j), max(i, j))
+    games[pair] = games.get(pair, 0) + 1
+  opponents = [[] for i in range(n)]
+  for (i, j), count in games.items():
+    opponents[i].append((j, count))
+    opponents[j].append((i, count))
+
+  # Each strength is updated in place, from the newest strengths of the
+  # others (which converges in about half the iterations)
+  strengths = list(start or [1.0] * n)
+  for iteration in range(maxIterations):
+    change = 0.0
+    for i in range(n):
+      s = strengths[i]
+      denominator = 2 * prior / (s + 1.0)
+      for j, count in opponents[i]:
+        denominator += count / (s + strengths[j])
+      strengths[i] = points[i] / denominator
+      change = max(change, abs(strengths[i] - s) / s)
+    if change < tolerance: break
+
+  ratings = [400 * math.log10(s) for s in strengths]
+  mean = sum(ratings) / n
+  return dict((team, 1500 + rating - mean) for team, rating in zip(teams, ratings)), strengths
+
+def computeRatings(results, teams, samples = 200, confidence = 0.95, seed = 0):
+  """
+  Returns {team: (rating, low, high, wins, ties, losses)}: the fitted
+  rating and a bootstrap confidence interval, from refitting samples
+  resamplings of the matches.
+  """
+  outcomes = getOutcomes(results)
+  ratings, strengths = fitRatings(outcomes, teams)
+  rng = random.Random(seed)
+  sampled = dict((team, []) for team in teams)
+  for sample in range(samples):
+    resampled = [rng.choice(outcomes) for outcome in outcomes]
+    sampleRatings = fitRatings(resampled, teams, start = strengths, tolerance = 1e-5)[0]
+    for team in teams:
+      sampled[team].append(sampleRatings[team])
+
+  records = dict((team, [0, 0, 0]) for team in teams)
+  for red, blue, redPoints in outcomes:
+    result = {1.0: 0, 0.5: 1, 0.0: 2}[redPoints]
+    records[red][result] += 1
+    records[blue][2 - result] += 1
+
+  tail = (1 - confidence) / 2
+  table = {}
+  for team in teams:
+    values = sorted(sampled[team])
+    if values:
+      low = values[int(tail * (len(values) - 1))]
+      high = values[int(math.ceil((1 - tail) * (len(values) - 1)))]
+    else:
+      low = high = ratings[team]
+    table[team] = (ratings[team], low, high) + tuple(records[team])
+  return table
+
+def printRatings(table, confidence = 0.95):
+  print('%4s  %-24s %7s  %-17s %5s %5s %5s' % ('Rank', 'Team', 'Rating', '%d%% interval' % round(100 * confidence),
+                                               'Won', 'Tied', 'Lost'))
+  ranked = sorted(table.items(), key = lambda item: -item[1][0])
+  for rank, (team, (rating, low, high, wins, ties, losses)) in enumerate(ranked):
+    print('%4d  %-24s %7.0f  %7.0f - %-7.0f %5d %5d %5d' % (rank + 1, team, rating, low, high, wins, ties, losses))
+
+def readCommand(argv):
+  from optparse import OptionParser
+  usageStr = """
+  USAGE:      python tournament.py <options> TEAM.py TEAM.py ...
+  EXAMPLES:   (1) python tournament.py -o results.jsonl baselineTeam.py myTeam.py
+                  - plays baselineTeam against myTeam on defaultCapture, as red and blue
+              (2) python tournament.py -o nightly.jsonl --seeds ../driver/SEEDS -l defaultCapture teams/*.py
+                  - plays every pair of teams on the nightly layouts and defaultCapture
+  """
+  parser = OptionParser(usageStr)
+  parser.add_option('-o', '--results', help=default('Results file (JSON lines); resumes the tournament if it exists'),
+                    default='tournament.jsonl')
+  parser.add_option('-l', '--layout', dest='layouts', action='append', metavar='LAYOUT_FILE',
+                    help='A layout to play on, or RANDOM<seed>; may be repeated (default: defaultCapture)')
+  parser.add_option('--seeds', dest='seeds', metavar='FILE',
+                    help='Also play on the random layouts of the seeds in FILE (see generateTournamentLayouts.py)')
+  parser.add_option('-n', '--rounds', type='int', help=default('Games each pair plays per color and layout'), default=1)
+  parser.add_option('-i', '--time', type='int', dest='time', metavar='TIME',
+                    help=default('TIME limit of a game in moves'), default=1200)
+  parser.add_option('-w', '--workers', type='int', help='Number of worker processes (default: one per CPU)', default=None)
+  parser.add_option('--retries', type='int', help=default('Times a match whose worker died is played again'), default=2)
+  parser.add_option('--seed', type='int', help=default('Seed of the tournament, from which each match gets its own'), default=0)
+  parser.add_option('--replays', dest='replays', metavar='DIR', default=None,
+                    help='Record a replay of every match in DIR')
+  parser.add_option('--samples', type='int', help=default('Bootstrap samples for the rating intervals'), default=200)
+
+  options, teams = parser.parse_args(argv)
+  if len(teams) < 2:
+    parser.error('A tournament needs at least two teams')
+  names = [teamName(team) for team in teams]
+  if len(set(names)) != len(names):
+    parser.error('Team modules must have different file names')
+
+  layoutNames = list(options.layouts or [])
+  if options.seeds:
+    f = open(options.seeds)
+    try:
+      layoutNames += ['RANDOM%d' % int(line) for line in f if line.strip()]
+    finally:
+      f.close()
+  if not layoutNames: layoutNames = ['defaultCapture']
+  for name in layoutNames:
+    loadLayout(name) # Fails early for layouts that cannot be found
+
+  teams = [os.path.abspath(team if team.endswith('.py') else team + '.py') for team in teams]
+  return options, teams, layoutNames
+
+def default(str):
+  return str + ' [Default: %default]'
+
+if __name__ == '__main__':
+  options, teams, layoutNames = readCommand(sys.argv[1:])
+  matches = schedule(teams, layoutNames, options.rounds, options.seed)
+  tournament = Tournament(matches, options.results, options.time, options.workers,
+                          options.retries, options.replays)
+  results = tournament.run()
+  printRatings(computeRatings(results, [teamName(team) for team in teams], options.samples))
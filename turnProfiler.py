@@ -0,0 +1,100 @@
+# turnProfiler.py
+# ---------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+  Where the time of a game goes, turn by turn.
+
+  A TurnProfiler set as a Game's profiler is given the seconds each turn
+  spent in each phase of Game.run:
+
+    observation  the agent's observationFunction
+    action       the agent's getAction
+    successor    generateSuccessor (and recording the move, if recorded)
+    display      display.update
+    process      rules.process
+
+  writeRecords stores the turns as JSON lines or CSV, and printSummary
+  gives the median, 95th and 99th percentile and total of each phase.
+  python capture.py --profile-turns FILE does both.  Games without a
+  profiler pay one test per phase per turn.
+"""
+
+import csv, json, math
+
+PHASES = ('observation', 'action', 'successor', 'display', 'process')
+FIELDS = ('game', 'turn', 'agent') + PHASES
+
+class TurnProfiler:
+  "Keeps the phase times of every turn of one game"
+
+  def __init__(self):
+    # (turn, agent index, seconds of each phase)
+    self.records = []
+
+  def recordTurn(self, agentIndex, observation, action, successor, display, process):
+    self.records.append((len(self.records), agentIndex, observation, action, successor, display, process))
+
+def writeRecords(fileName, games, append = False):
+  """
+  Writes the turns of games, a list of (game index, profiler) pairs, to
+  fileName: CSV if its name ends in .csv, and JSON lines otherwise.
+  """
+  f = open(fileName, 'a' if append else 'w', newline = '')
+  try:
+    if fileName.endswith('.csv'):
+      writer = csv.writer(f)
+      if f.tell() == 0: writer.writerow(FIELDS)
+      for index, profiler in games:
+        for record in profiler.records:
+          writer.writerow((index,) + record)
+    else:
+      for index, profiler in games:
+        for record in profiler.records:
+          f.write(json.dumps(dict(zip(FIELDS, (index,) + record))) + '\n')
+  finally:
+    f.close()
+
+def percentile(values, p):
+  "The p-th percentile (nearest rank) of sorted values"
+  if not values: return 0.0
+  return values[max(0, int(math.ceil(p / 100.0 * len(values))) - 1)]
+
+def summarize(profilers):
+  """
+  {phase: (turns, p50, p95, p99, total)} over the turns of profilers,
+  with 'turn' for the phases added up.
+  """
+  columns = [[] for phase in PHASES]
+  turns = []
+  for profiler in profilers:
+    for record in profiler.records:
+      times = record[2:]
+      for column, seconds in zip(columns, times):
+        column.append(seconds)
+      turns.append(sum(times))
+  summary = {}
+  for name, values in zip(PHASES + ('turn',), columns + [turns]):
+    values.sort()
+    summary[name] = (len(values), percentile(values, 50), percentile(values, 95),
+                     percentile(values, 99), sum(values))
+  return summary
+
+def printSummary(profilers):
+  summary = summarize(profilers)
+  total = summary['turn'][4] or 1.0
+  print('%-12s %8s %10s %10s %10s %10s %7s' % ('phase', 'turns', 'p50 ms', 'p95 ms', 'p99 ms', 'total s', 'share'))
+  for name in PHASES + ('turn',):
+    count, p50, p95, p99, seconds = summary[name]
+    print('%-12s %8d %10.3f %10.3f %10.3f %10.2f %6.1f%%' % (name, count, p50 * 1e3, p95 * 1e3, p99 * 1e3,
+                                                           seconds, seconds / total * 100))
@@ -163,7 +163,7 @@ class PriorityQueue:
 
       Note that this PriorityQueue does not allow you to change the priority
       of an item.  However, you may insert the same item multiple times with
-      different priorities.
+      different priorities.  IndexedPriorityQueue can change priorities.
     """
     def  __init__(self):
         self.heap = []
@@ -202,6 +202,76 @@ class PriorityQueueWithFunction(PriorityQueue):
         PriorityQueue.push(self, item, self.priorityFunction(item))
 
 
+class IndexedPriorityQueue:
+    """
+      A priority queue that holds each item once and can change its
+      priority (decrease-key), as Dijkstra's algorithm and A* need.  The
+      caller no longer pushes an item again with a better priority and
+      skips its stale entries as they come out: update does it.
+
+      An index maps each item to its live heap entry.  A changed priority
+      gets a new entry and the old one is left in the heap, to be dropped
+      when it reaches the top, so every operation stays in heapq's C code;
+      the heap is rebuilt when stale entries outnumber live ones.  Items
+      must be hashable.  Items of equal priority are popped in the order
+      they were first pushed, as with PriorityQueue.
+    """
+    def __init__(self):
+        self.heap = []  # [priority, count, item] entries, live or stale
+        self.entries = {}  # item -> its live entry
+        self.stale = 0
+        self.count = 0
+
+    def push(self, item, priority):
+        "Adds item with priority, or gives it priority if it is already queued"
+        old = self.entries.get(item)
+        if old is None:
+            entry = [priority, self.count, item]
+            self.count += 1
+        elif old[0] == priority:
+            return
+        else:
+            entry = [priority, old[1], item]
+            self.stale += 1
+        self.entries[item] = entry
+        heapq.heappush(self.heap, entry)
+        if self.stale > len(self.entries) + 64:
+            self.heap = list(self.entries.values())
+            heapq.heapify(self.heap)
+            self.stale = 0
+
+    def update(self, item, priority):
+        """
+        Lowers the priority of item to priority if that is lower, and adds
+        item if it is not queued (PriorityQueue.update of the search project).
+        """
+        old = self.entries.get(item)
+        if old is None or priority < old[0]:
+            self.push(item, priority)
+
+    def pop(self):
+        "Removes and returns the item of lowest priority"
+        entries, heap = self.entries, self.heap
+        while True:
+            entry = heapq.heappop(heap)
+            item = entry[2]
+            if entries.get(item) is entry:
+                del entries[item]
+                return item
+            self.stale -= 1
+
+    def getPriority(self, item):
+        return self.entries[item][0]
+
+    def isEmpty(self):
+        return len(self.entries) == 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, item):
+        return item in self.entries
+
 def manhattanDistance( xy1, xy2 ):
     "Returns the Manhattan distance between points xy1 and xy2"
     return abs( xy1[0] - xy2[0] ) + abs( xy1[1] - xy2[1] )
@@ -252,9 +322,9 @@ class Counter(dict):
     subtracted or multiplied together.  See below for details.  They can
     also be normalized and their total count and arg max can be extracted.
     """
-    def __getitem__(self, idx):
-        self.setdefault(idx, 0)
-        return dict.__getitem__(self, idx)
+    def __missing__(self, key):
+        # Reading a missing key gives 0 without adding the key
+        return 0
 
     def incrementAll(self, keys, count):
         """
@@ -274,11 +344,8 @@ class Counter(dict):
         """
         Returns the key with the highest value.
         """
-        if len(list(self.keys())) == 0: return None
-        all = list(self.items())
-        values = [x[1] for x in all]
-        maxIndex = values.index(max(values))
-        return all[maxIndex][0]
+        if len(self) == 0: return None
+        return max(self, key = self.get)
 
     def sortedKeys(self):
         """
@@ -292,9 +359,7 @@ class Counter(dict):
         >>> a.sortedKeys()
         ['second', 'third', 'first']
         """
-        sortedItems = list(self.items())
-        compare = lambda x, y:  sign(y[1] - x[1])
-        sortedItems.sort(cmp=compare)
+        sortedItems = sorted(self.items(), key = lambda item: item[1], reverse = True)
         return [x[0] for x in sortedItems]
 
     def totalCount(self):
@@ -312,16 +377,14 @@ class Counter(dict):
         """
         total = float(self.totalCount())
         if total == 0: return
-        for key in list(self.keys()):
-            self[key] = self[key] / total
+        self.update({key: value / total for key, value in self.items()})
 
     def divideAll(self, divisor):
         """
         Divides all counts by divisor
         """
         divisor = float(divisor)
-        for key in self:
-            self[key] /= divisor
+        self.update({key: value / divisor for key, value in self.items()})
 
     def copy(self):
         """
@@ -345,15 +408,16 @@ class Counter(dict):
         >>> a * b
         14
         """
-        sum = 0
+        # Over the items of the smaller one, with plain dict lookups, adding
+        # up in the same order as before
+        total = 0
         x = self
         if len(x) > len(y):
             x,y = y,x
-        for key in x:
-            if key not in y:
-                continue
-            sum += x[key] * y[key]
-        return sum
+        for key, value in x.items():
+            if key in y:
+                total += value * y[key]
+        return total
 
     def __radd__(self, y):
         """
@@ -594,6 +658,12 @@ class TimeoutFunctionException(Exception):
 
 
 class TimeoutFunction:
+    """
+    Calls function with a time limit of timeout seconds, which may be a
+    fraction of a second: a call that runs longer is interrupted with a
+    TimeoutFunctionException, and one with no time left (timeout <= 0)
+    raises it before function is called.
+    """
     def __init__(self, function, timeout):
         self.timeout = timeout
         self.function = function
@@ -602,17 +672,19 @@ class TimeoutFunction:
         raise TimeoutFunctionException()
 
     def __call__(self, *args, **keyArgs):
-        # If we have SIGALRM signal, use it to cause an exception if and
-        # when this function runs too long.  Otherwise check the time taken
-        # after the method has returned, and throw an exception then.
-        if hasattr(signal, 'SIGALRM'):
+        if self.timeout <= 0:
+            self.handle_timeout(None, None)
+        # If we have interval timers (SIGALRM), use one to cause an exception
+        # if and when this function runs too long.  Otherwise check the time
+        # taken after the method has returned, and throw an exception then.
+        if hasattr(signal, 'setitimer'):
             old = signal.signal(signal.SIGALRM, self.handle_timeout)
-            signal.alarm(self.timeout)
+            signal.setitimer(signal.ITIMER_REAL, self.timeout)
             try:
                 result = self.function(*args, **keyArgs)
             finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
                 signal.signal(signal.SIGALRM, old)
-            signal.alarm(0)
         else:
             startTime = time.time()
             result = self.function(*args, **keyArgs)